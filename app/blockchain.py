@@ -1,16 +1,61 @@
+from __future__ import annotations
+
 import logging
+import time
 from decimal import Decimal
-from typing import Optional, Dict
-
-from web3 import Web3
+from typing import TYPE_CHECKING, Any, Optional, Dict, List
 
 from app.core.config import settings
+from app import metrics, tracing
+from app.chain_cache import BlockTracker, BlockTaggedCache
+
+if TYPE_CHECKING:
+    from web3 import Web3
 
 logger = logging.getLogger(__name__)
 
 _w3: Optional[Web3] = None
 _token_contract = None
 
+ERC20_ABI = [
+    {
+        "constant": True,
+        "inputs": [{"name": "account", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "type": "function",
+    },
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "to", "type": "address"},
+            {"name": "amount", "type": "uint256"},
+        ],
+        "name": "transfer",
+        "outputs": [{"name": "", "type": "bool"}],
+        "type": "function",
+    },
+]
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = (
+    "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+)
+
+
+def load_web3():
+    """
+    מחלקת Web3. ה-import של web3 לוקח יותר משנייה, ולכן הוא נדחה
+    לשימוש הראשון (או ל-warm_up ברקע) במקום לעכב את עליית התהליך.
+    """
+    from web3 import Web3
+
+    return Web3
+
+
+def to_checksum_address(address: str) -> str:
+    return load_web3().to_checksum_address(address)
+
 
 def _get_w3() -> Optional[Web3]:
     global _w3
@@ -22,7 +67,15 @@ def _get_w3() -> Optional[Web3]:
         return None
 
     try:
-        _w3 = Web3(Web3.HTTPProvider(settings.BSC_RPC_URL))
+        Web3 = load_web3()
+        _w3 = Web3(
+            Web3.HTTPProvider(
+                settings.BSC_RPC_URL,
+                request_kwargs={"timeout": settings.BSC_RPC_TIMEOUT_SEC},
+            )
+        )
+        _w3.middleware_onion.add(metrics.web3_middleware, "slh_metrics")
+        _w3.middleware_onion.add(tracing.web3_middleware, "slh_tracing")
         if not _w3.is_connected():
             logger.warning("Web3 could not connect to BSC RPC at %s", settings.BSC_RPC_URL)
             _w3 = None
@@ -33,6 +86,19 @@ def _get_w3() -> Optional[Web3]:
     return _w3
 
 
+def get_w3() -> Optional[Web3]:
+    """Web3 client משותף לכל התהליך (או None אם RPC לא מוגדר)."""
+    return _get_w3()
+
+
+def warm_up() -> bool:
+    """web3 + חיבור ל-RPC + חוזה הטוקן, לפני הבקשה הראשונה שצריכה אותם."""
+    if _get_w3() is None:
+        return False
+    _get_token_contract()
+    return True
+
+
 def _get_token_contract():
     global _token_contract
     if _token_contract is not None:
@@ -43,18 +109,9 @@ def _get_token_contract():
         return None
 
     try:
-        abi = [
-            {
-                "constant": True,
-                "inputs": [{"name": "account", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"name": "", "type": "uint256"}],
-                "type": "function",
-            }
-        ]
         _token_contract = w3.eth.contract(
-            address=Web3.to_checksum_address(settings.SLH_TOKEN_ADDRESS),
-            abi=abi,
+            address=to_checksum_address(settings.SLH_TOKEN_ADDRESS),
+            abi=ERC20_ABI,
         )
     except Exception as e:
         logger.exception("Error creating token contract: %s", e)
@@ -64,39 +121,357 @@ def _get_token_contract():
 
 
 def get_onchain_balances(address: str) -> Optional[Dict[str, Decimal]]:
-    """מחזיר מילון עם BNB ו-SLH לפי כתובת, או None אם אי אפשר לחשב."""
+    """
+    מחזיר מילון עם BNB ו-SLH לפי כתובת, או None אם אי אפשר לחשב.
+
+    כל נכס נשמר במטמון מתויג-בלוק משלו (ראו get_onchain_balance).
+    """
     if not address:
         return None
 
+    if _get_w3() is None:
+        return None
+
+    try:
+        to_checksum_address(address)
+    except Exception:
+        logger.warning("Invalid BNB address for on-chain balance: %s", address)
+        return None
+
+    return {
+        "bnb": get_onchain_balance(address, "bnb"),
+        "slh": get_onchain_balance(address, "slh"),
+    }
+
+
+def get_onchain_balance(address: str, asset: str) -> Optional[Decimal]:
+    """
+    יתרה של נכס אחד ("bnb" / "slh") לכתובת, או None – כדי שמסך יוכל לקרוא
+    את שני הנכסים במקביל.
+
+    מטמון מתויג-בלוק לכל נכס: SLH תקף עד שאירוע Transfer של הטוקן נוגע
+    בכתובת; BNB תקף CHAIN_CACHE_BNB_MAX_AGE_BLOCKS בלוקים (העברות BNB
+    לא נראות ב-eth_getLogs, וסריקת בלוקים מלאים בכל בלוק יקרה מדי).
+    """
+    if not address or (asset == "slh" and not settings.SLH_TOKEN_ADDRESS):
+        return None
+
     w3 = _get_w3()
     if w3 is None:
         return None
 
     try:
-        checksum = Web3.to_checksum_address(address)
+        checksum = to_checksum_address(address)
     except Exception:
         logger.warning("Invalid BNB address for on-chain balance: %s", address)
         return None
 
-    bnb: Optional[Decimal] = None
-    slh: Optional[Decimal] = None
+    cache = _balance_caches[asset]
+    block = _block_tracker.current_block() if settings.CHAIN_CACHE_ENABLED else None
+    if block is not None:
+        cached = cache.get(checksum, block)
+        if cached is not None:
+            return cached
+
+    value = _fetch_balance(w3, checksum, asset)
+    # קריאה שנכשלה (None) לא נשמרת – שהבקשה הבאה תנסה שוב
+    if block is not None and value is not None:
+        cache.put(checksum, block, value)
+    return value
+
+
+def _fetch_balance(w3: Web3, checksum: str, asset: str) -> Optional[Decimal]:
+    if asset == "bnb":
+        try:
+            wei = w3.eth.get_balance(checksum)
+            return Decimal(wei) / Decimal(10**18)
+        except Exception as e:
+            logger.warning("Failed to fetch BNB balance: %s", e)
+            return None
 
-    # BNB balance
+    # SLH token balance
+    if not settings.SLH_TOKEN_ADDRESS:
+        return None
     try:
-        wei = w3.eth.get_balance(checksum)
-        bnb = Decimal(wei) / Decimal(10**18)
+        contract = _get_token_contract()
+        if contract is None:
+            return None
+        raw = contract.functions.balanceOf(checksum).call()
+        decimals = int(settings.SLH_TOKEN_DECIMALS or 18)
+        return Decimal(raw) / Decimal(10**decimals)
     except Exception as e:
-        logger.warning("Failed to fetch BNB balance: %s", e)
+        logger.warning("Failed to fetch SLH token balance: %s", e)
+        return None
 
-    # SLH token balance
-    if settings.SLH_TOKEN_ADDRESS:
+
+# ===== Block-aware balance cache =====
+
+
+def get_touched_addresses(from_block: int, to_block: int) -> set[str]:
+    """
+    כל הכתובות (checksum) שאירועי Transfer של הטוקן בטווח נגעו ביתרת
+    ה-SLH שלהן – קריאת eth_getLogs אחת לכל הטווח.
+    """
+    w3 = _get_w3()
+    if w3 is None or not settings.SLH_TOKEN_ADDRESS:
+        return set()
+
+    logs = w3.eth.get_logs(
+        {
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": to_checksum_address(settings.SLH_TOKEN_ADDRESS),
+            "topics": [TRANSFER_TOPIC],
+        }
+    )
+    touched: set[str] = set()
+    for log in logs:
+        for topic in log["topics"][1:3]:
+            touched.add(to_checksum_address(_to_hex(topic)[-40:]))
+    return touched
+
+
+def _on_new_blocks(old: int, new: int) -> None:
+    # BNB נפסל רק לפי גיל (max_age_blocks של המטמון) – אין סריקה
+    slh_cache = _balance_caches["slh"]
+
+    # אין מה לפסול – לא משלמים על סריקה
+    if len(slh_cache) == 0:
+        slh_cache.clear(block=new)
+        return
+
+    if new - old > int(settings.CHAIN_CACHE_MAX_SCAN_BLOCKS):
+        slh_cache.clear(block=new)
+        return
+
+    try:
+        touched = get_touched_addresses(old + 1, new)
+    except Exception as e:
+        logger.warning("Token log scan %s-%s failed, dropping SLH cache: %s", old + 1, new, e)
+        slh_cache.clear(block=new)
+        return
+
+    slh_cache.invalidate(touched, block=new)
+
+
+def _fetch_block_number() -> Optional[int]:
+    w3 = _get_w3()
+    return int(w3.eth.block_number) if w3 is not None else None
+
+
+_block_tracker = BlockTracker(
+    fetch_block_number=_fetch_block_number,
+    on_new_blocks=_on_new_blocks,
+    interval_sec=settings.BLOCK_POLL_INTERVAL_SEC,
+)
+_balance_caches = {
+    "bnb": BlockTaggedCache(
+        max_entries=settings.CHAIN_CACHE_MAX_ENTRIES,
+        max_age_blocks=settings.CHAIN_CACHE_BNB_MAX_AGE_BLOCKS,
+        name="chain_balances_bnb",
+    ),
+    "slh": BlockTaggedCache(
+        max_entries=settings.CHAIN_CACHE_MAX_ENTRIES,
+        max_age_blocks=settings.CHAIN_CACHE_MAX_AGE_BLOCKS,
+        name="chain_balances_slh",
+    ),
+}
+
+
+def note_touched(addresses) -> None:
+    """
+    דיווח חיצוני (סורק הפקדות / מנוע תשלומים) על כתובות שיתרתן השתנתה.
+    """
+    keys = set()
+    for addr in addresses:
         try:
-            contract = _get_token_contract()
-            if contract is not None:
-                raw = contract.functions.balanceOf(checksum).call()
-                decimals = int(settings.SLH_TOKEN_DECIMALS or 18)
-                slh = Decimal(raw) / Decimal(10**decimals)
+            keys.add(to_checksum_address(addr))
+        except Exception:
+            continue
+    # השינוי קרה בבלוק שעוד לא ראינו – קריאות מתויגות בבלוק הנוכחי לא יישמרו
+    block = _block_tracker.block
+    for cache in _balance_caches.values():
+        cache.invalidate(keys, block=block + 1 if block is not None else None)
+
+
+def start_block_tracker() -> None:
+    if settings.CHAIN_CACHE_ENABLED and settings.BSC_RPC_URL:
+        _block_tracker.start()
+
+
+async def stop_block_tracker() -> None:
+    await _block_tracker.stop()
+
+
+# ===== Transfers scanning (used by the deposit watcher) =====
+#
+# בניגוד ל-get_onchain_balances, הפונקציות כאן זורקות חריגה על שגיאת RPC –
+# הסורק צריך לדעת שהטווח לא נסרק כדי לא לקדם את ה-cursor.
+
+
+def _address_topic(address: str) -> str:
+    return "0x" + "0" * 24 + to_checksum_address(address)[2:].lower()
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value, "big") if value else 0
+    if isinstance(value, str):
+        return int(value, 16) if value not in ("", "0x") else 0
+    return int(value)
+
+
+def _to_hex(value: Any) -> str:
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    value = str(value)
+    return value if value.startswith("0x") else "0x" + value
+
+
+def get_block_number() -> Optional[int]:
+    w3 = _get_w3()
+    if w3 is None:
+        return None
+    return int(w3.eth.block_number)
+
+
+def get_token_transfers_to(
+    address: str, from_block: int, to_block: int
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    מחזיר את כל אירועי Transfer של טוקן SLH אל הכתובת בטווח הבלוקים
+    (כולל), או None אם RPC / טוקן לא מוגדרים.
+    """
+    w3 = _get_w3()
+    if w3 is None or not settings.SLH_TOKEN_ADDRESS:
+        return None
+
+    logs = w3.eth.get_logs(
+        {
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": to_checksum_address(settings.SLH_TOKEN_ADDRESS),
+            "topics": [TRANSFER_TOPIC, None, _address_topic(address)],
+        }
+    )
+
+    decimals = int(settings.SLH_TOKEN_DECIMALS or 18)
+    transfers: List[Dict[str, Any]] = []
+    for log in logs:
+        topics = log["topics"]
+        sender = to_checksum_address(_to_hex(topics[1])[-40:])
+        transfers.append(
+            {
+                "asset": "SLH",
+                "tx_hash": _to_hex(log["transactionHash"]),
+                "log_index": int(log["logIndex"]),
+                "block_number": int(log["blockNumber"]),
+                "from_address": sender,
+                "amount": Decimal(_to_int(log["data"])) / Decimal(10**decimals),
+            }
+        )
+    return transfers
+
+
+def get_native_transfers_to(
+    address: str, from_block: int, to_block: int
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    מחזיר העברות BNB ישירות (value > 0) אל הכתובת בטווח הבלוקים (כולל).
+    """
+    w3 = _get_w3()
+    if w3 is None:
+        return None
+
+    target = to_checksum_address(address)
+    transfers: List[Dict[str, Any]] = []
+    for number in range(from_block, to_block + 1):
+        block = w3.eth.get_block(number, full_transactions=True)
+        for tx in block["transactions"]:
+            to = tx.get("to")
+            if not to or to_checksum_address(to) != target:
+                continue
+            value = int(tx.get("value") or 0)
+            if value <= 0:
+                continue
+            # טרנזקציה שנכשלה לא מעבירה value – בודקים receipt רק להתאמות
+            receipt = w3.eth.get_transaction_receipt(tx["hash"])
+            if int(receipt.get("status", 1)) != 1:
+                continue
+            transfers.append(
+                {
+                    "asset": "BNB",
+                    "tx_hash": _to_hex(tx["hash"]),
+                    "log_index": -1,
+                    "block_number": number,
+                    "from_address": to_checksum_address(tx["from"]),
+                    "amount": Decimal(value) / Decimal(10**18),
+                }
+            )
+    return transfers
+
+
+# ===== Batched JSON-RPC =====
+
+
+def rpc_batch(w3: Web3, calls: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    שולח כמה קריאות JSON-RPC בבקשת HTTP אחת (batch) ומחזיר תשובות
+    לפי הסדר: כל תשובה היא {"result": ...} או {"error": ...}.
+    שגיאה של ה-batch עצמו (לא של הקריאה) מסומנת – ראו rpc_unknown().
+
+    web3 v6 לא תומך ב-batch, לכן מול HTTPProvider שולחים ישירות עם httpx.
+    מול provider אחר (למשל eth-tester בבדיקות) – קריאות רגילות בזו אחר זו.
+    """
+    if not calls:
+        return []
+
+    provider = w3.provider
+    endpoint = getattr(provider, "endpoint_uri", None)
+
+    if isinstance(provider, load_web3().HTTPProvider) and endpoint:
+        import httpx
+
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        label = "batch:" + calls[0][0]
+        started = time.perf_counter()
+        failed = True
+        try:
+            with tracing.span(
+                f"rpc {label}", tracing.KIND_CLIENT, **{"rpc.batch_size": len(calls)}
+            ):
+                resp = httpx.post(str(endpoint), json=payload, timeout=30)
+            resp.raise_for_status()
+            failed = False
+        finally:
+            metrics.observe_rpc(label, time.perf_counter() - started, failed)
+        body = resp.json()
+        if isinstance(body, dict):
+            # חלק מה-nodes מחזירים שגיאה אחת לכל ה-batch
+            error = body.get("error") or body
+            return [{"error": error, "transport": True} for _ in calls]
+        by_id = {item.get("id"): item for item in body}
+        missing = {"error": "missing response", "transport": True}
+        return [by_id.get(i, missing) for i in range(len(calls))]
+
+    results: List[Dict[str, Any]] = []
+    for method, params in calls:
+        try:
+            resp = provider.make_request(method, params)
+            results.append(resp if isinstance(resp, dict) else {"result": resp})
+        except (OSError, TimeoutError) as e:
+            results.append({"error": str(e), "transport": True})
         except Exception as e:
-            logger.warning("Failed to fetch SLH token balance: %s", e)
+            results.append({"error": str(e)})
+    return results
+
 
-    return {"bnb": bnb, "slh": slh}
+def rpc_unknown(resp: Dict[str, Any]) -> bool:
+    """
+    השגיאה לא באה מה-node על הקריאה הזו (שגיאת batch, תשובה חסרה, רשת):
+    לא ידוע מה קרה – לנסות שוב, לא להתייחס כאל דחייה.
+    """
+    return bool(resp.get("transport"))
@@ -1,4 +1,6 @@
 # app/bot/investor_wallet_bot.py
+import asyncio
+import io
 import logging
 
 # --- SLH SAFETY: ignore non-private updates at webhook (groups/channels) ---
@@ -19,7 +21,9 @@ def _slh_is_private_update(payload: dict) -> bool:
         return True
     except Exception:
         return True
+from datetime import datetime, timezone
 from decimal import Decimal
+from typing import Any, Dict
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Bot
 from telegram.ext import (
@@ -28,15 +32,29 @@ from telegram.ext import (
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
+    ExtBot,
+    TypeHandler,
     filters,
 )
-from sqlalchemy import or_
+from sqlalchemy import func, or_
 
 from app.core.config import settings
-from app.database import SessionLocal
+from app.database import SessionLocal, engine
 from app import models, crud, blockchain
-from app.monitoring import run_selftest
-from app import i18n
+from app.monitoring import health_sampler
+from app.profiler import profiler, slow_updates, ProfilerBusy
+from app.loop_monitor import loop_monitor
+from app.stats import live_stats
+from app.render_cache import Rendered, render_cache, serialize_markup
+from app.user_state import user_states
+from app.send_scheduler import LANE_BULK, build_scheduler
+from app.rate_limit import build_rate_limiter
+from app.digest import MAX_MESSAGE_CHARS, log_digest
+from app.screen_router import ScreenRouter
+from app.dataloader import DataLoader, Source, available
+from app.broadcast import broadcasts, parse_variants
+from app import i18n, metrics, screens, telegram_http, tracing
+from app.query_budget import query_budget
 
 logger = logging.getLogger(__name__)
 
@@ -45,17 +63,28 @@ STATE_AWAITING_TRANSFER_TARGET = "AWAITING_TRANSFER_TARGET"
 STATE_AWAITING_TRANSFER_AMOUNT = "AWAITING_TRANSFER_AMOUNT"
 
 
+def _log_chat_id(chat_id: str) -> int | str:
+    # מזהה קבוצה / ערוץ מספרי (-100...) או @username
+    try:
+        return int(chat_id)
+    except ValueError:
+        return chat_id
+
+
 class InvestorWalletBot:
     def __init__(self):
         self.application: Application | None = None
         self.bot: Bot | None = None
+        self.log_bot: Bot | None = None
+        self.broadcast_bot: Bot | None = None
+        self.screen_router = ScreenRouter()
 
     # ===== DB helper =====
 
     def _db(self):
         return SessionLocal()
 
-    # ===== Language helper (in-memory preferred language) =====
+    # ===== Language helper (persisted preferred language) =====
 
     def _get_lang(
         self,
@@ -63,14 +92,14 @@ class InvestorWalletBot:
         context: ContextTypes.DEFAULT_TYPE | None = None,
     ) -> str:
         """
-        أ—آ§أ—â€¢أ—â€کأ—آ¢ أ—ع¯أ—ع¾ أ—â€‌أ—آ©أ—آ¤أ—â€‌ أ—آ¢أ—â€کأ—â€¢أ—آ¨ أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ©:
-        1. أ—ع¯أ—â€Œ أ—â„¢أ—آ© override أ—â€ک-context.user_data["lang"] أ¢â‚¬â€œ أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ©أ—â„¢أ—â€Œ أ—â€کأ—â€¢.
-        2. أ—ع¯أ—â€”أ—آ¨أ—ع¾ أ—إ“أ—آ¤أ—â„¢ language_code أ—â€چأ—ع©أ—إ“أ—â€™أ—آ¨أ—â€Œ.
-        3. أ—ع¯أ—â€”أ—آ¨أ—ع¾ DEFAULT_LANGUAGE.
+        קובע את השפה עבור משתמש:
+        1. אם בחר שפה ב-/language (user_states) – משתמשים בה.
+        2. אחרת לפי language_code מטלגרם.
+        3. אחרת DEFAULT_LANGUAGE.
         """
         override = None
-        if context is not None:
-            override = context.user_data.get("lang")
+        if tg_user is not None:
+            override = user_states.get(tg_user.id).lang
 
         if override:
             return i18n.normalize_lang(override)
@@ -78,6 +107,20 @@ class InvestorWalletBot:
         raw = getattr(tg_user, "language_code", None) or settings.DEFAULT_LANGUAGE
         return i18n.normalize_lang(raw)
 
+    async def _load_user_state(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        if update.effective_user is not None:
+            await user_states.load(update.effective_user.id)
+
+    def _catalog(
+        self,
+        tg_user,
+        context: ContextTypes.DEFAULT_TYPE | None = None,
+    ) -> i18n.Catalog:
+        """catalog מקומפל לשפת המשתמש – פעם אחת ל-update."""
+        return i18n.catalog(self._get_lang(tg_user, context))
+
     # ===== User helper (with is_new flag) =====
 
     def _get_or_create_user_with_flag(
@@ -127,184 +170,259 @@ class InvestorWalletBot:
         user, _ = self._get_or_create_user_with_flag(tg_user)
         return user
 
-    async def _log_new_investor(
-        self, tg_user, user: models.User
-    ) -> None:
+    def _log_new_investor(self, tg_user, user: models.User) -> None:
         """
-        أ—إ“أ—â€¢أ—â€™ أ—آ¢أ—إ“ أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ© أ—â€”أ—â€œأ—آ© أ—إ“أ—آ§أ—â€کأ—â€¢أ—آ¦أ—â€‌/أ—آ¢أ—آ¨أ—â€¢أ—آ¥ أ—آ©أ—â€چأ—â€¢أ—â€™أ—â€œأ—آ¨ أ—â€ک-LOG_NEW_USERS_CHAT_ID.
-        أ—آ¨أ—آ¥ أ—آ¨أ—آ§ أ—â€؛أ—ع¯أ—آ©أ—آ¨ أ—â€‌أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ© أ—آ أ—â€¢أ—آ¦أ—آ¨ أ—آ¢أ—â€؛أ—آ©أ—â„¢أ—â€¢ (is_new=True).
+        משקיע חדש -> digest לערוץ LOG_NEW_USERS_CHAT_ID.
+        רק מוסיף לתור בזיכרון – /start לא מחכה לשליחה.
         """
         chat_id = settings.LOG_NEW_USERS_CHAT_ID
         if not chat_id:
             return
 
-        if not self.application or not self.application.bot:
-            logger.warning(
-                "Cannot log new investor أ¢â‚¬â€œ application.bot is not ready"
-            )
-            return
-
-        target_chat = chat_id
-        # أ—آ أ—آ أ—طŒأ—â€‌ أ—إ“أ—â€‌أ—â€چأ—â„¢أ—آ¨ أ—إ“-int أ—ع¯أ—â€Œ أ—â€“أ—â€‌ أ—â€چأ—طŒأ—آ¤أ—آ¨ (أ—â€؛أ—â€¢أ—إ“أ—إ“ أ—آ¢أ—آ¨أ—â€¢أ—آ¦أ—â„¢ -100...)
-        try:
-            target_chat = int(chat_id)
-        except ValueError:
-            # أ—ع¯أ—â€Œ أ—â€“أ—â€‌ أ—إ“أ—ع¯ أ—â€چأ—طŒأ—آ¤أ—آ¨, أ—آ أ—آ©أ—ع¯أ—â„¢أ—آ¨ أ—â€چأ—â€”أ—آ¨أ—â€¢أ—â€“أ—ع¾
-            pass
-
-        lines: list[str] = []
-        lines.append("ظ‹ع؛â€ â€¢ New investor in SLH Global Investments")
-        lines.append(f"Telegram ID: {tg_user.id}")
-        if tg_user.username:
-            lines.append(f"Username: @{tg_user.username}")
-        else:
-            lines.append("Username: N/A")
-        lines.append(f"BNB address: {user.bnb_address or 'Not linked yet'}")
-        lines.append(f"SLH balance: {(user.balance_slh or 0):.4f} SLH")
-
-        try:
-            await self.application.bot.send_message(
-                chat_id=target_chat,
-                text="\n".join(lines),
-            )
-        except Exception as e:
-            logger.warning("Failed to send new investor log: %s", e)
+        username = f"@{tg_user.username}" if tg_user.username else "N/A"
+        lines = [
+            f"Telegram ID: {tg_user.id} ({username})",
+            f"BNB address: {user.bnb_address or 'Not linked yet'}",
+            f"SLH balance: {(user.balance_slh or 0):.4f} SLH",
+        ]
+        log_digest.add(
+            _log_chat_id(chat_id),
+            "new_investor",
+            "🆕 New investors in SLH Global Investments",
+            "\n".join(lines),
+        )
 
     # ===== Initialization =====
 
-    async def initialize(self):
-        if not settings.BOT_TOKEN:
-            logger.warning(
-                "BOT_TOKEN is not set, skipping Telegram bot initialization"
+    def _build(self) -> None:
+        """Application + handlers + bots ללוג / broadcast, בלי רשת."""
+        # כל קריאות ה-Bot API עוברות דרך ה-scheduler (מגבלות טלגרם, עדיפויות, 429)
+        scheduler = build_scheduler()
+        application = (
+            Application.builder()
+            .token(settings.BOT_TOKEN)
+            .request(
+                telegram_http.build_request("replies", settings.TELEGRAM_POOL_SIZE)
             )
-            return
-
-        self.application = Application.builder().token(settings.BOT_TOKEN).build()
-        self.bot = self.application.bot
+            .get_updates_request(
+                telegram_http.build_request(
+                    "updates", settings.TELEGRAM_UPDATES_POOL_SIZE
+                )
+            )
+            .rate_limiter(scheduler)
+            .build()
+        )
+        # הודעות לערוצי הלוג לא מחכות בתור מאחורי תשובות למשתמשים (ולהפך)
+        log_bot = ExtBot(
+            settings.BOT_TOKEN,
+            request=telegram_http.build_request(
+                "log", settings.TELEGRAM_LOG_POOL_SIZE
+            ),
+            rate_limiter=scheduler.lane(LANE_BULK) if scheduler else None,
+        )
+        # broadcast לכל המשקיעים – pool משלו, באותו נתיב bulk
+        broadcast_bot = ExtBot(
+            settings.BOT_TOKEN,
+            request=telegram_http.build_request(
+                "broadcast", settings.BROADCAST_WORKERS
+            ),
+            rate_limiter=scheduler.lane(LANE_BULK) if scheduler else None,
+        )
 
         # Commands
-        self.application.add_handler(CommandHandler("start", self.cmd_start))
-        self.application.add_handler(CommandHandler("help", self.cmd_help))
-        self.application.add_handler(CommandHandler("menu", self.cmd_menu))
-        self.application.add_handler(CommandHandler("wallet", self.cmd_wallet))
-        self.application.add_handler(
+        application.add_handler(CommandHandler("start", self.cmd_start))
+        application.add_handler(CommandHandler("help", self.cmd_help))
+        application.add_handler(CommandHandler("menu", self.cmd_menu))
+        application.add_handler(CommandHandler("wallet", self.cmd_wallet))
+        application.add_handler(
             CommandHandler("link_wallet", self.cmd_link_wallet)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("balance", self.cmd_balance)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("onchain_balance", self.cmd_onchain_balance)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("history", self.cmd_history)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("transfer", self.cmd_transfer)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("send_slh", self.cmd_send_slh)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("whoami", self.cmd_whoami)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("summary", self.cmd_summary)
         )
-        self.application.add_handler(CommandHandler("docs", self.cmd_docs))
+        application.add_handler(CommandHandler("docs", self.cmd_docs))
 
         # Future economic-engine modules (placeholders with i18n 'coming soon')
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("staking", self.cmd_staking)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("signals", self.cmd_signals)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("academy", self.cmd_academy)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("referrals", self.cmd_referrals)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("reports", self.cmd_reports)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("portfolio_pro", self.cmd_portfolio_pro)
         )
 
         # NEW: language selector
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("language", self.cmd_language)
         )
 
         # NEW: quick health check command (أ—إ“أ—â€؛أ—â€¢أ—إ“أ—â€Œ)
-        self.application.add_handler(CommandHandler("ping", self.cmd_ping))
+        application.add_handler(CommandHandler("ping", self.cmd_ping))
 
         # Admin-only commands
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("admin_credit", self.cmd_admin_credit)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("admin_menu", self.cmd_admin_menu)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("admin_list_users", self.cmd_admin_list_users)
         )
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("admin_ledger", self.cmd_admin_ledger)
         )
+        application.add_handler(
+            CommandHandler("admin_payout", self.cmd_admin_payout)
+        )
+        application.add_handler(
+            CommandHandler("admin_broadcast", self.cmd_admin_broadcast)
+        )
+        application.add_handler(
+            CommandHandler("admin_broadcast_send", self.cmd_admin_broadcast_send)
+        )
+        application.add_handler(
+            CommandHandler("admin_broadcast_cancel", self.cmd_admin_broadcast_cancel)
+        )
+        application.add_handler(
+            CommandHandler("admin_broadcast_status", self.cmd_admin_broadcast_status)
+        )
 
         # NEW: admin self-test command
-        self.application.add_handler(
+        application.add_handler(
             CommandHandler("admin_selftest", self.cmd_admin_selftest)
         )
+        application.add_handler(
+            CommandHandler("admin_profile", self.cmd_admin_profile)
+        )
+        application.add_handler(
+            CommandHandler("admin_stats", self.cmd_admin_stats)
+        )
+
+        # כפתורי MENU_ / WALLET_: אותן פונקציות render של הפקודות, עריכה במקום
+        for data, name, render in (
+            ("MENU_SUMMARY", "summary", self._screen_summary),
+            ("MENU_BALANCE", "balance", self._screen_balance),
+            ("MENU_WALLET", "wallet", self._screen_wallet),
+            ("MENU_LINK_WALLET", "link_wallet", self._screen_link_wallet),
+            ("MENU_HISTORY", "history", self._screen_history),
+            ("MENU_TRANSFER", "transfer", self._screen_transfer),
+            ("MENU_DOCS", "docs", self._screen_docs),
+            ("WALLET_BALANCE", "balance", self._screen_balance),
+            ("WALLET_DETAILS", "wallet", self._screen_wallet),
+            ("WALLET_BUY_BNB", "buy_bnb", self._screen_buy_bnb),
+        ):
+            self.screen_router.add(data, name, render)
 
         # Callback for inline buttons أ¢â‚¬â€œ أ—â€چأ—آ©أ—آ§أ—â„¢أ—آ¢أ—â„¢أ—â€Œ
-        self.application.add_handler(
+        application.add_handler(
             CallbackQueryHandler(self.cb_wallet_menu, pattern=r"^WALLET_")
         )
-        self.application.add_handler(
+        application.add_handler(
             CallbackQueryHandler(self.cb_main_menu, pattern=r"^MENU_")
         )
 
         # Callback أ—إ“أ—آ©أ—آ¤أ—â€‌
-        self.application.add_handler(
+        application.add_handler(
             CallbackQueryHandler(self.cb_language, pattern=r"^LANG_")
         )
 
         # Callback أ—إ“أ—ع¯أ—â€œأ—â€چأ—â„¢أ—ع؛
-        self.application.add_handler(
+        application.add_handler(
             CallbackQueryHandler(self.cb_admin_menu, pattern=r"^ADMIN_")
         )
 
         # Generic text handler (for address / amounts / usernames)
-        self.application.add_handler(
+        application.add_handler(
             MessageHandler(
                 filters.TEXT & ~filters.COMMAND,
                 self.handle_text,
             )
         )
 
-        # أ—â€”أ—â€¢أ—â€کأ—â€‌ أ—â€ک-ptb v21 أ—إ“أ—آ¤أ—آ أ—â„¢ process_update
-        await self.application.initialize()
+        metrics.instrument_handlers(application)
 
-        # Webhook mode
-        if settings.WEBHOOK_URL:
-            webhook_url = (
-                f"{settings.WEBHOOK_URL.rstrip('/')}/webhook/telegram"
+        # הגבלת קצב למשתמש לפני כל handler (קבוצה -2). נרשם אחרי
+        # instrument_handlers – update שנחסם לא נמדד כ-handler
+        rate_limiter = build_rate_limiter()
+        if rate_limiter is not None:
+            application.add_handler(
+                TypeHandler(Update, rate_limiter.throttle), group=-2
             )
-            await self.bot.set_webhook(webhook_url)
-            logger.info(f"Webhook set to: {webhook_url}")
-        else:
-            logger.info(
-                "No WEBHOOK_URL set - you can run in polling mode locally"
+        # מצב השיחה נטען ב-thread לפני ה-handler (קבוצה -1), כך ש-_get_lang
+        # ו-user_states.get() בתוך ה-handler לא ניגשים ל-DB על ה-event loop
+        application.add_handler(TypeHandler(Update, self._load_user_state), group=-1)
+
+        self.application = application
+        self.bot = application.bot
+        self.log_bot = log_bot
+        self.broadcast_bot = broadcast_bot
+
+    async def initialize(self):
+        if not settings.BOT_TOKEN:
+            logger.warning(
+                "BOT_TOKEN is not set, skipping Telegram bot initialization"
             )
+            return
+
+        # warmup מנסה שוב אחרי getMe שנכשל: ה-Application, ה-scheduler וה-HTTP
+        # clients נבנים פעם אחת, ורק initialize() (getMe) רץ שוב
+        if self.application is None:
+            self._build()
+
+        # أ—â€”أ—â€¢أ—â€کأ—â€‌ أ—â€ک-ptb v21 أ—إ“أ—آ¤أ—آ أ—â„¢ process_update
+        await asyncio.gather(
+            self.application.initialize(),
+            self.log_bot.initialize(),
+            self.broadcast_bot.initialize(),
+        )
+        log_digest.bind(
+            lambda chat_id, text: self.log_bot.send_message(chat_id=chat_id, text=text)
+        )
+        broadcasts.bind(
+            lambda chat_id, text: self.broadcast_bot.send_message(
+                chat_id=chat_id, text=text
+            )
+        )
+
+        # setWebhook נעשה ב-app.leader (פעם אחת לכל deploy, רק אם השתנה)
 
         logger.info("InvestorWalletBot initialized")
 
     # ===== Helpers =====
 
+    async def _reply_screen(self, update: Update, screen: Rendered) -> None:
+        await update.message.reply_text(screen.text, reply_markup=screen.markup)
+
     def _slh_price_nis(self) -> Decimal:
         """أ—â€چأ—â€”أ—â„¢أ—آ¨ SLH أ—â€کأ—آ أ—â„¢أ—طŒ (أ—â€کأ—آ¨أ—â„¢أ—آ¨أ—ع¾ أ—â€چأ—â€”أ—â€œأ—إ“: 444) أ—â€؛-Decimal."""
         try:
@@ -405,45 +523,33 @@ class InvestorWalletBot:
         finally:
             db.close()
 
-    async def _log_referral_event(
+    def _log_referral_event(
         self,
         new_tg_user,
         referrer_tid: int,
         reward: Decimal,
     ) -> None:
-        """
-        أ—آ©أ—â€¢أ—إ“أ—â€” أ—â€‌أ—â€¢أ—â€œأ—آ¢أ—â€‌ أ—إ“أ—آ§أ—â€کأ—â€¢أ—آ¦أ—ع¾ REFERRAL_LOGS_CHAT_ID أ—آ¢أ—إ“ أ—آ¨أ—آ¤أ—آ¨أ—آ¨أ—إ“ أ—â€”أ—â€œأ—آ©.
-        """
+        """רפרל חדש -> digest לערוץ REFERRAL_LOGS_CHAT_ID."""
         chat_id = settings.REFERRAL_LOGS_CHAT_ID
         if not chat_id:
             return
-        if not self.application or not self.application.bot:
-            return
-
-        try:
-            target_chat = int(chat_id)
-        except ValueError:
-            target_chat = chat_id
 
         uname = (
             f"@{new_tg_user.username}"
             if getattr(new_tg_user, "username", None)
             else "N/A"
         )
-
-        lines: list[str] = []
-        lines.append("ظ‹ع؛عکظ¾ New referral registered")
-        lines.append(f"New user: {new_tg_user.id} ({uname})")
-        lines.append(f"Referrer: {referrer_tid}")
-        lines.append(f"Reward credited: {reward:.8f} SLHA (to referrer + new user)")
-
-        try:
-            await self.application.bot.send_message(
-                chat_id=target_chat,
-                text="\n".join(lines),
-            )
-        except Exception as e:
-            logger.warning("Failed to send referral log: %s", e)
+        lines = [
+            f"New user: {new_tg_user.id} ({uname})",
+            f"Referrer: {referrer_tid}",
+            f"Reward credited: {reward:.8f} SLHA (to referrer + new user)",
+        ]
+        log_digest.add(
+            _log_chat_id(chat_id),
+            "referral",
+            "🎯 New referrals registered",
+            "\n".join(lines),
+        )
 
     def _coming_soon_text(self, tg_user, context, module_key: str) -> str:
         """
@@ -452,10 +558,10 @@ class InvestorWalletBot:
             MODULE_NAME_STAKING / MODULE_NAME_SIGNALS / MODULE_NAME_ACADEMY /
             MODULE_NAME_REFERRALS / MODULE_NAME_REPORTS / MODULE_NAME_PORTFOLIO
         """
-        lang = self._get_lang(tg_user, context)
-        module_name = i18n.t(lang, module_key)
-        title = i18n.t(lang, "COMING_SOON_TITLE")
-        body = i18n.t(lang, "COMING_SOON_BODY").format(module=module_name)
+        cat = self._catalog(tg_user, context)
+        module_name = cat[module_key]
+        title = cat["COMING_SOON_TITLE"]
+        body = cat.format("COMING_SOON_BODY", module=module_name)
         return f"{title}\n\n{body}"
 
     # ===== Menus (inline keyboards) =====
@@ -542,21 +648,53 @@ class InvestorWalletBot:
             ]
         )
 
+    # ===== Static screens (render_cache) =====
+
+    def _render_start_head(self, cat: i18n.Catalog) -> Rendered:
+        min_invest = 100_000
+        lines = [
+            cat["START_TITLE"],
+            "",
+            cat.format("START_INTRO_MIN_INVEST", min_invest=min_invest),
+            "",
+            cat["START_FEATURES_INTRO"],
+            cat["START_FEATURE_1"],
+            cat["START_FEATURE_2"],
+            cat["START_FEATURE_3"],
+            cat["START_FEATURE_4"],
+            "",
+            cat["START_NEXT_STEPS_TITLE"],
+        ]
+        return Rendered("\n".join(lines))
+
+    def _render_start_tail(self, cat: i18n.Catalog) -> Rendered:
+        lines = [
+            cat["START_STEP_WALLET"],
+            cat["START_STEP_WHOAMI"],
+            cat["START_STEP_SUMMARY"],
+            cat["START_STEP_HISTORY"],
+            "",
+            cat["START_FOOTER_MENU"],
+            cat["START_FOOTER_LANGUAGE"],
+        ]
+        return Rendered("\n".join(lines))
+
     # ===== Commands =====
 
+    @query_budget(7)
     async def cmd_start(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         """أ—â€”أ—â€¢أ—â€¢أ—â„¢أ—â„¢أ—ع¾ أ—â€‌أ—آ¨أ—آ©أ—â€چأ—â€‌: أ—â€چأ—طŒأ—ع‘ أ—آ¤أ—ع¾أ—â„¢أ—â€”أ—â€‌ + أ—â€‌أ—طŒأ—â€کأ—آ¨ أ—â€چأ—â€‌ أ—آ¢أ—â€¢أ—آ©أ—â„¢أ—â€Œ أ—آ¢أ—â€؛أ—آ©أ—â„¢أ—â€¢, أ—آ¢أ—â€Œ i18n + أ—آ¨أ—آ¤أ—آ¨أ—آ¨أ—إ“."""
         tg_user = update.effective_user
-        lang = self._get_lang(tg_user, context)
+        cat = self._catalog(tg_user, context)
 
         # أ—â€؛أ—ع¯أ—ع؛ أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ©أ—â„¢أ—â€Œ أ—â€ک-is_new أ—â€؛أ—â€œأ—â„¢ أ—إ“أ—â€“أ—â€‌أ—â€¢أ—ع¾ أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ© أ—â€”أ—â€œأ—آ© أ—â€کأ—إ“أ—â€کأ—â€œ
         user, is_new = self._get_or_create_user_with_flag(tg_user)
 
         # أ—إ“أ—â€¢أ—â€™ أ—إ“أ—آ§أ—â€کأ—â€¢أ—آ¦أ—ع¾ أ—إ“أ—â€¢أ—â€™أ—â„¢أ—â€Œ أ—آ¨أ—آ§ أ—ع¯أ—â€Œ أ—â€‌أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ© أ—â€”أ—â€œأ—آ©
         if is_new:
-            await self._log_new_investor(tg_user, user)
+            self._log_new_investor(tg_user, user)
 
         # --- REFERRAL: /start ref_XXXX (أ—آ¤أ—â€¢أ—آ¢أ—إ“ أ—آ¨أ—آ§ أ—â€کأ—â€‌أ—آ¨أ—آ©أ—â€چأ—â€‌ أ—â€‌أ—آ¨أ—ع¯أ—آ©أ—â€¢أ—آ أ—â€‌) ---
         if is_new and context.args:
@@ -574,58 +712,40 @@ class InvestorWalletBot:
                         referrer_tid=referrer_tid,
                     )
                     if reward > 0:
-                        await self._log_referral_event(
+                        self._log_referral_event(
                             new_tg_user=tg_user,
                             referrer_tid=referrer_tid,
                             reward=reward,
                         )
 
-        min_invest = 100_000
         balance = user.balance_slh or Decimal("0")
         has_wallet = bool(user.bnb_address)
 
-        lines: list[str] = []
-        lines.append(i18n.t(lang, "START_TITLE"))
-        lines.append("")
-        lines.append(
-            i18n.t(lang, "START_INTRO_MIN_INVEST").format(
-                min_invest=min_invest
-            )
+        # החלקים הקבועים של המסך נבנים פעם אחת לכל שפה
+        head = render_cache.get(
+            "start_head", cat.lang, lambda: self._render_start_head(cat)
+        )
+        tail = render_cache.get(
+            "start_tail", cat.lang, lambda: self._render_start_tail(cat)
         )
-        lines.append("")
-        lines.append(i18n.t(lang, "START_FEATURES_INTRO"))
-        lines.append(i18n.t(lang, "START_FEATURE_1"))
-        lines.append(i18n.t(lang, "START_FEATURE_2"))
-        lines.append(i18n.t(lang, "START_FEATURE_3"))
-        lines.append(i18n.t(lang, "START_FEATURE_4"))
-        lines.append("")
-        lines.append(i18n.t(lang, "START_NEXT_STEPS_TITLE"))
+
+        lines: list[str] = [head.text]
 
         if not has_wallet:
-            lines.append(i18n.t(lang, "START_STEP_LINK_WALLET_MISSING"))
+            lines.append(cat["START_STEP_LINK_WALLET_MISSING"])
         else:
             lines.append(
-                i18n.t(lang, "START_STEP_LINK_WALLET_SET").format(
-                    bnb_address=user.bnb_address
-                )
+                cat.format("START_STEP_LINK_WALLET_SET", bnb_address=user.bnb_address)
             )
 
         if balance == Decimal("0"):
-            lines.append(i18n.t(lang, "START_STEP_BALANCE_ZERO"))
+            lines.append(cat["START_STEP_BALANCE_ZERO"])
         else:
             lines.append(
-                i18n.t(lang, "START_STEP_BALANCE_NONZERO").format(
-                    balance=balance
-                )
+                cat.format("START_STEP_BALANCE_NONZERO", balance=balance)
             )
 
-        lines.append(i18n.t(lang, "START_STEP_WALLET"))
-        lines.append(i18n.t(lang, "START_STEP_WHOAMI"))
-        lines.append(i18n.t(lang, "START_STEP_SUMMARY"))
-        lines.append(i18n.t(lang, "START_STEP_HISTORY"))
-        lines.append("")
-        lines.append(i18n.t(lang, "START_FOOTER_MENU"))
-        lines.append(i18n.t(lang, "START_FOOTER_LANGUAGE"))
+        lines.append(tail.text)
 
         await update.message.reply_text("\n".join(lines))
 
@@ -633,27 +753,41 @@ class InvestorWalletBot:
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         tg_user = update.effective_user
-        lang = self._get_lang(tg_user, context)
+        cat = self._catalog(tg_user, context)
 
-        title = i18n.t(lang, "HELP_TITLE")
-        body = i18n.t(lang, "HELP_BODY")
-        text = f"{title}\n\n{body}"
+        screen = render_cache.get(
+            "help",
+            cat.lang,
+            lambda: Rendered(f"{cat['HELP_TITLE']}\n\n{cat['HELP_BODY']}"),
+        )
 
-        await update.message.reply_text(text)
+        await update.message.reply_text(screen.text)
 
     async def cmd_menu(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         """أ—ع¾أ—آ¤أ—آ¨أ—â„¢أ—ع© أ—â€‌أ—â€؛أ—آ¤أ—ع¾أ—â€¢أ—آ¨أ—â„¢أ—â€Œ أ—â€‌أ—آ¨أ—ع¯أ—آ©أ—â„¢ أ—إ“أ—â€چأ—آ©أ—آ§أ—â„¢أ—آ¢."""
-        await update.message.reply_text(
-            "SLH Investor Menu أ¢â‚¬â€œ choose an action:",
-            reply_markup=self._main_menu_keyboard(),
+        screen = render_cache.get(
+            "menu",
+            "",
+            lambda: Rendered(
+                "SLH Investor Menu أ¢â‚¬â€œ choose an action:",
+                serialize_markup(self._main_menu_keyboard()),
+            ),
         )
+        await update.message.reply_text(screen.text, reply_markup=screen.markup)
 
     async def cmd_wallet(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        user = self._ensure_user(update)
+        await self._reply_screen(
+            update, await self._screen_wallet(update.effective_user, context)
+        )
+
+    async def _screen_wallet(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
+        user, _ = self._get_or_create_user_with_flag(tg_user)
 
         addr = settings.COMMUNITY_WALLET_ADDRESS or ""
         token_addr = settings.SLH_TOKEN_ADDRESS or ""
@@ -706,8 +840,9 @@ class InvestorWalletBot:
             lines.append("BNB staking info:")
             lines.append(settings.STAKING_INFO_URL)
 
-        await update.message.reply_text("\n".join(lines))
+        return Rendered("\n".join(lines))
 
+    @query_budget(6)
     async def cmd_link_wallet(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -717,7 +852,6 @@ class InvestorWalletBot:
         2) /link_wallet 0xABC... -> أ—آ©أ—â€¢أ—â€چأ—آ¨ أ—â€چأ—â„¢أ—â€œ أ—ع¯أ—ع¾ أ—â€‌أ—â€؛أ—ع¾أ—â€¢أ—â€کأ—ع¾ أ—â€چأ—â€‌أ—آ¤أ—آ§أ—â€¢أ—â€œأ—â€‌
         """
         tg_user = update.effective_user
-        self._ensure_user(update)
 
         # أ—ع¯أ—â€Œ أ—آ أ—آ©أ—إ“أ—â€”أ—â€‌ أ—â€؛أ—ع¾أ—â€¢أ—â€کأ—ع¾ أ—â€کأ—ع¾أ—â€¢أ—ع‘ أ—â€‌أ—آ¤أ—آ§أ—â€¢أ—â€œأ—â€‌ أ—آ¢أ—آ¦أ—â€چأ—â€‌
         if context.args:
@@ -743,84 +877,99 @@ class InvestorWalletBot:
             finally:
                 db.close()
 
-            context.user_data["state"] = None
+            user_states.clear_flow(tg_user.id)
             return
 
         # أ—â€چأ—آ¦أ—â€ک أ—آ¨أ—â€™أ—â„¢أ—إ“ أ¢â‚¬â€œ أ—â€چأ—â€کأ—آ§أ—آ© أ—â€؛أ—ع¾أ—â€¢أ—â€کأ—ع¾ أ—â€کأ—â€‌أ—â€¢أ—â€œأ—آ¢أ—â€‌ أ—â€‌أ—â€کأ—ع¯أ—â€‌
-        context.user_data["state"] = STATE_AWAITING_BNB_ADDRESS
-        await update.message.reply_text(
+        await self._reply_screen(
+            update, await self._screen_link_wallet(tg_user, context)
+        )
+
+    async def _screen_link_wallet(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
+        """פותח את ה-flow של קישור ארנק: הכתובת תגיע בהודעה הבאה."""
+        self._get_or_create_user_with_flag(tg_user)
+        user_states.set_flow(tg_user.id, STATE_AWAITING_BNB_ADDRESS)
+        return Rendered(
             "Please send your BNB address (BSC network, usually starts with 0x...)."
         )
 
+    @query_budget(4)
     async def cmd_balance(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
+        await self._reply_screen(
+            update, await self._screen_balance(update.effective_user, context)
+        )
+
+    async def _screen_balance(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
+        data = await DataLoader(self._profile_sources(tg_user)).load()
+        balance = data["user"]["balance"]
+        price = self._slh_price_nis()
+        value_nis = balance * price
+
+        text = screens.render(
+            self._catalog(tg_user, context),
+            "SCREEN_BALANCE",
+            balance=balance,
+            value_nis=value_nis,
+            price=price,
+            has_bnb=available(data["bnb"]),
+            bnb=data["bnb"],
+            has_slh=available(data["slh"]),
+            slh=data["slh"],
+        )
+        return Rendered(text)
+
+    def _load_profile(self, tg_user) -> Dict[str, Any]:
+        """
+        שורת המשתמש (get_or_create) כערכים פשוטים – רץ ב-thread של
+        DataLoader, וה-session נסגר לפני שהמסך משתמש בנתונים.
+        """
         db = self._db()
         try:
-            tg_user = update.effective_user
             user = crud.get_or_create_user(
                 db,
                 telegram_id=tg_user.id,
                 username=tg_user.username,
             )
-            balance = user.balance_slh or Decimal("0")
-            price = self._slh_price_nis()
-            value_nis = balance * price
-
-            lines: list[str] = []
-            lines.append("SLH Off-Chain Balance")
-            lines.append("")
-            lines.append(f"Current balance: {balance:.4f} SLH")
-            lines.append(
-                f"Nominal value: {value_nis:.2f} ILS (at {price:.0f} ILS per SLH)"
-            )
-            lines.append("")
-
-            onchain_bnb = None
-            onchain_slh = None
-
-            if user.bnb_address and settings.BSC_RPC_URL:
-                try:
-                    on = (
-                        blockchain.get_onchain_balances(user.bnb_address)
-                        or {}
-                    )
-                    onchain_bnb = on.get("bnb")
-                    onchain_slh = on.get("slh")
-                except Exception as e:
-                    logger.warning(
-                        "On-chain balance fetch failed: %s", e
-                    )
-                    onchain_bnb = None
-                    onchain_slh = None
+            slha_balance = getattr(user, "slha_balance", None)
+            return {
+                "balance": user.balance_slh or Decimal("0"),
+                "bnb_address": user.bnb_address,
+                "slha_balance": slha_balance
+                if slha_balance is not None
+                else Decimal("0"),
+            }
+        finally:
+            db.close()
 
-            lines.append("On-Chain view (BNB Chain):")
-            if onchain_bnb is not None:
-                lines.append(f"- BNB: {onchain_bnb:.6f} BNB")
-            else:
-                lines.append(
-                    "- BNB: unavailable (RPC / address / node error)"
-                )
+    def _profile_sources(self, tg_user) -> Dict[str, Source]:
+        """
+        המקורות של /balance ו-/summary: המשתמש מה-DB (ממנו הכתובת), ואז
+        BNB ו-SLH על השרשרת במקביל, כל אחד עם timeout משלו.
+        """
 
-            if onchain_slh is not None:
-                lines.append(f"- SLH: {onchain_slh:.6f} SLH")
-            else:
-                lines.append(
-                    "- SLH: unavailable (token / RPC / node error)"
-                )
+        def onchain(asset: str) -> Source:
+            def fetch(user):
+                if not user["bnb_address"] or not settings.BSC_RPC_URL:
+                    return None
+                return blockchain.get_onchain_balance(user["bnb_address"], asset)
 
-            lines.append("")
-            lines.append(
-                "This reflects allocations recorded for you inside the system."
-            )
-            lines.append(
-                "There is no redemption yet أ¢â‚¬â€œ only future usage inside the ecosystem."
+            return Source(
+                fetch, after=("user",), timeout=settings.SCREEN_RPC_TIMEOUT_SEC
             )
 
-            await update.message.reply_text("\n".join(lines))
-        finally:
-            db.close()
+        return {
+            "user": Source(lambda: self._load_profile(tg_user), required=True),
+            "bnb": onchain("bnb"),
+            "slh": onchain("slh"),
+        }
 
+    @query_budget(3)
     async def cmd_whoami(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -872,148 +1021,89 @@ class InvestorWalletBot:
         finally:
             db.close()
 
+    @query_budget(4)
     async def cmd_summary(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         """أ—â€œأ—آ©أ—â€کأ—â€¢أ—آ¨أ—â€œ أ—â€چأ—آ©أ—آ§أ—â„¢أ—آ¢ أ—â€کأ—â€چأ—طŒأ—ع‘ أ—ع¯أ—â€”أ—â€œ أ¢â‚¬â€œ أ—â€؛أ—â€¢أ—إ“أ—إ“ SLHA."""
-        db = self._db()
-        try:
-            tg_user = update.effective_user
-            user = crud.get_or_create_user(
-                db,
-                telegram_id=tg_user.id,
-                username=tg_user.username,
-            )
-            balance = user.balance_slh or Decimal("0")
-            price = self._slh_price_nis()
-            value_nis = balance * price
-
-            # SLHA balance (internal reward points)
-            slha_balance = getattr(user, "slha_balance", None)
-            if slha_balance is None:
-                slha_balance = Decimal("0")
-
-            addr = settings.COMMUNITY_WALLET_ADDRESS or ""
-            token_addr = settings.SLH_TOKEN_ADDRESS or ""
-            user_addr = (
-                user.bnb_address or "Not linked yet (use /link_wallet)."
-            )
-
-            onchain_bnb = None
-            onchain_slh = None
-            if user.bnb_address and settings.BSC_RPC_URL:
-                try:
-                    on = blockchain.get_onchain_balances(user.bnb_address)
-                    onchain_bnb = on.get("bnb")
-                    onchain_slh = on.get("slh")
-                except Exception as e:
-                    logger.warning(
-                        "On-chain balance fetch failed: %s", e
-                    )
-
-            tier = self._investor_tier(balance)
-            hypothetical_yield_rate = Decimal("0.10")
-            projected_yearly_yield = balance * hypothetical_yield_rate
-
-            lines: list[str] = []
-            lines.append("SLH Investor Dashboard")
-            lines.append("")
-            lines.append("Profile:")
-            lines.append(f"- Telegram ID: {tg_user.id}")
-            lines.append(
-                f"- Username: @{tg_user.username}"
-                if tg_user.username
-                else "- Username: N/A"
-            )
-            lines.append(f"- Investor tier: {tier}")
-            lines.append("")
-            lines.append("Wallets:")
-            lines.append(f"- Your BNB (BSC): {user_addr}")
-            lines.append(f"- Community wallet: {addr}")
-            lines.append(f"- SLH token: {token_addr}")
-            lines.append("")
-            lines.append("Balance (Off-Chain System Ledger):")
-            lines.append(f"- SLH: {balance:.4f} SLH")
-            lines.append(
-                f"- Nominal ILS value: {value_nis:.2f} ILS "
-                f"(at {price:.0f} ILS per SLH)"
-            )
-            lines.append(
-                f"- Hypothetical yearly yield (10%): "
-                f"{projected_yearly_yield:.4f} SLH"
-            )
-            lines.append(
-                f"- Internal SLHA points: {slha_balance:.8f} SLHA"
-            )
-            lines.append("")
-            lines.append(
-                "SLH = off-chain allocation units that mirror investor deposits."
-            )
-            lines.append(
-                "SLHA = internal reward points for referrals, activity and "
-                "future staking / AI modules."
-            )
-            lines.append("")
+        await self._reply_screen(
+            update, await self._screen_summary(update.effective_user, context)
+        )
 
-            if user.bnb_address and (
-                onchain_bnb is not None or onchain_slh is not None
-            ):
-                lines.append(
-                    "On-Chain (BNB Chain) أ¢â‚¬â€œ based on your BNB address:"
-                )
-                if onchain_bnb is not None:
-                    lines.append(f"- BNB: {onchain_bnb:.6f} BNB")
-                else:
-                    lines.append(
-                        "- BNB: unavailable (RPC or address error)"
-                    )
-                if onchain_slh is not None:
-                    lines.append(f"- SLH: {onchain_slh:.6f} SLH")
-                else:
-                    lines.append(
-                        "- SLH: unavailable (token or RPC error)"
-                    )
-                lines.append("")
+    async def _screen_summary(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
+        data = await DataLoader(self._profile_sources(tg_user)).load()
+        user = data["user"]
+        onchain_bnb = data["bnb"]
+        onchain_slh = data["slh"]
 
-            if settings.BSC_SCAN_BASE and addr and not addr.startswith("<"):
-                lines.append("On BscScan:")
-                lines.append(
-                    f"- Community wallet: {settings.BSC_SCAN_BASE.rstrip('/')}/address/{addr}"
-                )
+        balance = user["balance"]
+        price = self._slh_price_nis()
+        value_nis = balance * price
 
-            if (
-                settings.BSC_SCAN_BASE
-                and token_addr
-                and not token_addr.startswith("<")
-            ):
-                lines.append(
-                    f"- SLH token: {settings.BSC_SCAN_BASE.rstrip('/')}/token/{token_addr}"
-                )
+        addr = settings.COMMUNITY_WALLET_ADDRESS or ""
+        token_addr = settings.SLH_TOKEN_ADDRESS or ""
 
-            if settings.DOCS_URL:
-                lines.append("")
-                lines.append(f"Investor Docs: {settings.DOCS_URL}")
+        tier = self._investor_tier(balance)
+        hypothetical_yield_rate = Decimal("0.10")
+        projected_yearly_yield = balance * hypothetical_yield_rate
 
-            lines.append("")
-            lines.append(
-                "Key commands: /menu, /wallet, /balance, /history, "
-                "/transfer, /docs, /help, /language, /referrals"
-            )
+        scan_base = (settings.BSC_SCAN_BASE or "").rstrip("/")
+        community_scan = (
+            f"{scan_base}/address/{addr}"
+            if scan_base and addr and not addr.startswith("<")
+            else None
+        )
+        token_scan = (
+            f"{scan_base}/token/{token_addr}"
+            if scan_base and token_addr and not token_addr.startswith("<")
+            else None
+        )
 
-            await update.message.reply_text("\n".join(lines))
-        finally:
-            db.close()
+        text = screens.render(
+            self._catalog(tg_user, context),
+            "SCREEN_SUMMARY",
+            telegram_id=tg_user.id,
+            username=tg_user.username,
+            tier=tier,
+            bnb_address=user["bnb_address"],
+            community_wallet=addr,
+            token_address=token_addr,
+            balance=balance,
+            value_nis=value_nis,
+            price=price,
+            projected_yield=projected_yearly_yield,
+            slha_balance=user["slha_balance"],
+            # מקור שפג מוצג כ-"לא זמין" ולא מסתיר את כל החלק של השרשרת
+            show_onchain=bool(user["bnb_address"])
+            and (onchain_bnb is not None or onchain_slh is not None),
+            has_bnb=available(onchain_bnb),
+            bnb=onchain_bnb,
+            has_slh=available(onchain_slh),
+            slh=onchain_slh,
+            community_scan=community_scan,
+            token_scan=token_scan,
+            docs_url=settings.DOCS_URL,
+        )
+        return Rendered(text)
 
     async def cmd_docs(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         """أ—آ§أ—â„¢أ—آ©أ—â€¢أ—آ¨ أ—إ“أ—â€چأ—طŒأ—â€چأ—â€؛أ—â„¢ أ—â€‌-DOCS أ—â€‌أ—آ¨أ—آ©أ—â€چأ—â„¢أ—â„¢أ—â€Œ (README أ—إ“أ—â€چأ—آ©أ—آ§أ—â„¢أ—آ¢أ—â„¢أ—â€Œ)."""
+        await self._reply_screen(
+            update, await self._screen_docs(update.effective_user, context)
+        )
+
+    async def _screen_docs(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
         if not settings.DOCS_URL:
-            await update.message.reply_text(
+            return Rendered(
                 "Investor docs URL is not configured yet.\n"
                 "Please contact the SLH team."
             )
-            return
 
         text_lines: list[str] = []
         text_lines.append("SLH Investor Documentation")
@@ -1027,7 +1117,7 @@ class InvestorWalletBot:
             "You can share this link with potential strategic partners and investors."
         )
 
-        await update.message.reply_text("\n".join(text_lines))
+        return Rendered("\n".join(text_lines))
 
     # === Coming soon feature modules (multi-language placeholders) ===
 
@@ -1067,6 +1157,7 @@ class InvestorWalletBot:
         text = self._coming_soon_text(tg_user, context, "MODULE_NAME_ACADEMY")
         await update.message.reply_text(text)
 
+    @query_budget(5)
     async def cmd_referrals(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -1076,110 +1167,57 @@ class InvestorWalletBot:
         - أ—طŒأ—آ¤أ—â„¢أ—آ¨أ—ع¾ referrals
         - أ—â€‌أ—آ¦أ—â€™أ—ع¾ أ—â„¢أ—ع¾أ—آ¨أ—ع¾ SLHA
         """
-        db = self._db()
-        try:
-            tg_user = update.effective_user
-            user = crud.get_or_create_user(
-                db,
-                telegram_id=tg_user.id,
-                username=tg_user.username,
-            )
-
-            # أ—آ§أ—â€کأ—إ“أ—ع¾ username أ—آ©أ—إ“ أ—â€‌أ—â€کأ—â€¢أ—ع© أ—إ“أ—آ¦أ—â€¢أ—آ¨أ—ع‘ أ—آ§أ—â„¢أ—آ©أ—â€¢أ—آ¨ أ—ع¯أ—â„¢أ—آ©أ—â„¢
-            bot_username = None
-            try:
-                if self.bot and self.bot.username:
-                    bot_username = self.bot.username
-                else:
-                    me = await context.bot.get_me()
-                    bot_username = me.username
-            except Exception as e:
-                logger.warning("Failed to get bot username: %s", e)
+        tg_user = update.effective_user
 
-            if not bot_username:
-                link = "Unavailable أ¢â‚¬â€œ bot username not resolved yet."
-            else:
-                link = f"https://t.me/{bot_username}?start=ref_{tg_user.id}"
+        async def fetch_bot_username():
+            # קבלת username של הבוט לצורך קישור אישי
+            if self.bot and self.bot.username:
+                return self.bot.username
+            me = await context.bot.get_me()
+            return me.username
 
-            # أ—طŒأ—ع©أ—ع©أ—â„¢أ—طŒأ—ع©أ—â„¢أ—آ§أ—â€¢أ—ع¾ أ—آ¨أ—آ¤أ—آ¨أ—آ¨أ—إ“أ—â„¢أ—â€Œ أ¢â‚¬â€œ أ—إ“أ—آ¤أ—â„¢ Transactions أ—â€چأ—طŒأ—â€¢أ—â€™ referral_bonus_slha
-            txs = (
-                db.query(models.Transaction)
-                .filter(
-                    models.Transaction.to_user == tg_user.id,
-                    models.Transaction.tx_type == "referral_bonus_slha",
+        def fetch_referrals_count():
+            # סטטיסטיקות רפררלים – לפי Transactions מסוג referral_bonus_slha
+            db = self._db()
+            try:
+                return (
+                    db.query(func.count(models.Transaction.id))
+                    .filter(
+                        models.Transaction.to_user == tg_user.id,
+                        models.Transaction.tx_type == "referral_bonus_slha",
+                    )
+                    .scalar()
+                    or 0
                 )
-                .all()
-            )
-
-            referrals_count = len(txs)
-            reward_per = self._referral_reward_amount()
-
-            # أ—â„¢أ—ع¾أ—آ¨أ—ع¾ SLHA أ—â€کأ—آ¤أ—â€¢أ—آ¢أ—إ“ أ¢â‚¬â€œ أ—â€چأ—â€‌أ—ع©أ—â€کأ—إ“أ—â€‌
-            slha_balance = getattr(user, "slha_balance", None)
-            if slha_balance is None:
-                slha_balance = Decimal("0")
-
-            lang = self._get_lang(tg_user, context)
+            finally:
+                db.close()
 
-            if lang == "he":
-                lines: list[str] = []
-                lines.append("أ—ع¾أ—â€¢أ—â€؛أ—آ أ—â„¢أ—ع¾ أ—â€‌أ—آ¤أ—آ أ—â„¢أ—â€¢أ—ع¾ أ¢â‚¬â€œ SLH Global Investments")
-                lines.append("")
-                lines.append("أ—â€“أ—â€‌أ—â€¢ أ—â€‌أ—آ§أ—â„¢أ—آ©أ—â€¢أ—آ¨ أ—â€‌أ—ع¯أ—â„¢أ—آ©أ—â„¢ أ—آ©أ—إ“أ—ع‘ أ—إ“أ—آ©أ—â„¢أ—ع¾أ—â€¢أ—آ£ (أ—â€”أ—â€کأ—آ¨أ—â„¢أ—â€Œ, أ—â€چأ—آ©أ—آ¤أ—â€”أ—â€‌, أ—إ“أ—آ§أ—â€¢أ—â€”أ—â€¢أ—ع¾):")
-                lines.append(link)
-                lines.append("")
-                lines.append(f"أ—â€چأ—طŒأ—آ¤أ—آ¨ أ—â€چأ—آ¦أ—ع©أ—آ¨أ—آ¤أ—â„¢أ—â€Œ أ—آ©أ—â€“أ—â€¢أ—â€‌أ—â€¢ أ—â€œأ—آ¨أ—ع‘ أ—â€‌أ—آ§أ—â„¢أ—آ©أ—â€¢أ—آ¨ أ—آ©أ—إ“أ—ع‘: {referrals_count}")
-                lines.append(
-                    f"أ—â„¢أ—ع¾أ—آ¨أ—ع¾ SLHA أ—آ¤أ—آ أ—â„¢أ—â€چأ—â„¢أ—ع¾ (أ—آ أ—آ§أ—â€¢أ—â€œأ—â€¢أ—ع¾ أ—â€چأ—آ¢أ—آ¨أ—â€؛أ—ع¾): {slha_balance:.8f} SLHA"
-                )
-                lines.append("")
-                lines.append(
-                    f"أ—â€؛أ—آ¨أ—â€™أ—آ¢, أ—â€؛أ—إ“ أ—â€چأ—آ¦أ—ع©أ—آ¨أ—آ£ أ—â€œأ—آ¨أ—ع‘ أ—â€‌أ—آ§أ—â„¢أ—آ©أ—â€¢أ—آ¨ أ—â€چأ—â€“أ—â€؛أ—â€‌ أ—â€ک-{reward_per:.8f} SLHA "
-                    f"(أ¢â€°ث† 1 أ¢â€ڑع¾ أ—آ أ—â€¢أ—â€چأ—â„¢أ—آ أ—إ“أ—â„¢) أ¢â‚¬â€œ أ—â€چأ—â€”أ—â€¢أ—إ“أ—آ§ أ—â€™أ—â€Œ أ—إ“أ—â€چأ—آ¤أ—آ أ—â€‌ أ—â€¢أ—â€™أ—â€Œ أ—إ“أ—â€چأ—آ¦أ—ع©أ—آ¨أ—آ£."
-                )
-                lines.append("")
-                lines.append(
-                    "أ—â€‌أ—آ أ—آ§أ—â€¢أ—â€œأ—â€¢أ—ع¾ أ—â€‌أ—ع؛ Off-Chain أ—â€¢أ—â„¢أ—آ©أ—â€چأ—آ©أ—â€¢ أ—â€کأ—â€‌أ—â€چأ—آ©أ—ع‘ أ—إ“أ—طŒأ—ع©أ—â„¢أ—â„¢أ—آ§أ—â„¢أ—آ أ—â€™, أ—â€‌أ—ع©أ—â€کأ—â€¢أ—ع¾, "
-                    "أ—â€™أ—â„¢أ—آ©أ—â€‌ أ—إ“أ—â€چأ—â€¢أ—â€œأ—â€¢أ—إ“أ—â„¢أ—â€Œ أ—â€چأ—ع¾أ—آ§أ—â€œأ—â€چأ—â„¢أ—â€Œ أ—â€¢أ—إ“-AI Trading Tutor."
-                )
-                lines.append("")
-                lines.append(
-                    "أ—â€؛أ—â€؛أ—إ“ أ—آ©أ—ع¾أ—آ©أ—ع¾أ—آ£ أ—â„¢أ—â€¢أ—ع¾أ—آ¨ أ—â€¢أ—ع¾أ—â€کأ—آ أ—â€‌ أ—آ¨أ—آ©أ—ع¾ أ—â€چأ—آ©أ—آ§أ—â„¢أ—آ¢أ—â„¢أ—â€Œ أ—طŒأ—â€کأ—â„¢أ—â€کأ—ع‘, أ—â€؛أ—ع‘ أ—ع¾أ—â€¢أ—â€؛أ—إ“/أ—â„¢ أ—إ“أ—آ¤أ—ع¾أ—â€¢أ—â€” "
-                    "أ—آ¢أ—â€¢أ—â€œ أ—آ©أ—â€؛أ—â€کأ—â€¢أ—ع¾ أ—â€کأ—ع¯أ—آ§أ—â€¢-أ—طŒأ—â„¢أ—طŒأ—ع©أ—â€Œ أ—آ©أ—إ“ SLH."
-                )
-            else:
-                lines = []
-                lines.append("Referral Program أ¢â‚¬â€œ SLH Global Investments")
-                lines.append("")
-                lines.append(
-                    "Your personal invite link (share with friends, family, clients):"
-                )
-                lines.append(link)
-                lines.append("")
-                lines.append(f"Referrals detected via your link: {referrals_count}")
-                lines.append(
-                    f"Current internal SLHA balance: {slha_balance:.8f} SLHA"
-                )
-                lines.append("")
-                lines.append(
-                    f"Each new investor via your link currently grants "
-                    f"{reward_per:.8f} SLHA (أ¢â€°ث† 1 ILS nominal value), "
-                    "credited both to you and to the new investor."
-                )
-                lines.append("")
-                lines.append(
-                    "These points are off-chain and will be used later for staking tiers, "
-                    "bonuses and access to advanced AI trading modules."
-                )
-                lines.append("")
-                lines.append(
-                    "The more you share and onboard investors, the more you unlock inside "
-                    "the SLH ecosystem."
-                )
+        data = await DataLoader(
+            {
+                "user": Source(lambda: self._load_profile(tg_user), required=True),
+                "count": Source(fetch_referrals_count, required=True),
+                "bot_username": Source(
+                    fetch_bot_username, timeout=settings.SCREEN_BOT_API_TIMEOUT_SEC
+                ),
+            }
+        ).load()
+
+        bot_username = data["bot_username"]
+        link = (
+            f"https://t.me/{bot_username}?start=ref_{tg_user.id}"
+            if bot_username
+            else None
+        )
 
-            await update.message.reply_text("\n".join(lines))
-        finally:
-            db.close()
+        text = screens.render(
+            self._catalog(tg_user, context),
+            "SCREEN_REFERRALS",
+            link=link,
+            referrals_count=data["count"],
+            slha_balance=data["user"]["slha_balance"],
+            reward_per=self._referral_reward_amount(),
+        )
+        await update.message.reply_text(text)
 
     async def cmd_reports(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -1207,6 +1245,7 @@ class InvestorWalletBot:
         )
         await update.message.reply_text(text)
 
+    @query_budget(4)
     async def cmd_onchain_balance(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -1219,17 +1258,14 @@ class InvestorWalletBot:
                 telegram_id=tg_user.id,
                 username=tg_user.username,
             )
+            cat = self._catalog(tg_user, context)
 
             if not user.bnb_address:
-                await update.message.reply_text(
-                    "You have not linked a BNB address yet.\nUse /link_wallet first."
-                )
+                await update.message.reply_text(cat["ONCHAIN_NO_WALLET"])
                 return
 
             if not settings.BSC_RPC_URL:
-                await update.message.reply_text(
-                    "On-chain RPC is not configured on the server (BSC_RPC_URL missing)."
-                )
+                await update.message.reply_text(cat["ONCHAIN_NO_RPC"])
                 return
 
             try:
@@ -1238,44 +1274,32 @@ class InvestorWalletBot:
                 onchain_slh = on.get("slh")
             except Exception as e:
                 logger.warning("On-chain balance fetch failed: %s", e)
-                await update.message.reply_text(
-                    "Failed to fetch on-chain balances (RPC or token error)."
-                )
+                await update.message.reply_text(cat["ONCHAIN_FETCH_FAILED"])
                 return
 
-            lines: list[str] = []
-            lines.append("On-Chain Balances (BNB Smart Chain)")
-            lines.append(f"Address: {user.bnb_address}")
-            lines.append("")
-
-            if onchain_bnb is not None:
-                lines.append(f"- BNB: {onchain_bnb:.6f} BNB")
-            else:
-                lines.append(
-                    "- BNB: unavailable (RPC or address error)"
-                )
-
-            if onchain_slh is not None:
-                lines.append(f"- SLH: {onchain_slh:.6f} SLH")
-            else:
-                lines.append(
-                    "- SLH: unavailable (token or RPC error)"
-                )
-
-            if settings.BSC_SCAN_BASE:
-                base = settings.BSC_SCAN_BASE.rstrip("/")
-                lines.append("")
-                lines.append("On BscScan:")
-                lines.append(f"- Wallet: {base}/address/{user.bnb_address}")
-                if settings.SLH_TOKEN_ADDRESS:
-                    lines.append(
-                        f"- SLH token: {base}/token/{settings.SLH_TOKEN_ADDRESS}"
-                    )
-
-            await update.message.reply_text("\n".join(lines))
+            scan_base = (settings.BSC_SCAN_BASE or "").rstrip("/")
+            text = screens.render(
+                cat,
+                "SCREEN_ONCHAIN",
+                address=user.bnb_address,
+                has_bnb=onchain_bnb is not None,
+                bnb=onchain_bnb,
+                has_slh=onchain_slh is not None,
+                slh=onchain_slh,
+                wallet_scan=(
+                    f"{scan_base}/address/{user.bnb_address}" if scan_base else None
+                ),
+                token_scan=(
+                    f"{scan_base}/token/{settings.SLH_TOKEN_ADDRESS}"
+                    if scan_base and settings.SLH_TOKEN_ADDRESS
+                    else None
+                ),
+            )
+            await update.message.reply_text(text)
         finally:
             db.close()
 
+    @query_budget(5)
     async def cmd_history(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -1283,14 +1307,21 @@ class InvestorWalletBot:
         أ—â€چأ—آ¦أ—â„¢أ—â€™ أ—آ¢أ—â€œ 10 أ—â€‌أ—ع©أ—آ¨أ—آ أ—â€“أ—آ§أ—آ¦أ—â„¢أ—â€¢أ—ع¾ أ—â€‌أ—ع¯أ—â€”أ—آ¨أ—â€¢أ—آ أ—â€¢أ—ع¾ أ—آ©أ—â€کأ—â€‌أ—ع؛ أ—â€‌أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ© أ—â€چأ—آ¢أ—â€¢أ—آ¨أ—â€ک (Off-Chain).
         أ—آ¢أ—â€¢أ—â€کأ—â€œ أ—â€چأ—â€¢أ—إ“ Transaction.from_user / Transaction.to_user (أ—â€چأ—â€“أ—â€‌أ—â„¢ أ—ع©أ—إ“أ—â€™أ—آ¨أ—â€Œ).
         """
+        await self._reply_screen(
+            update, await self._screen_history(update.effective_user, context)
+        )
+
+    async def _screen_history(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
         db = self._db()
         try:
-            tg_user = update.effective_user
             user = crud.get_or_create_user(
                 db,
                 telegram_id=tg_user.id,
                 username=tg_user.username,
             )
+            cat = self._catalog(tg_user, context)
             my_tid = user.telegram_id
 
             q = (
@@ -1307,59 +1338,55 @@ class InvestorWalletBot:
             txs = q.all()
 
             if not txs:
-                await update.message.reply_text(
-                    "No recent transactions found in the internal ledger."
-                )
-                return
-
-            lines: list[str] = []
-            lines.append("Last transactions (internal ledger)")
-            lines.append("Most recent first (max 10):")
-            lines.append("")
+                return Rendered(cat["HISTORY_EMPTY"])
 
+            row = screens.template(cat, "SCREEN_HISTORY_ROW")
+            rows: list[str] = []
             for tx in txs:
                 from_id = getattr(tx, "from_user", None)
                 to_id = getattr(tx, "to_user", None)
-                tx_type = getattr(tx, "tx_type", "N/A")
-                amount = getattr(tx, "amount_slh", 0)
-                created_at = getattr(tx, "created_at", None)
-
-                if created_at is not None:
-                    try:
-                        ts = created_at.strftime("%Y-%m-%d %H:%M")
-                    except Exception:
-                        ts = str(created_at)
-                else:
-                    ts = "N/A"
 
                 if from_id == my_tid and to_id == my_tid:
-                    direction = "SELF"
+                    direction = cat["HISTORY_DIRECTION_SELF"]
                 elif from_id == my_tid:
-                    direction = "OUT"
+                    direction = cat["HISTORY_DIRECTION_OUT"]
                 elif to_id == my_tid:
-                    direction = "IN"
+                    direction = cat["HISTORY_DIRECTION_IN"]
                 else:
-                    direction = "OTHER"
-
-                lines.append(
-                    f"[{ts}] {direction} أ¢â‚¬â€œ {amount:.4f} SLH (type={tx_type}, id={tx.id})"
+                    direction = cat["HISTORY_DIRECTION_OTHER"]
+
+                rows.append(
+                    row.render(
+                        created_at=getattr(tx, "created_at", None),
+                        direction=direction,
+                        amount=getattr(tx, "amount_slh", 0) or 0,
+                        tx_type=getattr(tx, "tx_type", "N/A"),
+                        tx_id=tx.id,
+                    )
                 )
 
-            await update.message.reply_text("\n".join(lines))
+            text = screens.render(cat, "SCREEN_HISTORY", rows="\n".join(rows))
+            return Rendered(text)
         except Exception as e:
             logger.exception("Error while fetching history: %s", e)
-            await update.message.reply_text(
-                "Could not load transaction history.\nPlease contact the SLH team."
-            )
+            return Rendered(i18n.t(self._get_lang(tg_user, context), "HISTORY_FAILED"))
         finally:
             db.close()
 
     async def cmd_transfer(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        self._ensure_user(update)
-        context.user_data["state"] = STATE_AWAITING_TRANSFER_TARGET
-        await update.message.reply_text(
+        await self._reply_screen(
+            update, await self._screen_transfer(update.effective_user, context)
+        )
+
+    async def _screen_transfer(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
+        """פותח את ה-flow של העברה: שם המשתמש של היעד מגיע בהודעה הבאה."""
+        self._get_or_create_user_with_flag(tg_user)
+        user_states.set_flow(tg_user.id, STATE_AWAITING_TRANSFER_TARGET)
+        return Rendered(
             "Type the target username you want to transfer to (e.g. @username)."
         )
 
@@ -1499,10 +1526,15 @@ class InvestorWalletBot:
             await update.message.reply_text("This command is admin-only.")
             return
 
-        await update.message.reply_text(
-            "SLH Admin Menu أ¢â‚¬â€œ tools for managing investor balances:",
-            reply_markup=self._admin_menu_keyboard(),
+        screen = render_cache.get(
+            "admin_menu",
+            "",
+            lambda: Rendered(
+                "SLH Admin Menu أ¢â‚¬â€œ tools for managing investor balances:",
+                serialize_markup(self._admin_menu_keyboard()),
+            ),
         )
+        await update.message.reply_text(screen.text, reply_markup=screen.markup)
 
     async def cmd_admin_list_users(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -1595,6 +1627,199 @@ class InvestorWalletBot:
         finally:
             db.close()
 
+    async def cmd_admin_payout(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """
+        Admin only: queue an on-chain SLH payout to the user's linked BNB address.
+        /admin_payout <telegram_id> <amount>
+        The amount is debited from the off-chain balance immediately and sent
+        by the payout engine in the next batch.
+        """
+        if not self._is_admin(update.effective_user.id):
+            await update.message.reply_text("This command is admin-only.")
+            return
+
+        if not settings.PAYOUTS_ENABLED:
+            await update.message.reply_text(
+                "On-chain payouts are disabled (PAYOUTS_ENABLED is not set)."
+            )
+            return
+
+        parts = (update.message.text or "").split()
+        if len(parts) != 3:
+            await update.message.reply_text(
+                "Usage: /admin_payout <telegram_id> <amount>"
+            )
+            return
+
+        try:
+            target_id = int(parts[1])
+            amount = Decimal(parts[2].replace(",", ""))
+            if not amount.is_finite():
+                raise ValueError(parts[2])
+        except (ValueError, ArithmeticError):
+            await update.message.reply_text(
+                "Invalid parameters.\nCheck ID and amount."
+            )
+            return
+
+        db = self._db()
+        try:
+            user = (
+                db.query(models.User)
+                .filter(models.User.telegram_id == target_id)
+                .first()
+            )
+            if not user or not user.bnb_address:
+                await update.message.reply_text(
+                    "User not found or has no linked BNB address."
+                )
+                return
+
+            try:
+                to_address = blockchain.to_checksum_address(user.bnb_address.strip())
+            except Exception:
+                await update.message.reply_text(
+                    f"User's BNB address is invalid: {user.bnb_address}"
+                )
+                return
+
+            try:
+                payout = crud.queue_payout(db, user, to_address, amount)
+            except ValueError as e:
+                await update.message.reply_text(str(e))
+                return
+
+            await update.message.reply_text(
+                f"Payout #{payout.id} queued:\n"
+                f"{amount:.4f} SLH -> {to_address}\n"
+                f"Ledger transaction ID: {payout.ledger_tx_id}"
+            )
+        finally:
+            db.close()
+
+    # === Broadcast לכל המשקיעים (נשלח ע"י app/broadcast.py) ===
+
+    def _broadcast_summary(self, broadcast: models.Broadcast, total: int) -> str:
+        done = (broadcast.sent or 0) + (broadcast.blocked or 0) + (broadcast.failed or 0)
+        return (
+            f"Broadcast #{broadcast.id}: {broadcast.status}\n"
+            f"Progress: {done}/{total} users\n"
+            f"Sent: {broadcast.sent or 0} | Blocked: {broadcast.blocked or 0} | "
+            f"Failed: {broadcast.failed or 0}"
+        )
+
+    def _parse_broadcast_id(self, update: Update) -> int | None:
+        parts = (update.message.text or "").split()
+        if len(parts) != 2 or not parts[1].lstrip("#").isdigit():
+            return None
+        return int(parts[1].lstrip("#"))
+
+    async def cmd_admin_broadcast(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """
+        Admin only: create a broadcast draft for all users.
+        /admin_broadcast <text>
+        Lines like [he] / [ru] start a per-language variant; the text before
+        the first marker goes to everyone else (DEFAULT_LANGUAGE).
+        """
+        if not self._is_admin(update.effective_user.id):
+            await update.message.reply_text("This command is admin-only.")
+            return
+
+        parts = (update.message.text or "").split(maxsplit=1)
+        texts = parse_variants(parts[1]) if len(parts) == 2 else {}
+        if not texts:
+            await update.message.reply_text(
+                "Usage: /admin_broadcast <text>\n"
+                "Add a line like [he] or [ru] to start a per-language variant."
+            )
+            return
+
+        too_long = [lang for lang, text in texts.items() if len(text) > MAX_MESSAGE_CHARS]
+        if too_long:
+            await update.message.reply_text(
+                f"Text is longer than {MAX_MESSAGE_CHARS} characters: {', '.join(too_long)}"
+            )
+            return
+
+        db = self._db()
+        try:
+            broadcast = crud.create_broadcast(db, update.effective_user.id, texts)
+            total = db.query(func.count(models.User.telegram_id)).scalar() or 0
+        finally:
+            db.close()
+
+        await update.message.reply_text(
+            f"Broadcast #{broadcast.id} created as a draft.\n"
+            f"Languages: {', '.join(sorted(texts))}\n"
+            f"Recipients: {total} users\n\n"
+            f"Send: /admin_broadcast_send {broadcast.id}\n"
+            f"Cancel: /admin_broadcast_cancel {broadcast.id}"
+        )
+
+    async def cmd_admin_broadcast_send(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """Admin only: start sending a broadcast draft. /admin_broadcast_send <id>"""
+        await self._set_broadcast_status(update, "admin_broadcast_send", "sending")
+
+    async def cmd_admin_broadcast_cancel(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """Admin only: stop a broadcast. /admin_broadcast_cancel <id>"""
+        await self._set_broadcast_status(update, "admin_broadcast_cancel", "cancelled")
+
+    async def _set_broadcast_status(
+        self, update: Update, command: str, status: str
+    ) -> None:
+        if not self._is_admin(update.effective_user.id):
+            await update.message.reply_text("This command is admin-only.")
+            return
+
+        broadcast_id = self._parse_broadcast_id(update)
+        if broadcast_id is None:
+            await update.message.reply_text(f"Usage: /{command} <broadcast_id>")
+            return
+
+        db = self._db()
+        try:
+            try:
+                broadcast = crud.set_broadcast_status(db, broadcast_id, status)
+            except ValueError as e:
+                await update.message.reply_text(str(e))
+                return
+            total = db.query(func.count(models.User.telegram_id)).scalar() or 0
+            await update.message.reply_text(self._broadcast_summary(broadcast, total))
+        finally:
+            db.close()
+
+    async def cmd_admin_broadcast_status(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """Admin only: broadcast progress. /admin_broadcast_status [id]"""
+        if not self._is_admin(update.effective_user.id):
+            await update.message.reply_text("This command is admin-only.")
+            return
+
+        broadcast_id = self._parse_broadcast_id(update)
+        db = self._db()
+        try:
+            q = db.query(models.Broadcast)
+            if broadcast_id is not None:
+                broadcast = q.filter(models.Broadcast.id == broadcast_id).first()
+            else:
+                broadcast = q.order_by(models.Broadcast.id.desc()).first()
+            if broadcast is None:
+                await update.message.reply_text("No broadcast found.")
+                return
+            total = db.query(func.count(models.User.telegram_id)).scalar() or 0
+            await update.message.reply_text(self._broadcast_summary(broadcast, total))
+        finally:
+            db.close()
+
     # === NEW: health + language commands ===
 
     async def cmd_ping(
@@ -1611,12 +1836,13 @@ class InvestorWalletBot:
             await update.message.reply_text("This command is admin-only.")
             return
 
-        result = run_selftest(quick=False)
+        result = await health_sampler.latest_or_sample()
         status = result.get("status", "unknown")
         checks = result.get("checks", {})
 
         lines: list[str] = []
         lines.append(f"Self-test status: {status}")
+        lines.append(f"Sampled at: {result.get('time_utc', 'N/A')}")
         lines.append("")
 
         for name, check in checks.items():
@@ -1624,7 +1850,9 @@ class InvestorWalletBot:
             skipped = check.get("skipped", False)
 
             if ok and not skipped:
-                lines.append(f"أ¢إ“â€¦ {name}")
+                latency = check.get("latency_ms")
+                suffix = f" ({latency} ms)" if latency is not None else ""
+                lines.append(f"أ¢إ“â€¦ {name}{suffix}")
             elif skipped:
                 reason = check.get("reason", "")
                 lines.append(f"أ¢ع‘ع¾ {name} أ¢â‚¬â€œ skipped ({reason})")
@@ -1634,79 +1862,186 @@ class InvestorWalletBot:
 
         await update.message.reply_text("\n".join(lines))
 
+    async def cmd_admin_profile(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """
+        אדמין בלבד:
+        /admin_profile [seconds] – פרופיל דגימה של התהליך החי (collapsed stacks)
+        /admin_profile slow – exemplars של updates איטיים
+        """
+        if not self._is_admin(update.effective_user.id):
+            await update.message.reply_text("This command is admin-only.")
+            return
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+
+        if context.args and context.args[0].lower() == "slow":
+            report = slow_updates.render()
+            for stall in loop_monitor.stalls():
+                report += (
+                    f"=== {stall['time_utc']} event loop blocked "
+                    f"{stall['blocked_ms']} ms: {stall['call_site'] or '?'}\n"
+                    + "\n".join(stall["stack"])
+                    + "\n\n"
+                )
+            if not report:
+                await update.message.reply_text(
+                    f"No updates slower than {slow_updates.threshold:g}s recorded."
+                )
+                return
+            await update.message.reply_document(
+                document=io.BytesIO(report.encode("utf-8")),
+                filename=f"slow-updates-{stamp}.txt",
+                caption=(
+                    f"Slow update exemplars (>= {slow_updates.threshold:g}s) "
+                    "+ event loop stalls"
+                ),
+            )
+            return
+
+        try:
+            seconds = float(context.args[0]) if context.args else 10.0
+        except ValueError:
+            await update.message.reply_text("Usage: /admin_profile [seconds|slow]")
+            return
+
+        seconds = max(1.0, min(seconds, float(settings.PROFILER_MAX_SECONDS)))
+        await update.message.reply_text(f"Profiling for {seconds:g}s...")
+
+        try:
+            collapsed = await profiler.profile(seconds)
+        except ProfilerBusy:
+            await update.message.reply_text("A profile is already running.")
+            return
+
+        await update.message.reply_document(
+            document=io.BytesIO(collapsed.encode("utf-8")),
+            filename=f"profile-{stamp}.collapsed",
+            caption=(
+                f"{seconds:g}s sampling profile "
+                "(flamegraph.pl / speedscope collapsed format)"
+            ),
+        )
+
+    async def cmd_admin_stats(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """אדמין בלבד: עומס חי – 1/5/15 דקות מה-ring buffers שבזיכרון."""
+        if not self._is_admin(update.effective_user.id):
+            await update.message.reply_text("This command is admin-only.")
+            return
+
+        windows = ((60, "1m"), (300, "5m"), (900, "15m"))
+        stats = live_stats
+
+        def pct(value) -> str:
+            return f"{value * 100:.1f}%" if value is not None else "n/a"
+
+        def ms(value) -> str:
+            return f"{value * 1000:.0f}" if value is not None else "-"
+
+        lines: list[str] = []
+        lines.append("Live stats (1m / 5m / 15m)")
+        lines.append("")
+        lines.append(
+            "Updates/sec: "
+            + " / ".join(f"{stats.rate(stats.updates, sec):.2f}" for sec, _ in windows)
+        )
+        lines.append(
+            "Update errors: "
+            + " / ".join(str(stats.update_errors.total(sec)) for sec, _ in windows)
+        )
+        lines.append(
+            "Handler errors: "
+            + " / ".join(str(stats.handler_errors.total(sec)) for sec, _ in windows)
+        )
+        lines.append("")
+        lines.append("Handler latency p50 / p95 / p99 (ms):")
+        for sec, label in windows:
+            p50, p95, p99 = stats.handler_latency.percentiles(sec, (0.5, 0.95, 0.99))
+            count = stats.handler_latency.count(sec)
+            lines.append(f"- {label}: {ms(p50)} / {ms(p95)} / {ms(p99)} (n={count})")
+        lines.append("")
+
+        rpc_rates = []
+        for sec, _ in windows:
+            calls = stats.rpc_calls.total(sec)
+            errors = stats.rpc_errors.total(sec)
+            rpc_rates.append(f"{errors}/{calls} ({pct(errors / calls if calls else None)})")
+        lines.append("RPC errors: " + " / ".join(rpc_rates))
+
+        for name in stats.cache_names():
+            lines.append(
+                f"Cache {name} hit rate: "
+                + " / ".join(pct(stats.cache_hit_rate(name, sec)) for sec, _ in windows)
+            )
+        lines.append("")
+
+        lines.append(
+            f"Now: in-flight updates {int(metrics.UPDATES_IN_FLIGHT.value())}"
+        )
+
+        pool = engine.pool
+        checked_out = getattr(pool, "checkedout", None)
+        if callable(checked_out):
+            lines.append(
+                f"DB pool: {checked_out()} checked out / size {pool.size()} "
+                f"(overflow {max(0, pool.overflow())})"
+            )
+        else:
+            lines.append(f"DB pool: {type(pool).__name__}")
+
+        await update.message.reply_text("\n".join(lines))
+
     async def cmd_language(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         """
-        أ—â€چأ—آ¦أ—â„¢أ—â€™ أ—إ“أ—â€چأ—آ©أ—ع¾أ—â€چأ—آ© أ—ع¾أ—آ¤أ—آ¨أ—â„¢أ—ع© أ—â€کأ—â€”أ—â„¢أ—آ¨أ—ع¾ أ—آ©أ—آ¤أ—â€‌.
-        أ—â€کأ—آ©أ—إ“أ—â€ک أ—â€‌أ—â€“أ—â€‌ أ—ع¯أ—آ أ—â€”أ—آ أ—â€¢ أ—آ©أ—â€¢أ—â€چأ—آ¨أ—â„¢أ—â€Œ أ—ع¯أ—ع¾ أ—â€‌أ—â€‌أ—آ¢أ—â€œأ—آ¤أ—â€‌ أ—â€کأ—â€“أ—â„¢أ—â€؛أ—آ¨أ—â€¢أ—ع؛ (context.user_data),
-        أ—â€¢أ—ع¯أ—â€”"أ—â€؛ أ—آ أ—â€¢أ—â€؛أ—إ“ أ—إ“أ—â€‌أ—آ¢أ—â€کأ—â„¢أ—آ¨ أ—ع¯أ—ع¾ أ—â€؛أ—إ“ أ—â€‌أ—â€‌أ—â€¢أ—â€œأ—آ¢أ—â€¢أ—ع¾ أ—إ“أ—â€‌أ—آ©أ—ع¾أ—â€چأ—آ© أ—â€ک-i18n.
+        מציג למשתמש תפריט בחירת שפה.
+        הבחירה נשמרת ב-user_states (טבלת user_states), כך שהיא שורדת deploy
+        ומשותפת לכל ה-workers.
         """
         tg_user = update.effective_user
-        lang = self._get_lang(tg_user, context)
-        title = i18n.t(lang, "LANGUAGE_MENU_TITLE")
-
-        await update.message.reply_text(
-            title,
-            reply_markup=self._language_keyboard(),
+        cat = self._catalog(tg_user, context)
+        screen = render_cache.get(
+            "language",
+            cat.lang,
+            lambda: Rendered(
+                cat["LANGUAGE_MENU_TITLE"],
+                serialize_markup(self._language_keyboard()),
+            ),
         )
 
+        await update.message.reply_text(screen.text, reply_markup=screen.markup)
+
     # ===== Callback handlers =====
 
     async def cb_wallet_menu(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        query = update.callback_query
-        await query.answer()
-        data = query.data
+        """כפתורי WALLET_* – המסך נערך לתוך ההודעה (app/screen_router.py)."""
+        await self.screen_router.route(update, context)
 
-        if data == "WALLET_BALANCE":
-            fake_update = Update(update.update_id, message=query.message)
-            await self.cmd_balance(fake_update, context)
-        elif data == "WALLET_DETAILS":
-            fake_update = Update(update.update_id, message=query.message)
-            await self.cmd_wallet(fake_update, context)
-        elif data == "WALLET_BUY_BNB":
-            if settings.BUY_BNB_URL:
-                await query.edit_message_text(
-                    f"Suggested BNB provider:\n{settings.BUY_BNB_URL}"
-                )
-            else:
-                await query.edit_message_text(
-                    "BUY_BNB_URL not set in environment variables."
-                )
+    async def _screen_buy_bnb(
+        self, tg_user, context: ContextTypes.DEFAULT_TYPE | None = None
+    ) -> Rendered:
+        if settings.BUY_BNB_URL:
+            return Rendered(f"Suggested BNB provider:\n{settings.BUY_BNB_URL}")
+        return Rendered("BUY_BNB_URL not set in environment variables.")
 
     async def cb_main_menu(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        """أ—â€؛أ—آ¤أ—ع¾أ—â€¢أ—آ¨أ—â„¢ MENU_* أ—آ¢أ—â€کأ—â€¢أ—آ¨ أ—â€‌أ—â€چأ—آ©أ—آ§أ—â„¢أ—آ¢."""
-        query = update.callback_query
-        await query.answer()
-        data = query.data
-
-        fake_update = Update(update.update_id, message=query.message)
-
-        if data == "MENU_SUMMARY":
-            await self.cmd_summary(fake_update, context)
-        elif data == "MENU_BALANCE":
-            await self.cmd_balance(fake_update, context)
-        elif data == "MENU_WALLET":
-            await self.cmd_wallet(fake_update, context)
-        elif data == "MENU_LINK_WALLET":
-            await self.cmd_link_wallet(fake_update, context)
-        elif data == "MENU_HISTORY":
-            await self.cmd_history(fake_update, context)
-        elif data == "MENU_TRANSFER":
-            await self.cmd_transfer(fake_update, context)
-        elif data == "MENU_DOCS":
-            await self.cmd_docs(fake_update, context)
+        """כפתורי MENU_* – המסך נערך לתוך הודעת התפריט."""
+        await self.screen_router.route(update, context)
 
     async def cb_language(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         """
-        Callback أ—آ©أ—إ“ أ—â€کأ—â€”أ—â„¢أ—آ¨أ—ع¾ أ—آ©أ—آ¤أ—â€‌ أ¢â‚¬â€œ LANG_en / LANG_he / LANG_ru / LANG_es / LANG_ar.
-        أ—â€چأ—آ¢أ—â€œأ—â€؛أ—ع؛ context.user_data["lang"] أ—â€¢أ—â€چأ—آ¦أ—â„¢أ—â€™ أ—â€‌أ—â€¢أ—â€œأ—آ¢أ—ع¾ أ—ع¯أ—â„¢أ—آ©أ—â€¢أ—آ¨.
+        Callback של בחירת שפה – LANG_en / LANG_he / LANG_ru / LANG_es / LANG_ar.
+        שומר את השפה ב-user_states ומציג הודעת אישור.
         """
         query = update.callback_query
         await query.answer()
@@ -1718,7 +2053,7 @@ class InvestorWalletBot:
 
         raw_lang = parts[1]
         lang = i18n.normalize_lang(raw_lang)
-        context.user_data["lang"] = lang
+        user_states.set_lang(query.from_user.id, lang)
 
         # أ—â€‌أ—â€¢أ—â€œأ—آ¢أ—ع¾ أ—ع¯أ—â„¢أ—آ©أ—â€¢أ—آ¨ أ—â€کأ—آ©أ—آ¤أ—â€‌ أ—â€‌أ—آ أ—â€کأ—â€”أ—آ¨أ—ع¾
         if lang == "he":
@@ -1769,7 +2104,10 @@ class InvestorWalletBot:
     async def handle_text(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        state = context.user_data.get("state")
+        entry = user_states.get(update.effective_user.id)
+        # צילום לפני clear_flow – הוא מאפס את השדות על אותו אובייקט
+        state = entry.flow
+        flow_data = entry.flow_data or {}
         text = (update.message.text or "").strip()
 
         db = self._db()
@@ -1782,7 +2120,7 @@ class InvestorWalletBot:
             )
 
             if state == STATE_AWAITING_BNB_ADDRESS:
-                context.user_data["state"] = None
+                user_states.clear_flow(tg_user.id)
 
                 if not text.startswith("0x") or len(text) < 20:
                     await update.message.reply_text(
@@ -1803,9 +2141,10 @@ class InvestorWalletBot:
                     )
                     return
 
-                context.user_data["transfer_target_username"] = text[1:]
-                context.user_data["state"] = (
-                    STATE_AWAITING_TRANSFER_AMOUNT
+                user_states.set_flow(
+                    tg_user.id,
+                    STATE_AWAITING_TRANSFER_AMOUNT,
+                    transfer_target_username=text[1:],
                 )
                 await update.message.reply_text(
                     f"Great.\nNow type the SLH amount you want to transfer to {text}."
@@ -1813,7 +2152,7 @@ class InvestorWalletBot:
                 return
 
             if state == STATE_AWAITING_TRANSFER_AMOUNT:
-                context.user_data["state"] = None
+                user_states.clear_flow(tg_user.id)
 
                 try:
                     amount = float(text.replace(",", ""))
@@ -1829,9 +2168,7 @@ class InvestorWalletBot:
                     )
                     return
 
-                target_username = context.user_data.get(
-                    "transfer_target_username"
-                )
+                target_username = flow_data.get("transfer_target_username")
                 if not target_username:
                     await update.message.reply_text(
                         "Target not found.\nTry again with /transfer."
@@ -1872,8 +2209,8 @@ class InvestorWalletBot:
                 return
 
             # no special state أ¢â‚¬â€œ أ—â€‌أ—â€¢أ—â€œأ—آ¢أ—â€‌ أ—â€”أ—â€¢أ—آ¤أ—آ©أ—â„¢أ—ع¾
-            lang = self._get_lang(tg_user, context)
-            fallback = i18n.t(lang, "GENERIC_UNKNOWN_COMMAND")
+            cat = self._catalog(tg_user, context)
+            fallback = cat["GENERIC_UNKNOWN_COMMAND"]
             await update.message.reply_text(fallback)
         finally:
             db.close()
@@ -1891,5 +2228,6 @@ async def process_webhook(update_dict: dict):
         logger.error("Application is not initialized")
         return
 
-    update = Update.de_json(update_dict, _bot_instance.application.bot)
-    await _bot_instance.application.process_update(update)
+    with metrics.observe_update(update_dict), tracing.span("ptb.process_update"):
+        update = Update.de_json(update_dict, _bot_instance.application.bot)
+        await _bot_instance.application.process_update(update)
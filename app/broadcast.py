@@ -0,0 +1,472 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import exists, insert, select, update
+from telegram.error import BadRequest, Forbidden
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app import i18n, metrics, models
+from app.send_scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_STATUSES = ("sent", "blocked", "failed")
+
+# "[he]" בשורה נפרדת פותח וריאנט לשפה
+_VARIANT_MARKER = re.compile(r"\[([A-Za-z]{2,3})\]")
+
+BROADCAST_DELIVERIES = metrics.Counter(
+    "slh_broadcast_deliveries_total", "Broadcast messages by delivery result", ("status",)
+)
+BROADCAST_CHECKPOINTS = metrics.Counter(
+    "slh_broadcast_checkpoints_total", "Broadcast progress checkpoints", ("result",)
+)
+BROADCAST_IN_FLIGHT = metrics.Gauge(
+    "slh_broadcast_in_flight", "Broadcast messages currently being sent"
+)
+
+Sender = Callable[[int, str], Awaitable[Any]]
+
+
+def parse_variants(text: str) -> Dict[str, str]:
+    """
+    טקסט של /admin_broadcast -> {lang: text}.
+    הטקסט שלפני הסימון הראשון הוא של DEFAULT_LANGUAGE; "[ru]" בשורה
+    נפרדת פותח וריאנט לרוסית (רק שפות שיש להן bundle ב-app/locales).
+    """
+    current = i18n.normalize_lang(settings.DEFAULT_LANGUAGE)
+    lines: Dict[str, List[str]] = {}
+    for line in text.splitlines():
+        marker = _VARIANT_MARKER.fullmatch(line.strip())
+        if marker and marker.group(1).lower() in i18n.available_languages():
+            current = marker.group(1).lower()
+            continue
+        lines.setdefault(current, []).append(line)
+
+    variants = {lang: "\n".join(body).strip() for lang, body in lines.items()}
+    return {lang: body for lang, body in variants.items() if body}
+
+
+def variant_for(texts: Dict[str, str], lang: Optional[str]) -> str:
+    """הוריאנט לשפת המשתמש, אחרת של DEFAULT_LANGUAGE, אחרת הראשון."""
+    default = i18n.normalize_lang(settings.DEFAULT_LANGUAGE)
+    return (
+        texts.get(i18n.normalize_lang(lang or default))
+        or texts.get(default)
+        or next(iter(texts.values()))
+    )
+
+
+def _insert_deliveries(db, rows: List[Dict[str, Any]]) -> None:
+    table = models.BroadcastDelivery.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(insert(table), rows)
+        return
+
+    # שורה שכבר קיימת (checkpoint שנכתב לפני קריסה) – לא נכשלים עליה
+    stmt = dialect_insert(table).on_conflict_do_nothing(
+        index_elements=[table.c.broadcast_id, table.c.telegram_id]
+    )
+    db.execute(stmt, rows)
+
+
+class _Run:
+    """מצב השליחה של broadcast אחד בזמן ריצה."""
+
+    def __init__(self, broadcast_id: int, texts: Dict[str, str], last_user_id: Optional[int]):
+        self.broadcast_id = broadcast_id
+        self.texts = texts
+        self.last_user_id = last_user_id
+        # נמענים שנמסרו ל-workers, לפי telegram_id; done – אלה שהסתיימו
+        self.order: Deque[int] = deque()
+        self.done: Set[int] = set()
+        self.rows: List[Dict[str, Any]] = []
+        self.counts = dict.fromkeys(DELIVERY_STATUSES, 0)
+        self.flushed_at = time.monotonic()
+        self.halted = False
+        self.lock = asyncio.Lock()
+
+    def record(self, telegram_id: int, status: str, error: Optional[str]) -> None:
+        self.rows.append(
+            {
+                "broadcast_id": self.broadcast_id,
+                "telegram_id": telegram_id,
+                "status": status,
+                "error": error,
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
+        self.counts[status] += 1
+        self.done.add(telegram_id)
+
+    def advance(self) -> None:
+        """last_user_id = סוף הרצף שכולו הסתיים (workers מסיימים לא לפי הסדר)."""
+        while self.order and self.order[0] in self.done:
+            self.last_user_id = self.order.popleft()
+            self.done.discard(self.last_user_id)
+
+
+class BroadcastEngine:
+    """
+    שליחת broadcast לכל המשתמשים ב-users:
+
+    - הנמענים נקראים ב-server-side cursor (stream_results + yield_per) ב-thread
+      נפרד, לפי telegram_id – הטבלה לא נטענת לזיכרון, והתור ביניהם חסום
+    - workers קורוטינות שולחות דרך בוט נפרד בנתיב bulk של SendScheduler,
+      עם token bucket משלו (per_sec) – מתחת למגבלה הגלובלית של טלגרם, כך
+      שנשאר מקום לתשובות למשתמשים
+    - כל checkpoint_every תוצאות / checkpoint_sec: bulk insert ל-
+      broadcast_deliveries + last_user_id, באותה טרנזקציה
+    - אחרי deploy / קריסה ממשיכים מ-last_user_id ומדלגים על מי שכבר יש לו
+      שורה; שגיאת רשת / 429 עוצרת את הסיבוב וממשיכים ב-poll הבא
+    - הטקסט לכל נמען לפי user_states.lang (i18n.normalize_lang)
+
+    רץ רק ב-worker שמחזיק את background_lock.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        per_sec: float,
+        batch_size: int,
+        checkpoint_every: int,
+        checkpoint_sec: float,
+        poll_sec: float,
+        session_factory=SessionLocal,
+    ):
+        self._workers = max(1, workers)
+        self._bucket = TokenBucket(per_sec, max(1.0, per_sec))
+        self._batch_size = max(1, batch_size)
+        self._checkpoint_every = max(1, checkpoint_every)
+        self._checkpoint_sec = checkpoint_sec
+        self._poll_sec = max(0.5, poll_sec)
+        self._session_factory = session_factory
+        self._send: Optional[Sender] = None
+        self._in_flight = 0
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+        BROADCAST_IN_FLIGHT.set_function(lambda: self._in_flight)
+
+    def bind(self, send: Sender) -> None:
+        """send(chat_id, text) – נקבע כשהבוט מאותחל."""
+        self._send = send
+
+    # ===== DB =====
+
+    def _next_broadcast(self) -> Optional[Tuple[int, Dict[str, str], Optional[int]]]:
+        db = self._session_factory()
+        try:
+            broadcast = (
+                db.query(models.Broadcast)
+                .filter(models.Broadcast.status == "sending")
+                .order_by(models.Broadcast.id)
+                .first()
+            )
+            if broadcast is None:
+                return None
+            return broadcast.id, json.loads(broadcast.texts), broadcast.last_user_id
+        finally:
+            db.close()
+
+    def _stream(
+        self,
+        broadcast_id: int,
+        after: Optional[int],
+        push: Callable[[Optional[List[tuple]]], bool],
+    ) -> None:
+        """producer (ב-thread): מחלקים של (telegram_id, lang), ואז None."""
+        users = models.User.__table__
+        states = models.UserState.__table__
+        deliveries = models.BroadcastDelivery.__table__
+
+        stmt = (
+            select(users.c.telegram_id, states.c.lang)
+            .select_from(
+                users.outerjoin(states, states.c.telegram_id == users.c.telegram_id)
+            )
+            .where(
+                ~exists().where(
+                    deliveries.c.broadcast_id == broadcast_id,
+                    deliveries.c.telegram_id == users.c.telegram_id,
+                )
+            )
+            .order_by(users.c.telegram_id)
+            .execution_options(stream_results=True, yield_per=self._batch_size)
+        )
+        if after is not None:
+            stmt = stmt.where(users.c.telegram_id > after)
+
+        db = self._session_factory()
+        try:
+            result = db.execute(stmt)
+            try:
+                for partition in result.partitions():
+                    if not push([tuple(row) for row in partition]):
+                        return
+            finally:
+                result.close()
+        finally:
+            db.close()
+            push(None)
+
+    def _write_checkpoint(
+        self,
+        broadcast_id: int,
+        rows: List[Dict[str, Any]],
+        last_user_id: Optional[int],
+        counts: Dict[str, int],
+        finished: bool,
+    ) -> str:
+        """תוצאות + התקדמות בטרנזקציה אחת. מחזיר את ה-status (ביטול מה-admin)."""
+        broadcast = models.Broadcast
+        db = self._session_factory()
+        try:
+            if rows:
+                _insert_deliveries(db, rows)
+
+            values: Dict[str, Any] = {
+                status: getattr(broadcast, status) + count
+                for status, count in counts.items()
+                if count
+            }
+            if last_user_id is not None:
+                values["last_user_id"] = last_user_id
+            if values:
+                db.execute(
+                    update(broadcast).where(broadcast.id == broadcast_id).values(**values)
+                )
+
+            status = db.execute(
+                select(broadcast.status).where(broadcast.id == broadcast_id)
+            ).scalar_one()
+            if finished and status == "sending":
+                db.execute(
+                    update(broadcast)
+                    .where(broadcast.id == broadcast_id)
+                    .values(status="done", finished_at=datetime.now(timezone.utc))
+                )
+                status = "done"
+
+            db.commit()
+            return status
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _checkpoint(self, run: _Run, finished: bool = False) -> None:
+        async with run.lock:
+            run.advance()
+            rows, run.rows = run.rows, []
+            counts, run.counts = run.counts, dict.fromkeys(DELIVERY_STATUSES, 0)
+            run.flushed_at = time.monotonic()
+            try:
+                status = await asyncio.to_thread(
+                    self._write_checkpoint,
+                    run.broadcast_id,
+                    rows,
+                    run.last_user_id,
+                    counts,
+                    finished,
+                )
+            except Exception as e:
+                # נשמר ל-checkpoint הבא – בלי זה הנמענים האלה היו מקבלים שוב אחרי resume
+                run.rows = rows + run.rows
+                for status, count in counts.items():
+                    run.counts[status] += count
+                BROADCAST_CHECKPOINTS.inc("error")
+                logger.warning("Broadcast %s checkpoint failed: %s", run.broadcast_id, e)
+                return
+
+            BROADCAST_CHECKPOINTS.inc("ok")
+            if status == "cancelled" and not run.halted:
+                logger.info("Broadcast %s cancelled", run.broadcast_id)
+                run.halted = True
+
+    def _checkpoint_due(self, run: _Run) -> bool:
+        if run.lock.locked():
+            return False
+        return (
+            len(run.rows) >= self._checkpoint_every
+            or time.monotonic() - run.flushed_at >= self._checkpoint_sec
+        )
+
+    # ===== Sending =====
+
+    async def _wait_bucket(self) -> None:
+        while True:
+            delay = self._bucket.take()
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    async def _worker(self, run: _Run, recipients: asyncio.Queue) -> None:
+        while True:
+            item = await recipients.get()
+            if item is None:
+                return
+            if run.halted or self._stopping.is_set():
+                # נשאר מחוץ ל-checkpoint – יישלח בסיבוב הבא
+                continue
+
+            telegram_id, lang = item
+            await self._wait_bucket()
+            self._in_flight += 1
+            try:
+                await self._send(telegram_id, variant_for(run.texts, lang))
+                status, error = "sent", None
+            except Forbidden as e:
+                # המשתמש חסם את הבוט / החשבון נמחק
+                status, error = "blocked", str(e)[:255]
+            except BadRequest as e:
+                status, error = "failed", str(e)[:255]
+            except Exception as e:
+                # רשת / 429 אחרי כל הניסיונות של ה-scheduler: עוצרים וממשיכים ב-poll הבא
+                if not run.halted:
+                    logger.warning(
+                        "Broadcast %s paused on send error: %s", run.broadcast_id, e
+                    )
+                run.halted = True
+                continue
+            finally:
+                self._in_flight -= 1
+
+            run.record(telegram_id, status, error)
+            BROADCAST_DELIVERIES.inc(status)
+            if self._checkpoint_due(run):
+                await self._checkpoint(run)
+
+    async def _run_broadcast(
+        self, broadcast_id: int, texts: Dict[str, str], after: Optional[int]
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        run = _Run(broadcast_id, texts, after)
+        partitions: asyncio.Queue = asyncio.Queue(maxsize=2)
+        recipients: asyncio.Queue = asyncio.Queue(maxsize=self._workers * 2)
+        halt = threading.Event()
+
+        def push(partition: Optional[List[tuple]]) -> bool:
+            fut = asyncio.run_coroutine_threadsafe(partitions.put(partition), loop)
+            while not halt.is_set():
+                try:
+                    fut.result(timeout=1.0)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    continue
+            fut.cancel()
+            return False
+
+        logger.info("Broadcast %s sending (after telegram_id=%s)", broadcast_id, after)
+        producer = asyncio.create_task(
+            asyncio.to_thread(self._stream, broadcast_id, after, push)
+        )
+        workers = [
+            asyncio.create_task(self._worker(run, recipients))
+            for _ in range(self._workers)
+        ]
+
+        completed = False
+        try:
+            while not (run.halted or self._stopping.is_set()):
+                partition = await partitions.get()
+                if partition is None:
+                    completed = True
+                    break
+                for telegram_id, lang in partition:
+                    if run.halted or self._stopping.is_set():
+                        break
+                    run.order.append(telegram_id)
+                    await recipients.put((telegram_id, lang))
+        finally:
+            halt.set()
+            for _ in workers:
+                await recipients.put(None)
+            await asyncio.gather(*workers)
+
+        # קריאה שנכשלה באמצע – לא מסמנים done; ממשיכים מה-checkpoint
+        try:
+            await producer
+        except Exception:
+            completed = False
+            await self._checkpoint(run)
+            raise
+
+        await self._checkpoint(run, finished=completed and not run.halted)
+        logger.info(
+            "Broadcast %s %s (last telegram_id=%s)",
+            broadcast_id,
+            "finished" if completed and not run.halted else "paused",
+            run.last_user_id,
+        )
+
+    # ===== Background loop =====
+
+    async def run(self) -> None:
+        logger.info("Broadcast engine started (workers=%s)", self._workers)
+        while not self._stopping.is_set():
+            job = None
+            if self._send is not None:
+                try:
+                    job = await asyncio.to_thread(self._next_broadcast)
+                except Exception as e:
+                    logger.exception("Broadcast poll failed: %s", e)
+
+            if job is not None:
+                try:
+                    await self._run_broadcast(*job)
+                except Exception as e:
+                    logger.exception("Broadcast %s failed: %s", job[0], e)
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self._poll_sec)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Broadcast engine stopped")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+
+broadcasts = BroadcastEngine(
+    workers=settings.BROADCAST_WORKERS,
+    per_sec=settings.BROADCAST_PER_SEC,
+    batch_size=settings.BROADCAST_BATCH_SIZE,
+    checkpoint_every=settings.BROADCAST_CHECKPOINT_EVERY,
+    checkpoint_sec=settings.BROADCAST_CHECKPOINT_SEC,
+    poll_sec=settings.BROADCAST_POLL_SEC,
+)
+
+
+def start_broadcast_engine() -> None:
+    broadcasts.start()
+
+
+async def stop_broadcast_engine() -> None:
+    await broadcasts.stop()
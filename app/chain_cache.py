@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from app.stats import live_stats
+
+logger = logging.getLogger(__name__)
+
+
+class BlockTracker:
+    """
+    עוקב אחרי מספר הבלוק האחרון – קריאת eth_blockNumber אחת לכל interval
+    עבור כל התהליך (לא לכל בקשה).
+
+    כשמגיע בלוק חדש נקרא on_new_blocks(old, new) כדי שהמטמון יוכל לפסול
+    רק את הכתובות שהבלוקים החדשים נגעו בהן.
+    """
+
+    def __init__(
+        self,
+        fetch_block_number: Callable[[], Optional[int]],
+        on_new_blocks: Callable[[int, int], None],
+        interval_sec: float,
+    ):
+        self._fetch = fetch_block_number
+        self._on_new_blocks = on_new_blocks
+        self._interval = interval_sec
+        self._block: Optional[int] = None
+        self._polled_at = 0.0
+        self._poll_lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def block(self) -> Optional[int]:
+        return self._block
+
+    def poll(self) -> Optional[int]:
+        """קריאת RPC אחת; מפעיל on_new_blocks אם התקדמנו."""
+        with self._poll_lock:
+            return self._poll_locked()
+
+    def _poll_locked(self) -> Optional[int]:
+        try:
+            new = self._fetch()
+        except Exception as e:
+            logger.warning("eth_blockNumber failed: %s", e)
+            new = None
+        finally:
+            self._polled_at = time.monotonic()
+
+        old = self._block
+        if new is not None and (old is None or new > old):
+            if old is not None:
+                try:
+                    self._on_new_blocks(old, new)
+                except Exception as e:
+                    logger.exception("Block handler failed: %s", e)
+            self._block = new
+        return self._block
+
+    def current_block(self) -> Optional[int]:
+        """
+        הבלוק הידוע האחרון. כשהמשימה ברקע רצה – ללא RPC בכלל;
+        אחרת poll עצל לכל היותר פעם ב-interval (ורק thread אחד בכל רגע).
+        """
+        if self._task is not None and not self._task.done():
+            return self._block
+
+        if time.monotonic() - self._polled_at >= self._interval:
+            if self._poll_lock.acquire(blocking=False):
+                try:
+                    return self._poll_locked()
+                finally:
+                    self._poll_lock.release()
+        return self._block
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            await asyncio.to_thread(self.poll)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+
+class BlockTaggedCache:
+    """
+    מטמון LRU שבו כל ערך מתויג בבלוק שבו נקרא.
+
+    ערך נשאר תקף עד שמגיע בלוק שנוגע במפתח (invalidate), או עד שעברו
+    max_age_blocks בלוקים – רשת ביטחון לשינויים שלא רואים בסריקה
+    (למשל העברות BNB פנימיות מתוך חוזה).
+    """
+
+    def __init__(self, max_entries: int, max_age_blocks: int, name: str = "chain"):
+        self.name = name
+        self._max_entries = max(1, max_entries)
+        self._max_age = max(1, max_age_blocks)
+        self._entries: "OrderedDict[Hashable, tuple[int, Any]]" = OrderedDict()
+        # בלוק אחרון שנגע בכל מפתח – כדי לא לשמור קריאה שהתחילה לפני הנגיעה
+        self._touched: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._floor = -1  # קריאות מבלוק ישן מזה לא נשמרות (אחרי clear)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> set:
+        with self._lock:
+            return set(self._entries)
+
+    def get(self, key: Hashable, current_block: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or current_block - entry[0] > self._max_age:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                live_stats.record_cache(self.name, False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            live_stats.record_cache(self.name, True)
+            return entry[1]
+
+    def put(self, key: Hashable, block: int, value: Any) -> None:
+        with self._lock:
+            if block < self._floor or self._touched.get(key, -1) > block:
+                return
+            self._entries[key] = (block, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable], block: Optional[int] = None) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    removed += 1
+                if block is not None:
+                    self._touched[key] = block
+                    self._touched.move_to_end(key)
+            while len(self._touched) > self._max_entries * 4:
+                self._touched.popitem(last=False)
+        return removed
+
+    def clear(self, block: Optional[int] = None) -> None:
+        with self._lock:
+            self._entries.clear()
+            if block is not None:
+                self._floor = max(self._floor, block)
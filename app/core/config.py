@@ -42,6 +42,38 @@ class Settings(BaseSettings):
     # --- BSC / On-chain ---
     BSC_RPC_URL: str | None = None
     BSC_SCAN_BASE: str | None = "https://bscscan.com"
+    BSC_RPC_TIMEOUT_SEC: float = 5.0  # לכל קריאת RPC – thread לא נתקע על node שלא עונה
+
+    # מטמון יתרות מתויג-בלוק: eth_blockNumber אחד לכל interval לכל התהליך
+    CHAIN_CACHE_ENABLED: bool = True
+    BLOCK_POLL_INTERVAL_SEC: float = 3.0
+    CHAIN_CACHE_MAX_ENTRIES: int = 10000
+    CHAIN_CACHE_MAX_AGE_BLOCKS: int = 200
+    # BNB לא נסרק לכל בלוק (רק Transfer של הטוקן) – תקף לפי גיל בלבד (~1 דקה ב-BSC)
+    CHAIN_CACHE_BNB_MAX_AGE_BLOCKS: int = 20
+    CHAIN_CACHE_MAX_SCAN_BLOCKS: int = 20
+
+    # --- זיהוי הפקדות אוטומטי לארנק הקהילתי ---
+    DEPOSIT_WATCHER_ENABLED: bool = False
+    DEPOSIT_POLL_INTERVAL_SEC: float = 15.0
+    DEPOSIT_CONFIRMATIONS: int = 3
+    DEPOSIT_MAX_BLOCK_RANGE: int = 500
+    DEPOSIT_BATCH_SIZE: int = 100
+    DEPOSIT_START_BLOCK: int | None = None
+    # אם לא מוגדר – הפקדות BNB נרשמות אבל לא נזקפות ללדג'ר
+    DEPOSIT_BNB_TO_SLH_RATE: Decimal | None = None
+
+    # --- תשלומים On-Chain מהארנק הקהילתי ---
+    PAYOUTS_ENABLED: bool = False
+    PAYOUT_POLL_INTERVAL_SEC: float = 5.0
+    PAYOUT_BATCH_SIZE: int = 20
+    PAYOUT_SIGNER_WORKERS: int = 4
+    PAYOUT_GAS_LIMIT_BNB: int = 21000
+    PAYOUT_GAS_LIMIT_TOKEN: int = 100000
+    PAYOUT_CHAIN_ID: int | None = None  # None -> eth_chainId פעם אחת
+    PAYOUT_REBROADCAST_SEC: float = 120.0  # submitted בלי receipt -> אותו raw_tx שוב
+    PAYOUT_MAX_ATTEMPTS: int = 5  # חתימות מחדש (אותו nonce) אחרי דחיות של ה-node
+    PAYOUT_GAS_BUMP_PCT: int = 15  # gas בחתימה מחדש; nodes דורשים לפחות 10% להחלפה
 
     # --- לינקים חיצוניים ---
     BUY_BNB_URL: str | None = None
@@ -55,6 +87,95 @@ class Settings(BaseSettings):
     LOG_TRANSACTIONS_CHAT_ID: str | None = None
     LOG_ERRORS_CHAT_ID: str | None = None
     REFERRAL_LOGS_CHAT_ID: str | None = None
+    # הודעות לערוצי הלוג מאוחדות ל-digest: לכל היותר אחת לחלון (או כל N אירועים)
+    LOG_DIGEST_WINDOW_SEC: float = 30.0
+    LOG_DIGEST_MAX_EVENTS: int = 50
+    LOG_DIGEST_MAX_PENDING: int = 5000  # לכל ערוץ; מעבר לזה נזרקים הישנים
+
+    # --- HTTP client ל-Bot API: pool נפרד לכל סוג תעבורה ---
+    TELEGRAM_HTTP_VERSION: str = "1.1"  # "2" -> HTTP/2 (multiplexing על פחות חיבורים)
+    TELEGRAM_POOL_SIZE: int = 64  # תשובות למשתמשים (reply_text, edit_message_text)
+    TELEGRAM_LOG_POOL_SIZE: int = 8  # הודעות לערוצי הלוג / אדמין
+    TELEGRAM_UPDATES_POOL_SIZE: int = 2  # get_updates (polling מקומי)
+    TELEGRAM_POOL_TIMEOUT_SEC: float = 5.0  # המתנה מקסימלית לחיבור פנוי
+    TELEGRAM_CONNECT_TIMEOUT_SEC: float = 5.0
+    TELEGRAM_READ_TIMEOUT_SEC: float = 10.0
+    TELEGRAM_WRITE_TIMEOUT_SEC: float = 10.0
+    TELEGRAM_KEEPALIVE_SEC: float = 60.0  # חיבור פנוי נשאר פתוח (httpx: 5 שניות)
+
+    # --- תזמון הודעות יוצאות לפי מגבלות טלגרם ---
+    SEND_RATE_LIMIT_ENABLED: bool = True
+    SEND_GLOBAL_PER_SEC: float = 30.0  # לבוט כולו – מתחלק בין WEB_CONCURRENCY workers
+    SEND_CHAT_PER_SEC: float = 1.0  # צ'אט פרטי
+    SEND_CHAT_BURST: int = 3
+    SEND_GROUP_PER_MIN: float = 20.0  # קבוצה / ערוץ (ערוצי הלוג)
+    SEND_MAX_RETRIES: int = 3  # אחרי 429 (retry_after)
+    SEND_CHAT_BUCKETS: int = 10000  # buckets של צ'אטים בזיכרון (LRU)
+
+    # --- הגבלת קצב למשתמש לפני ה-handlers ---
+    RATE_LIMIT_ENABLED: bool = True
+    # "סוג=לדקה/burst": cheap (מסכים סטטיים), db (upsert / שאילתות), rpc (DB + BSC)
+    RATE_LIMITS: str | None = "cheap=40/10,db=20/6,rpc=6/3"
+    RATE_LIMIT_MAX_BUCKETS: int = 50000  # LRU בזיכרון, לכל worker
+
+    # --- Broadcast לכל המשקיעים (/admin_broadcast) ---
+    BROADCAST_WORKERS: int = 8  # שליחות במקביל (וגודל ה-pool של בוט ה-broadcast)
+    BROADCAST_PER_SEC: float = 20.0  # מתחת ל-30/s של טלגרם – נשאר מקום לתשובות
+    BROADCAST_BATCH_SIZE: int = 500  # yield_per של ה-cursor על users
+    BROADCAST_CHECKPOINT_EVERY: int = 200  # תוצאות בין checkpoints
+    BROADCAST_CHECKPOINT_SEC: float = 5.0
+    BROADCAST_POLL_SEC: float = 5.0  # בדיקת broadcast חדש / המשך אחרי שגיאה
+
+    # --- מסכים מורכבים: מקורות במקביל, מקור איטי מוצג כ"לא זמין" ---
+    SCREEN_RPC_TIMEOUT_SEC: float = 3.0  # יתרת BNB / SLH על השרשרת
+    SCREEN_BOT_API_TIMEOUT_SEC: float = 2.0  # getMe (קישור ההפניה ב-/referrals)
+
+    # --- ניטור / בדיקות בריאות ברקע ---
+    HEALTH_SAMPLE_INTERVAL_SEC: float = 30.0
+    HEALTH_CHECK_TIMEOUT_SEC: float = 5.0
+    HEALTH_HISTORY_SIZE: int = 120
+
+    # --- חימום אחרי עלייה (DB pool, RPC, getMe) – /ready מחכה לו ---
+    WARMUP_RETRY_SEC: float = 5.0
+    WARMUP_WEBHOOK_WAIT_SEC: float = 20.0  # update שמגיע לפני שהבוט מוכן מחכה עד כאן
+    BACKGROUND_LOCK_RETRY_SEC: float = 15.0  # worker בלי ה-lock של מנועי הרקע מנסה שוב כל N שניות
+
+    # --- Tracing לכל update (webhook -> handler -> DB / RPC / Bot API) ---
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 0.05  # חלק מה-updates שנדגמים (0..1)
+    TRACE_EXPORT_FILE: str | None = "traces.jsonl"  # שורת OTLP/JSON לכל batch
+    TRACE_OTLP_ENDPOINT: str | None = None  # למשל http://otel-collector:4318/v1/traces
+
+    # --- תקציב SQL ל-handler (ברירת מחדל; @query_budget דורס) ---
+    QUERY_BUDGET_DEFAULT: int = 20
+    QUERY_BUDGET_STRICT: bool = False  # True -> חריגה זורקת חריגה (בבדיקות / CI)
+    QUERY_REPEAT_THRESHOLD: int = 3  # אותו statement N פעמים ב-update -> חשד N+1
+
+    # --- פרופיילר לפי דרישה (/admin_profile, /admin/profile) ---
+    ADMIN_API_TOKEN: str | None = None  # X-Admin-Token ל-/admin/profile*; ריק -> ה-endpoints כבויים (404)
+    PROFILER_INTERVAL_SEC: float = 0.01
+    PROFILER_MAX_SECONDS: float = 60.0
+    SLOW_UPDATE_THRESHOLD_SEC: float = 2.0  # 0 -> בלי exemplars
+    SLOW_UPDATE_EXEMPLARS: int = 50
+
+    # --- ניטור event loop (lag + קריאות חוסמות) ---
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_SEC: float = 0.5
+    LOOP_LAG_THRESHOLD_SEC: float = 0.25
+    LOOP_MONITOR_DEBUG: bool = False  # מזהה handler + אתר קריאה; מפעיל asyncio debug
+
+    # --- לוגים: JSON דרך תור + thread כותב ---
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_QUEUE_SIZE: int = 10000
+    # דגימת INFO/DEBUG ל-loggers רועשים: "logger=rate,..."
+    LOG_SAMPLING: str | None = "slhnet.safety=0.01"
+
+    # --- מצב שיחה למשתמש (שפה, flows של העברה/קישור ארנק) ---
+    USER_STATE_CACHE_SIZE: int = 10000  # LRU בזיכרון, לכל worker
+    USER_STATE_CACHE_SEC: float = 5.0  # אחרי זה קוראים שוב מה-DB (כמה workers)
+    USER_STATE_FLUSH_SEC: float = 1.0  # כתיבה מרוכזת של שינויים
+    USER_STATE_FLOW_TTL_SEC: int = 1800  # flow נטוש פג אחרי חצי שעה
 
     # --- שפות ---
     DEFAULT_LANGUAGE: str = "en"
@@ -1,7 +1,11 @@
+import json
+import logging
 from decimal import Decimal
 from sqlalchemy.orm import Session
 
-from app import models
+from app import models, blockchain
+
+logger = logging.getLogger(__name__)
 
 
 def get_or_create_user(db: Session, telegram_id: int, username: str | None):
@@ -25,11 +29,22 @@ def get_or_create_user(db: Session, telegram_id: int, username: str | None):
     return user
 
 
+def normalize_address(address: str | None) -> str | None:
+    """כתובת בצורת checksum, או None אם היא לא כתובת תקינה."""
+    if not address:
+        return None
+    try:
+        return blockchain.to_checksum_address(address.strip())
+    except Exception:
+        return None
+
+
 def set_bnb_address(db: Session, user: models.User, address: str):
     """
-    מעדכן את כתובת ה-BNB של המשתמש.
+    מעדכן את כתובת ה-BNB של המשתמש (וה-checksum שלה, לפיו מותאמות הפקדות).
     """
     user.bnb_address = address
+    user.bnb_address_checksum = normalize_address(address)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -43,9 +58,13 @@ def change_balance(
     tx_type: str,
     from_user: int | None,
     to_user: int | None,
+    commit: bool = True,
 ) -> models.Transaction:
     """
     שינוי יתרה פנימית + יצירת טרנזקציה בלג'ר.
+
+    commit=False -> רק flush (tx.id זמין), ה-commit באחריות הקורא –
+    מאפשר לזקוף הרבה שינויים בטרנזקציית DB אחת.
     """
     amount = Decimal(str(delta_slh))
 
@@ -61,6 +80,10 @@ def change_balance(
 
     db.add(user)
     db.add(tx)
+    if not commit:
+        db.flush()
+        return tx
+
     db.commit()
     db.refresh(user)
     db.refresh(tx)
@@ -104,3 +127,256 @@ def internal_transfer(
     db.refresh(receiver)
     db.refresh(tx)
     return tx
+
+
+def get_chain_cursor(db: Session, name: str) -> int | None:
+    """
+    מחזיר את הבלוק האחרון שעובד ע"י סורק בשם name (או None).
+    """
+    cursor = db.get(models.ChainCursor, name)
+    return int(cursor.block_number) if cursor else None
+
+
+def set_chain_cursor(db: Session, name: str, block_number: int) -> None:
+    """
+    מעדכן cursor של סורק (ללא commit – חלק מאותה טרנזקציה של הזיכויים).
+    """
+    cursor = db.get(models.ChainCursor, name)
+    if cursor is None:
+        cursor = models.ChainCursor(name=name, block_number=block_number)
+    else:
+        cursor.block_number = block_number
+    db.add(cursor)
+
+
+def backfill_address_checksums(db: Session, batch_size: int = 500) -> int:
+    """
+    ממלא bnb_address_checksum למשתמשים שקישרו ארנק לפני שהעמודה נוספה.
+    מחזיר כמה כתובות תקינות עודכנו.
+    """
+    rows = (
+        db.query(models.User)
+        .filter(
+            models.User.bnb_address.isnot(None),
+            models.User.bnb_address_checksum.is_(None),
+        )
+        .yield_per(batch_size)
+    )
+    updated = 0
+    for user in rows:
+        checksum = normalize_address(user.bnb_address)
+        if checksum is not None:
+            user.bnb_address_checksum = checksum
+            updated += 1
+    db.commit()
+    return updated
+
+
+def users_by_address(db: Session, addresses) -> dict[str, int]:
+    """
+    כתובות checksum -> telegram_id, בשאילתה אחת על האינדקס.
+    כתובת שמקושרת ליותר ממשתמש אחד לא מוחזרת (אי אפשר לדעת למי לזקוף).
+    """
+    addresses = set(addresses)
+    if not addresses:
+        return {}
+
+    owners: dict[str, int] = {}
+    ambiguous: set[str] = set()
+    for address, telegram_id in db.query(
+        models.User.bnb_address_checksum, models.User.telegram_id
+    ).filter(models.User.bnb_address_checksum.in_(addresses)):
+        if address in owners and owners[address] != telegram_id:
+            ambiguous.add(address)
+        owners[address] = telegram_id
+
+    for address in ambiguous:
+        logger.warning("Address %s is linked to several users – skipped", address)
+        owners.pop(address, None)
+    return owners
+
+
+def _deposit_credit(
+    asset: str, amount: Decimal, bnb_to_slh_rate: Decimal | None
+) -> tuple[str, Decimal | None]:
+    """(status, סכום SLH לזקיפה) להפקדה של משתמש מוכר."""
+    if asset == "SLH":
+        return "credited", amount
+    if bnb_to_slh_rate:
+        return "credited", amount * Decimal(str(bnb_to_slh_rate))
+    return "recorded", None
+
+
+def _credit_deposit(
+    db: Session, user: models.User, asset: str, credit: Decimal | None
+) -> models.Transaction | None:
+    if credit is None:
+        return None
+    return change_balance(
+        db,
+        user=user,
+        delta_slh=credit,
+        tx_type=f"deposit_{asset.lower()}",
+        from_user=None,
+        to_user=user.telegram_id,
+        commit=False,
+    )
+
+
+def credit_deposits(
+    db: Session,
+    deposits: list[dict],
+    bnb_to_slh_rate: Decimal | None = None,
+    cursor: tuple[str, int] | None = None,
+) -> list[models.Deposit]:
+    """
+    זקיפת אצווה של הפקדות On-Chain ללדג'ר בטרנזקציית DB אחת.
+
+    כל הפקדה היא dict עם: tx_hash, log_index, block_number, asset,
+    from_address, amount, telegram_id (או None).
+    הפקדות שכבר קיימות (לפי tx_hash + log_index) מדולגות – כך שאפשר
+    להריץ שוב את אותו טווח בלוקים בבטחה.
+    אם cursor=(name, block) – ה-cursor מתעדכן באותו commit.
+    """
+    new_rows: list[models.Deposit] = []
+
+    if deposits:
+        hashes = {d["tx_hash"] for d in deposits}
+        existing = {
+            (tx_hash, log_index)
+            for tx_hash, log_index in db.query(
+                models.Deposit.tx_hash, models.Deposit.log_index
+            ).filter(models.Deposit.tx_hash.in_(hashes))
+        }
+
+        tids = {d["telegram_id"] for d in deposits if d.get("telegram_id")}
+        users = {
+            u.telegram_id: u
+            for u in db.query(models.User).filter(
+                models.User.telegram_id.in_(tids)
+            )
+        } if tids else {}
+
+        for d in deposits:
+            key = (d["tx_hash"], d["log_index"])
+            if key in existing:
+                continue
+            existing.add(key)
+
+            amount = Decimal(str(d["amount"]))
+            user = users.get(d.get("telegram_id"))
+
+            if user is None:
+                status, credit = "unmatched", None
+            else:
+                status, credit = _deposit_credit(d["asset"], amount, bnb_to_slh_rate)
+            ledger_tx = _credit_deposit(db, user, d["asset"], credit)
+
+            row = models.Deposit(
+                tx_hash=d["tx_hash"],
+                log_index=d["log_index"],
+                block_number=d["block_number"],
+                asset=d["asset"],
+                from_address=d["from_address"],
+                amount=amount,
+                telegram_id=user.telegram_id if user else None,
+                ledger_tx_id=ledger_tx.id if ledger_tx else None,
+                status=status,
+            )
+            db.add(row)
+            new_rows.append(row)
+
+    if cursor is not None:
+        set_chain_cursor(db, cursor[0], cursor[1])
+
+    db.commit()
+    return new_rows
+
+
+def queue_payout(
+    db: Session,
+    user: models.User,
+    to_address: str,
+    amount_slh: float | Decimal,
+    asset: str = "SLH",
+) -> models.Payout:
+    """
+    מוריד את הסכום מהיתרה הפנימית ומכניס בקשת משיכה לתור (status=queued).
+    השליחה עצמה לשרשרת מתבצעת ע"י PayoutEngine.
+    """
+    amount = Decimal(str(amount_slh))
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError("Amount must be greater than zero.")
+
+    balance = user.balance_slh or Decimal("0")
+    if balance < amount:
+        raise ValueError("Insufficient balance for this payout.")
+
+    ledger_tx = change_balance(
+        db,
+        user=user,
+        delta_slh=-amount,
+        tx_type="payout_slh",
+        from_user=user.telegram_id,
+        to_user=None,
+        commit=False,
+    )
+
+    payout = models.Payout(
+        telegram_id=user.telegram_id,
+        to_address=to_address,
+        asset=asset,
+        amount=amount,
+        status="queued",
+        ledger_tx_id=ledger_tx.id,
+    )
+    db.add(payout)
+    db.commit()
+    db.refresh(payout)
+    return payout
+
+
+def create_broadcast(
+    db: Session, created_by: int | None, texts: dict[str, str]
+) -> models.Broadcast:
+    """
+    יוצר broadcast במצב draft. השליחה מתחילה רק אחרי start_broadcast.
+    texts: {lang: text}
+    """
+    if not texts:
+        raise ValueError("Broadcast text is empty.")
+
+    broadcast = models.Broadcast(
+        created_by=created_by,
+        texts=json.dumps(texts, ensure_ascii=False),
+        status="draft",
+    )
+    db.add(broadcast)
+    db.commit()
+    db.refresh(broadcast)
+    return broadcast
+
+
+# מעברי מצב מותרים ל-broadcast (מה-admin)
+_BROADCAST_TRANSITIONS = {
+    "sending": ("draft",),
+    "cancelled": ("draft", "sending"),
+}
+
+
+def set_broadcast_status(
+    db: Session, broadcast_id: int, status: str
+) -> models.Broadcast:
+    """draft -> sending (שליחה), draft / sending -> cancelled."""
+    broadcast = db.get(models.Broadcast, broadcast_id)
+    if broadcast is None:
+        raise ValueError(f"Broadcast #{broadcast_id} not found.")
+    if broadcast.status not in _BROADCAST_TRANSITIONS[status]:
+        raise ValueError(
+            f"Broadcast #{broadcast_id} is {broadcast.status}, cannot set {status}."
+        )
+
+    broadcast.status = status
+    db.commit()
+    db.refresh(broadcast)
+    return broadcast
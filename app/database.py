@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.core.config import settings
+from app import metrics, query_budget, tracing
 
 # יצירת engine מול ה-Postgres מריילווי
 engine = create_engine(
@@ -9,6 +10,9 @@ engine = create_engine(
     future=True,
     pool_pre_ping=True,  # מונע בעיות חיבור מתות
 )
+metrics.instrument_engine(engine)
+tracing.instrument_engine(engine)
+query_budget.instrument_engine(engine)
 
 # Session של SQLAlchemy לעבודה מול ה-DB
 SessionLocal = sessionmaker(
@@ -31,6 +35,27 @@ def init_db():
     from app import models  # noqa: F401
 
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns():
+    """
+    create_all לא משנה טבלאות קיימות: עמודה חדשה (nullable) במודל
+    נוספת כאן עם ALTER TABLE, וכל האינדקסים של המודל נוצרים אם חסרים.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                )
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
 
 
 def get_db():
@@ -0,0 +1,120 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SECONDS = metrics.Histogram(
+    "slh_screen_source_seconds",
+    "Time to fetch one data source of a composite screen",
+    ("source", "result"),
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class _Unavailable:
+    """מקור שלא חזר בזמן / נכשל. falsy – התבנית מציגה placeholder."""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "UNAVAILABLE"
+
+
+UNAVAILABLE = _Unavailable()
+
+
+def available(value: Any) -> bool:
+    """יש ערך להציג – לא None ולא UNAVAILABLE."""
+    return value is not None and value is not UNAVAILABLE
+
+
+class Source(NamedTuple):
+    """
+    מקור נתונים של מסך.
+
+    fetch מקבל את הערכים של after (לפי הסדר). פונקציה רגילה רצה ב-thread
+    (DB / web3 חוסמים), coroutine function רצה ב-loop (Bot API).
+    timeout נספר מהרגע שה-after מוכנים; required -> חריגה במקום UNAVAILABLE.
+    """
+
+    fetch: Callable[..., Any]
+    after: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    required: bool = False
+
+
+class DataLoader:
+    """
+    הנתונים של מסך מורכב אחד (/summary, /balance, /referrals): המסך מצהיר
+    על המקורות, וכולם נטענים במקביל – כל מקור מחכה רק ל-after שלו.
+
+    מקור שעבר את ה-timeout שלו (או נכשל) מחזיר UNAVAILABLE והמסך מוצג
+    חלקית, במקום לחכות למקור האיטי ביותר. ה-thread של מקור שפג לא נעצר –
+    התוצאה שלו פשוט לא נחכית.
+    """
+
+    def __init__(self, sources: Dict[str, Source]):
+        self._sources = sources
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _task(self, name: str) -> asyncio.Task:
+        task = self._tasks.get(name)
+        if task is None:
+            task = self._tasks[name] = asyncio.ensure_future(self._run(name))
+        return task
+
+    async def _fetch(self, source: Source) -> Any:
+        deps = [await self.get(dep) for dep in source.after]
+        if any(dep is UNAVAILABLE for dep in deps):
+            return UNAVAILABLE
+        if inspect.iscoroutinefunction(source.fetch):
+            call = source.fetch(*deps)
+        else:
+            call = asyncio.to_thread(source.fetch, *deps)
+        return await asyncio.wait_for(call, timeout=source.timeout)
+
+    async def _run(self, name: str) -> Any:
+        source = self._sources[name]
+        started = time.perf_counter()
+        result = "ok"
+        try:
+            return await self._fetch(source)
+        except asyncio.TimeoutError:
+            result = "timeout"
+            if source.required:
+                raise
+            logger.warning(
+                "Screen data source %s timed out after %.1fs", name, source.timeout
+            )
+            return UNAVAILABLE
+        except Exception as e:
+            result = "error"
+            if source.required:
+                raise
+            logger.warning("Screen data source %s failed: %s", name, e)
+            return UNAVAILABLE
+        finally:
+            SOURCE_SECONDS.observe(time.perf_counter() - started, name, result)
+
+    async def get(self, name: str) -> Any:
+        # shield – מקור שתלוי בו ופג לא מבטל את הטעינה המשותפת
+        return await asyncio.shield(self._task(name))
+
+    async def load(self) -> Dict[str, Any]:
+        """כל המקורות במקביל -> {name: value}."""
+        names = list(self._sources)
+        try:
+            values = await asyncio.gather(*(self.get(name) for name in names))
+        except Exception:
+            for task in self._tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(names, values))
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app import models, crud, blockchain
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = "deposit_watcher"
+
+
+class DepositWatcher:
+    """
+    סורק הפקדות לארנק הקהילתי:
+    - אירועי Transfer של SLH + העברות BNB ישירות בטווח בלוקים מאושרים
+    - התאמת שולחים למשתמשים בשאילתה אחת על users.bnb_address_checksum
+    - זקיפה ללדג'ר באצוות (crud.credit_deposits) עם tx_hash כמפתח אידמפוטנטיות
+    - הפקדות unmatched לא נזקפות אוטומטית גם אם מישהו קישר אחר כך את
+      הכתובת (קישור ארנק לא מוכיח בעלות) – נשארות לבדיקה של אדמין
+    """
+
+    def __init__(self):
+        self._backfilled = False
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    def _fetch_transfers(self, start: int, end: int) -> List[Dict[str, Any]]:
+        community = settings.COMMUNITY_WALLET_ADDRESS
+        transfers: List[Dict[str, Any]] = []
+        transfers.extend(
+            blockchain.get_token_transfers_to(community, start, end) or []
+        )
+        transfers.extend(
+            blockchain.get_native_transfers_to(community, start, end) or []
+        )
+        return transfers
+
+    def _match_senders(self, db, transfers: List[Dict[str, Any]]) -> None:
+        owners = crud.users_by_address(db, (t["from_address"] for t in transfers))
+        for t in transfers:
+            t["telegram_id"] = owners.get(t["from_address"])
+
+    def poll_once(self) -> tuple[int, bool]:
+        """
+        סבב סריקה יחיד (סינכרוני – רץ ב-thread).
+        מחזיר (מספר הפקדות חדשות, האם נשארו עוד בלוקים לסרוק).
+        """
+        latest = blockchain.get_block_number()
+        if latest is None:
+            return 0, False
+
+        safe = latest - max(0, int(settings.DEPOSIT_CONFIRMATIONS))
+
+        db = SessionLocal()
+        try:
+            if not self._backfilled:
+                # כתובות שקושרו לפני שהייתה עמודת checksum – פעם אחת לתהליך
+                updated = crud.backfill_address_checksums(db)
+                if updated:
+                    logger.info("Backfilled %s wallet address checksums", updated)
+                self._backfilled = True
+
+            last = crud.get_chain_cursor(db, CURSOR_NAME)
+            if last is None:
+                if settings.DEPOSIT_START_BLOCK is not None:
+                    last = int(settings.DEPOSIT_START_BLOCK) - 1
+                else:
+                    # הפעלה ראשונה בלי בלוק התחלה – מתחילים מעכשיו
+                    crud.set_chain_cursor(db, CURSOR_NAME, safe)
+                    db.commit()
+                    logger.info("Deposit watcher cursor initialized at block %s", safe)
+                    return 0, False
+
+            if safe <= last:
+                return 0, False
+
+            start = last + 1
+            end = min(safe, last + max(1, int(settings.DEPOSIT_MAX_BLOCK_RANGE)))
+
+            transfers = self._fetch_transfers(start, end)
+            self._match_senders(db, transfers)
+
+            batch_size = max(1, int(settings.DEPOSIT_BATCH_SIZE))
+            batches = [
+                transfers[i:i + batch_size]
+                for i in range(0, len(transfers), batch_size)
+            ] or [[]]
+
+            created: List[models.Deposit] = []
+            for i, batch in enumerate(batches):
+                is_last = i == len(batches) - 1
+                created.extend(
+                    crud.credit_deposits(
+                        db,
+                        batch,
+                        bnb_to_slh_rate=settings.DEPOSIT_BNB_TO_SLH_RATE,
+                        cursor=(CURSOR_NAME, end) if is_last else None,
+                    )
+                )
+
+            if transfers:
+                blockchain.note_touched(
+                    [settings.COMMUNITY_WALLET_ADDRESS]
+                    + [t["from_address"] for t in transfers]
+                )
+
+            for row in created:
+                logger.info(
+                    "Deposit %s %s from %s (tx=%s) -> user=%s status=%s",
+                    row.amount,
+                    row.asset,
+                    row.from_address,
+                    row.tx_hash,
+                    row.telegram_id,
+                    row.status,
+                )
+
+            return len(created), end < safe
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        interval = max(1.0, float(settings.DEPOSIT_POLL_INTERVAL_SEC))
+        logger.info("Deposit watcher started (interval=%ss)", interval)
+
+        while not self._stopping.is_set():
+            behind = False
+            try:
+                _, behind = await asyncio.to_thread(self.poll_once)
+            except Exception as e:
+                logger.exception("Deposit watcher poll failed: %s", e)
+
+            # בזמן השלמת פער (catch-up) לא ממתינים בין טווחים
+            if behind:
+                continue
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Deposit watcher stopped")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+
+_watcher = DepositWatcher()
+
+
+def start_deposit_watcher() -> None:
+    if not settings.DEPOSIT_WATCHER_ENABLED:
+        return
+
+    if not settings.BSC_RPC_URL or not settings.COMMUNITY_WALLET_ADDRESS:
+        logger.warning(
+            "Deposit watcher enabled but BSC_RPC_URL / COMMUNITY_WALLET_ADDRESS missing"
+        )
+        return
+
+    _watcher.start()
+
+
+async def stop_deposit_watcher() -> None:
+    await _watcher.stop()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# מגבלת טלגרם לטקסט של הודעה אחת
+MAX_MESSAGE_CHARS = 4096
+
+DIGEST_EVENTS = metrics.Counter(
+    "slh_log_digest_events_total", "Log-channel events buffered for a digest", ("kind",)
+)
+DIGEST_DROPPED = metrics.Counter(
+    "slh_log_digest_dropped_total", "Log-channel events dropped because the buffer was full", ("kind",)
+)
+DIGEST_MESSAGES = metrics.Counter(
+    "slh_log_digest_messages_total", "Digest messages sent to log channels", ("kind", "result")
+)
+DIGEST_PENDING = metrics.Gauge(
+    "slh_log_digest_pending", "Log-channel events waiting for the next digest"
+)
+
+Sender = Callable[[Any, str], Awaitable[Any]]
+
+
+class _Stream:
+    """אירועים של סוג אחד לערוץ אחד, מאז ה-digest הקודם."""
+
+    __slots__ = ("chat_id", "kind", "title", "events", "first_at", "dropped")
+
+    def __init__(self, chat_id: Any, kind: str, title: str, max_pending: int):
+        self.chat_id = chat_id
+        self.kind = kind
+        self.title = title
+        self.events: Deque[str] = deque(maxlen=max_pending)
+        self.first_at = 0.0
+        self.dropped = 0
+
+
+class LogDigest:
+    """
+    מאחד הודעות לערוצי הלוג (משקיע חדש, רפרל) ל-digest אחד לכל חלון:
+    - add() רק מוסיף לתור בזיכרון – ה-handler (/start) לא מחכה לטלגרם
+    - stream נשלח כשהצטברו max_events אירועים, או window_sec אחרי
+      האירוע הראשון בו
+    - digest ארוך מתפצל לכמה הודעות (4096 תווים); תור מלא זורק את הישנים
+      ביותר ומציין כמה נזרקו
+    """
+
+    def __init__(self, window_sec: float, max_events: int, max_pending: int):
+        self._window = window_sec
+        self._max_events = max(1, max_events)
+        self._max_pending = max(self._max_events, max_pending)
+        self._streams: Dict[Tuple[Any, str], _Stream] = {}
+        self._send: Optional[Sender] = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+        DIGEST_PENDING.set_function(
+            lambda: sum(len(s.events) for s in self._streams.values())
+        )
+
+    def bind(self, send: Sender) -> None:
+        """send(chat_id, text) – נקבע כשהבוט מאותחל."""
+        self._send = send
+
+    def add(self, chat_id: Any, kind: str, title: str, event: str) -> None:
+        key = (chat_id, kind)
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _Stream(chat_id, kind, title, self._max_pending)
+
+        if not stream.events:
+            stream.first_at = time.monotonic()
+        elif len(stream.events) == self._max_pending:
+            stream.dropped += 1
+            DIGEST_DROPPED.inc(kind)
+        stream.events.append(event)
+        DIGEST_EVENTS.inc(kind)
+
+        if len(stream.events) >= self._max_events:
+            self._wake.set()
+
+    # ===== Flush =====
+
+    def _due(self, stream: _Stream, now: float, force: bool) -> bool:
+        if not stream.events:
+            return False
+        return (
+            force
+            or len(stream.events) >= self._max_events
+            or now - stream.first_at >= self._window
+        )
+
+    def _render(self, stream: _Stream, events: List[str], dropped: int) -> List[str]:
+        header = f"{stream.title} ×{len(events)}"
+        if dropped:
+            header += f" (+{dropped} dropped)"
+
+        messages: List[str] = []
+        current = header
+        for event in events:
+            event = event[: MAX_MESSAGE_CHARS - len(header) - 2]
+            if len(current) + 2 + len(event) > MAX_MESSAGE_CHARS:
+                messages.append(current)
+                current = header + " (cont.)"
+            current += "\n\n" + event
+        messages.append(current)
+        return messages
+
+    async def flush(self, force: bool = False) -> int:
+        """שולח כל stream שהגיע זמנו. מחזיר כמה הודעות נשלחו."""
+        if self._send is None:
+            return 0
+
+        now = time.monotonic()
+        sent = 0
+        for stream in list(self._streams.values()):
+            if not self._due(stream, now, force):
+                continue
+
+            # לוקחים עד max_events; מה שנשאר ייצא בסיבוב הבא
+            count = min(len(stream.events), self._max_events)
+            events = [stream.events.popleft() for _ in range(count)]
+            dropped, stream.dropped = stream.dropped, 0
+            if stream.events:
+                stream.first_at = now
+
+            for text in self._render(stream, events, dropped):
+                try:
+                    await self._send(stream.chat_id, text)
+                    DIGEST_MESSAGES.inc(stream.kind, "ok")
+                    sent += 1
+                except Exception as e:
+                    DIGEST_MESSAGES.inc(stream.kind, "error")
+                    logger.warning("Failed to send %s digest: %s", stream.kind, e)
+        return sent
+
+    def _next_deadline(self) -> Optional[float]:
+        pending = [s.first_at for s in self._streams.values() if s.events]
+        return min(pending) + self._window if pending else None
+
+    async def run(self) -> None:
+        logger.info(
+            "Log digest started (window=%ss, max_events=%s)", self._window, self._max_events
+        )
+        while not self._stopping.is_set():
+            deadline = self._next_deadline()
+            if deadline is None or self._send is None:
+                # אין מה לשלוח / הבוט עוד לא מאותחל
+                timeout = self._window
+            else:
+                timeout = max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Log digest flush failed: %s", e)
+
+        logger.info("Log digest stopped")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        await self._task
+        self._task = None
+        if self._send is None:
+            return
+        # מה שנשאר בתור יוצא לפני שהתהליך יורד
+        try:
+            while any(s.events for s in self._streams.values()):
+                await self.flush(force=True)
+        except Exception as e:
+            logger.exception("Final log digest flush failed: %s", e)
+
+
+log_digest = LogDigest(
+    window_sec=settings.LOG_DIGEST_WINDOW_SEC,
+    max_events=settings.LOG_DIGEST_MAX_EVENTS,
+    max_pending=settings.LOG_DIGEST_MAX_PENDING,
+)
+
+
+def start_log_digest() -> None:
+    log_digest.start()
+
+
+async def stop_log_digest() -> None:
+    await log_digest.stop()
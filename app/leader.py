@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import zlib
+from typing import Optional
+
+from sqlalchemy import text
+from telegram import Bot
+
+from app.core.config import settings
+from app.database import engine, init_db
+
+logger = logging.getLogger(__name__)
+
+# True אחרי שתופעות הלוואי של העלייה בוצעו בתהליך הזה. בגוניקורן עם
+# preload זה קורה ב-master, וה-workers יורשים את הדגל ב-fork ומדלגים.
+_startup_done = False
+
+
+class AdvisoryLock:
+    """
+    pg advisory lock ברמת session, על חיבור ייעודי מה-engine.
+    ה-lock משתחרר ב-release() או כשהחיבור נסגר (גם אם התהליך מת).
+    לא Postgres (SQLite בפיתוח) -> תהליך יחיד, תמיד מצליח.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = zlib.crc32(name.encode())
+        self._conn = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None
+
+    def _connect(self):
+        if engine.dialect.name != "postgresql":
+            return None
+        # autocommit: חיבור שמחזיק lock לאורך זמן לא נשאר "idle in transaction"
+        return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    def try_acquire(self) -> bool:
+        if self._conn is not None:
+            return True
+        conn = self._connect()
+        if conn is None:
+            self._conn = False
+            return True
+        got = conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+        ).scalar()
+        if got:
+            self._conn = conn
+        else:
+            conn.close()
+        return bool(got)
+
+    def acquire(self) -> None:
+        """חוסם עד שמי שמחזיק את ה-lock משחרר אותו."""
+        if self._conn is not None:
+            return
+        conn = self._connect()
+        if conn is not None:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": self.key})
+        self._conn = conn if conn is not None else False
+
+    def release(self) -> None:
+        conn, self._conn = self._conn, None
+        if not conn:
+            return
+        try:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+        finally:
+            conn.close()
+
+
+# init_db + setWebhook – פעם אחת לכל deploy, לא פעם לכל תהליך
+startup_lock = AdvisoryLock("slh:startup")
+# מנועי רקע שחייבים מופע יחיד (nonce מקומי של payouts, סריקת הפקדות)
+background_lock = AdvisoryLock("slh:background")
+
+
+async def wait_for_lock(lock: AdvisoryLock, retry_sec: float) -> None:
+    """
+    try_acquire כל retry_sec עד שמצליח: אם מי שמחזיק את ה-lock ירד (deploy,
+    crash), תהליך אחר לוקח את מנועי הרקע במקומו.
+    """
+    while True:
+        try:
+            if await asyncio.to_thread(lock.try_acquire):
+                logger.info("Acquired %s", lock.name)
+                return
+        except Exception as e:
+            logger.warning("Failed to acquire %s: %s", lock.name, e)
+        await asyncio.sleep(retry_sec)
+
+
+def webhook_url() -> Optional[str]:
+    if not settings.WEBHOOK_URL:
+        return None
+    return f"{settings.WEBHOOK_URL.rstrip('/')}/webhook/telegram"
+
+
+async def sync_webhook(bot: Optional[Bot] = None) -> None:
+    """setWebhook רק אם getWebhookInfo מחזיר URL אחר."""
+    url = webhook_url()
+    if url is None:
+        logger.info("No WEBHOOK_URL set - you can run in polling mode locally")
+        return
+    if not settings.BOT_TOKEN:
+        return
+
+    if bot is None:
+        async with Bot(settings.BOT_TOKEN) as own_bot:
+            await sync_webhook(own_bot)
+        return
+
+    info = await bot.get_webhook_info()
+    if info.url == url:
+        logger.info("Webhook already set to: %s", url)
+        return
+    await bot.set_webhook(url)
+    logger.info("Webhook set to: %s (was: %s)", url, info.url or "-")
+
+
+async def run_startup_tasks(bot: Optional[Bot] = None) -> None:
+    """
+    init_db + sync_webhook תחת startup_lock:
+    - מי שתפס את ה-lock מריץ אותם
+    - השאר מחכים שהוא יסיים (כדי לא לשרת לפני שהסכמה קיימת) ומדלגים
+    """
+    global _startup_done
+    if _startup_done:
+        return
+
+    leader = await asyncio.to_thread(startup_lock.try_acquire)
+    try:
+        if leader:
+            logger.info("Startup leader: running schema setup and webhook sync")
+            await asyncio.to_thread(init_db)
+            await sync_webhook(bot)
+        else:
+            logger.info("Another process is running startup tasks, waiting")
+            await asyncio.to_thread(startup_lock.acquire)
+    finally:
+        await asyncio.to_thread(startup_lock.release)
+    _startup_done = True
@@ -0,0 +1,184 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app import metrics, tracing
+
+# update_id של ה-update שמטופל כרגע (נקבע ב-webhook)
+current_update_id: ContextVar[Optional[int]] = ContextVar("slh_update_id", default=None)
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def parse_sampling(raw: str | None) -> Dict[str, float]:
+    """"slhnet.safety=0.01,app.deposits=0.5" -> {logger: rate}"""
+    rates: Dict[str, float] = {}
+    for part in (raw or "").split(","):
+        name, _, rate = part.strip().partition("=")
+        if not name or not rate:
+            continue
+        try:
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    דוגם הודעות INFO/DEBUG של loggers רועשים (לפי prefix של שם ה-logger).
+    WARNING ומעלה תמיד עוברים.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # prefix ארוך קודם – "slhnet.safety" גובר על "slhnet"
+        self._rates = sorted(rates.items(), key=lambda kv: len(kv[0]), reverse=True)
+        self._cache: Dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, r in self._rates:
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = r
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._rates:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler שלא חוסם ולא מפרמט:
+    - ה-thread הקורא רק מצמיד ids מה-context ומכניס לתור
+    - msg % args נבנה רק ב-thread הכותב (QueueListener)
+    - תור מלא -> ההודעה נזרקת ונספרת, ה-event loop לא מחכה
+    """
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]"):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.update_id = current_update_id.get()
+        record.trace_id = tracing.current_trace_id()
+        handler = metrics.current_handler.get()
+        record.handler = handler if handler != "background" else None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("update_id", "trace_id", "handler"):
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        update_id = getattr(record, "update_id", None)
+        if update_id is not None:
+            line += f" [update={update_id}]"
+        return line
+
+
+def setup_logging() -> None:
+    """
+    root logger -> NonBlockingQueueHandler -> QueueListener (thread) -> stdout.
+    נקרא פעם אחת בעליית התהליך; קריאה נוספת לא עושה כלום.
+    """
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(100, settings.LOG_QUEUE_SIZE))
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(q)
+    _queue_handler.addFilter(SamplingFilter(parse_sampling(settings.LOG_SAMPLING)))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def _restart_after_fork() -> None:
+    """
+    fork (gunicorn עם preload) מעתיק את התור אבל לא את ה-thread הכותב –
+    ב-worker פותחים תור ו-listener חדשים, אחרת הלוגים שלו לא נכתבים לעולם.
+    """
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    handlers = _listener.handlers
+    # התור של ה-master אולי ננעל באמצע put/get ברגע ה-fork
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _queue_handler.queue = q
+    _queue_handler.dropped = 0
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+LOG_DROPPED = metrics.Gauge(
+    "slh_log_records_dropped", "Log records dropped because the log queue was full"
+)
+LOG_DROPPED.set_function(dropped_records)
+
+
+def shutdown_logging() -> None:
+    """מרוקן את התור וסוגר את ה-thread הכותב."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
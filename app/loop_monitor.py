@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+HANDLER_PREFIXES = ("cmd_", "cb_", "handle_")
+# מודולים של שכבת המדידה עצמה – לא "אתר הקריאה" האמיתי
+_WRAPPER_MODULES = ("app.metrics", "app.tracing", "app.query_budget", "app.profiler")
+
+LOOP_LAG = metrics.Histogram(
+    "slh_event_loop_lag_seconds",
+    "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_LAG_MAX = metrics.Gauge(
+    "slh_event_loop_lag_max_seconds", "Worst event loop lag since the last scrape"
+)
+LOOP_STALLS = metrics.Counter(
+    "slh_event_loop_stalls_total", "Event loop blocked past the threshold", ("handler",)
+)
+
+
+def _module(frame) -> str:
+    return frame.f_globals.get("__name__", "?")
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{_module(frame)}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def describe_blocker(frames: List[Any]) -> Dict[str, Optional[str]]:
+    """
+    frames מהחיצוני לפנימי. מוצא את ה-handler (cmd_/cb_/handle_) ואת
+    הקריאה הסינכרונית שהוא עשה, למשל:
+    app.blockchain.get_onchain_balances called from cmd_summary (investor_wallet_bot.py:930)
+    """
+    handler_idx = None
+    for i, frame in enumerate(frames):
+        if frame.f_code.co_name.startswith(HANDLER_PREFIXES) and _module(frame).startswith("app."):
+            handler_idx = i
+
+    if handler_idx is None:
+        return {"handler": None, "call_site": _label(frames[-1]) if frames else None}
+
+    handler = frames[handler_idx]
+    callee = None
+    for frame in frames[handler_idx + 1:]:
+        mod = _module(frame)
+        if mod.startswith(_WRAPPER_MODULES):
+            continue
+        if callee is None:
+            callee = frame
+        if mod.startswith("app."):
+            callee = frame
+            break
+
+    where = f"{handler.f_code.co_filename.rsplit('/', 1)[-1]}:{handler.f_lineno}"
+    target = _label(callee) if callee is not None else "<inline code>"
+    return {
+        "handler": handler.f_code.co_name,
+        "call_site": f"{target} called from {handler.f_code.co_name} ({where})",
+    }
+
+
+class LoopLagMonitor:
+    """
+    - heartbeat ב-event loop: sleep(interval) ומדידת האיחור -> slh_event_loop_lag_seconds
+    - watchdog ב-thread נפרד: אם ה-heartbeat לא חזר מעבר לסף, הלולאה חסומה
+      עכשיו – לוכדים את ה-stack של ה-thread של הלולאה (הקוד הסינכרוני שמחזיק אותה)
+    - debug: מזהה handler + אתר קריאה, ומפעיל גם את slow-callback של asyncio
+    """
+
+    def __init__(self, interval_sec: float, threshold_sec: float, debug: bool = False):
+        self._interval = interval_sec
+        self._threshold = threshold_sec
+        self._debug = debug
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._stalls: deque = deque(maxlen=50)
+        self._max_lag = 0.0
+        self._open_stall: Optional[tuple[float, Dict[str, Any]]] = None
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+        self._watchdog: threading.Thread | None = None
+        self._watchdog_stop = threading.Event()
+
+        LOOP_LAG_MAX.set_function(self._take_max_lag)
+
+    def _take_max_lag(self) -> float:
+        value, self._max_lag = self._max_lag, 0.0
+        return value
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            self._beat = started
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, time.monotonic() - started - self._interval)
+            LOOP_LAG.observe(lag)
+            self._max_lag = max(self._max_lag, lag)
+
+            # ה-watchdog דיווח באמצע התקיעה – משלימים את משכה המלא
+            open_stall = self._open_stall
+            if open_stall is not None and open_stall[0] == started:
+                open_stall[1]["blocked_ms"] = round(lag * 1000, 1)
+                self._open_stall = None
+
+    def _capture(self, beat: float, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread)
+        frames: List[Any] = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+
+        info: Dict[str, Optional[str]] = {"handler": None, "call_site": None}
+        if self._debug and frames:
+            info = describe_blocker(frames)
+
+        stall = {
+            "time_utc": datetime.now(timezone.utc).isoformat(),
+            "blocked_ms": round(blocked_for * 1000, 1),
+            "handler": info["handler"],
+            "call_site": info["call_site"],
+            "stack": [f"{_label(f)} ({f.f_code.co_filename}:{f.f_lineno})" for f in frames],
+        }
+        self._stalls.append(stall)
+        self._open_stall = (beat, stall)
+        LOOP_STALLS.inc(info["handler"] or "unknown")
+
+        if info["call_site"]:
+            logger.warning(
+                "Event loop blocked for %.0f ms: %s", blocked_for * 1000, info["call_site"]
+            )
+        else:
+            logger.warning(
+                "Event loop blocked for %.0f ms at %s",
+                blocked_for * 1000,
+                stall["stack"][-1] if stall["stack"] else "?",
+            )
+
+    def _watch(self) -> None:
+        reported_beat = None
+        tick = max(0.01, min(self._interval, self._threshold) / 2)
+        while not self._watchdog_stop.wait(tick):
+            beat = self._beat
+            blocked_for = time.monotonic() - beat - self._interval
+            # דיווח אחד לכל תקיעה (עד ה-heartbeat הבא)
+            if blocked_for >= self._threshold and beat != reported_beat:
+                reported_beat = beat
+                try:
+                    self._capture(beat, blocked_for)
+                except Exception as e:
+                    logger.warning("Loop stall capture failed: %s", e)
+
+    def stalls(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return list(self._stalls)[-limit:][::-1]
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._debug:
+            loop.slow_callback_duration = self._threshold
+            loop.set_debug(True)
+
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+        self._watchdog_stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._watchdog_stop.set()
+        await self._task
+        self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+
+loop_monitor = LoopLagMonitor(
+    interval_sec=settings.LOOP_LAG_INTERVAL_SEC,
+    threshold_sec=settings.LOOP_LAG_THRESHOLD_SEC,
+    debug=settings.LOOP_MONITOR_DEBUG,
+)
+
+
+def start_loop_monitor() -> None:
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+
+async def stop_loop_monitor() -> None:
+    await loop_monitor.stop()
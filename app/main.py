@@ -1,21 +1,46 @@
+import asyncio
 import os
+import secrets
 import logging
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Tuple
 
-from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.database import init_db
+from app import metrics, tracing
+from app.logging_setup import setup_logging, shutdown_logging, current_update_id
 from app.bot.investor_wallet_bot import initialize_bot, process_webhook
-from app.monitoring import run_selftest
+from app.monitoring import health_sampler
+from app.profiler import profiler, slow_updates, ProfilerBusy
+from app.loop_monitor import loop_monitor, start_loop_monitor, stop_loop_monitor
+from app.core.config import settings
+from app.deposits import start_deposit_watcher, stop_deposit_watcher
+from app.payouts import start_payout_engine, stop_payout_engine
+from app.blockchain import start_block_tracker, stop_block_tracker
+from app.user_state import start_user_state, stop_user_state
+from app.leader import background_lock, run_startup_tasks, wait_for_lock
+from app.warmup import warmup, warm_db_pool
+from app.digest import start_log_digest, stop_log_digest
+from app.broadcast import start_broadcast_engine, stop_broadcast_engine
+from app import blockchain
 
 BUILD_ID = os.getenv("BUILD_ID", "local-dev")
 
+setup_logging()
+
 log = logging.getLogger("slhnet")
+# שורה לכל הודעת קבוצה – נדגמת (LOG_SAMPLING)
+safety_log = logging.getLogger("slhnet.safety")
 
 app = FastAPI(title="SLH Investor Gateway")
 
+# כמה זמן מנועי הרקע מחכים לחימום השרשרת לפני שהם עולים בכל זאת
+CHAIN_WARMUP_WAIT_SEC = 60.0
+
+_background_task: asyncio.Task | None = None
+
 
 def _slh_is_private_update(payload: Dict[str, Any]) -> bool:
     try:
@@ -65,8 +90,75 @@ def _slh_chat_fingerprint(payload: Dict[str, Any]) -> Tuple[str, str]:
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
-    await initialize_bot()
+    tracing.start_tracing()
+    start_loop_monitor()
+    # בגוניקורן עם preload כבר רץ ב-master – ב-worker זה no-op
+    await run_startup_tasks()
+    start_user_state()
+    start_log_digest()
+    start_block_tracker()
+    health_sampler.start()
+
+    # עבודת רשת (getMe, חיבורי DB, web3 + RPC) במקביל וברקע; /ready מחכה לה
+    warmup.add("telegram", initialize_bot, required=True)
+    warmup.add("database", warm_db_pool, required=True)
+    warmup.add("chain", _warm_chain)
+    warmup.start()
+
+    global _background_task
+    _background_task = asyncio.create_task(_run_background_engines())
+
+
+async def _warm_chain() -> None:
+    await asyncio.to_thread(blockchain.warm_up)
+
+
+async def _run_background_engines() -> None:
+    # כמה workers / replicas – רק מי שמחזיק את ה-lock מריץ הפקדות, תשלומים ו-broadcast.
+    # השאר ממשיכים לנסות, בלי קשר לחימום השרשרת
+    await wait_for_lock(background_lock, settings.BACKGROUND_LOCK_RETRY_SEC)
+
+    # broadcast לא צריך RPC – עולה מיד, בלי לחכות לשרשרת ובלי תלות בהפקדות
+    try:
+        start_broadcast_engine()
+    except Exception as e:
+        log.exception("Failed to start broadcast engine: %s", e)
+
+    await warmup.wait("chain", timeout=CHAIN_WARMUP_WAIT_SEC)
+    try:
+        start_deposit_watcher()
+        start_payout_engine()
+    except Exception as e:
+        log.exception("Failed to start chain engines: %s", e)
+
+
+async def _stop_background_task() -> None:
+    global _background_task
+    if _background_task is None:
+        return
+    _background_task.cancel()
+    try:
+        await _background_task
+    except asyncio.CancelledError:
+        pass
+    _background_task = None
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await warmup.stop()
+    await _stop_background_task()
+    await health_sampler.stop()
+    await stop_deposit_watcher()
+    await stop_payout_engine()
+    await stop_broadcast_engine()
+    await asyncio.to_thread(background_lock.release)
+    await stop_block_tracker()
+    await stop_user_state()
+    await stop_log_digest()
+    await stop_loop_monitor()
+    await tracing.stop_tracing()
+    shutdown_logging()
 
 
 @app.get("/")
@@ -107,25 +199,106 @@ async def whoami(request: Request):
 
 @app.get("/ready")
 async def ready():
-    result = run_selftest(quick=True)
-    return {"status": result.get("status"), "checks": result.get("checks")}
+    if not warmup.ready:
+        return JSONResponse(
+            {"status": "warming", "warmup": warmup.status()},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    sample = health_sampler.latest()
+    if sample is None:
+        return JSONResponse(
+            {"status": "starting", "checks": {}},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return {
+        "status": sample.get("status"),
+        "checks": sample.get("checks"),
+        "sampled_at": sample.get("time_utc"),
+    }
 
 
 @app.get("/selftest")
 async def selftest():
-    return run_selftest(quick=False)
+    return await health_sampler.latest_or_sample()
+
+
+@app.get("/selftest/history")
+async def selftest_history(limit: int = 20):
+    return {
+        "trends": health_sampler.trends(),
+        "samples": health_sampler.history(limit=max(1, min(limit, 1000))),
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _require_admin_token(token: str | None) -> None:
+    expected = settings.ADMIN_API_TOKEN
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not found")
+    if not token or not secrets.compare_digest(token, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
+
+
+@app.get("/admin/profile")
+async def admin_profile(
+    seconds: float = 10.0, x_admin_token: str | None = Header(default=None)
+):
+    _require_admin_token(x_admin_token)
+    try:
+        collapsed = await profiler.profile(seconds)
+    except ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="profile already running")
+    return PlainTextResponse(collapsed)
+
+
+@app.get("/admin/profile/slow")
+async def admin_profile_slow(
+    limit: int = 20, x_admin_token: str | None = Header(default=None)
+):
+    _require_admin_token(x_admin_token)
+    limit = max(1, min(limit, 200))
+    return {
+        "threshold_sec": slow_updates.threshold,
+        "exemplars": slow_updates.exemplars(limit=limit),
+        "loop_stalls": loop_monitor.stalls(limit=limit),
+    }
 
 
 @app.post("/webhook/telegram")
 async def telegram_webhook(request: Request):
+    received_ns = time.time_ns()
     update_dict = await request.json()
+    parsed_ns = time.time_ns()
 
+    update_id = update_dict.get("update_id")
+    token = current_update_id.set(update_id)
+    try:
+        with tracing.start_trace(
+            update_id, "POST /webhook/telegram", start_ns=received_ns
+        ):
+            tracing.record_span("webhook.parse_json", received_ns, parsed_ns)
+            return await _handle_update(update_dict)
+    finally:
+        current_update_id.reset(token)
+
+
+async def _handle_update(update_dict: Dict[str, Any]) -> JSONResponse:
     if not _slh_is_private_update(update_dict):
         chat_type, chat_id = _slh_chat_fingerprint(update_dict)
+        metrics.UPDATES.inc(metrics.update_type(update_dict), "ignored")
         update_id = str(update_dict.get("update_id") or "?")
         try:
-            log.info(
-                f"SLH SAFETY: ignored non-private update_id={update_id} chat_type={chat_type} chat_id={chat_id}"
+            safety_log.info(
+                "SLH SAFETY: ignored non-private update_id=%s chat_type=%s chat_id=%s",
+                update_id,
+                chat_type,
+                chat_id,
             )
         except Exception:
             pass
@@ -134,5 +307,12 @@ async def telegram_webhook(request: Request):
             status_code=status.HTTP_200_OK,
         )
 
+    # update שהגיע לפני getMe – מחכים לבוט; אם זה לוקח יותר מדי, 503 וטלגרם ישלח שוב
+    if not await warmup.wait("telegram", timeout=settings.WARMUP_WEBHOOK_WAIT_SEC):
+        return JSONResponse(
+            {"ok": False, "error": "warming up"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
     await process_webhook(update_dict)
     return JSONResponse({"ok": True}, status_code=status.HTTP_200_OK)
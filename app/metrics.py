@@ -0,0 +1,344 @@
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from app import query_budget, tracing
+from app.profiler import slow_updates
+from app.stats import live_stats
+
+logger = logging.getLogger(__name__)
+
+# השם של ה-handler שרץ כרגע (cmd_summary וכו') – עובר גם ל-asyncio.to_thread
+current_handler: ContextVar[str] = ContextVar("slh_current_handler", default="background")
+# התוצאה של ה-update הנוכחי – ה-error handler של PTB מסמן אותה
+_update_outcome: ContextVar[Dict[str, str] | None] = ContextVar(
+    "slh_update_outcome", default=None
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Callable[[], Any] | None = None
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set_function(self, fn: Callable[[], Any]) -> None:
+        """
+        ערך שמחושב רק בזמן scrape. fn מחזירה מספר, או dict של
+        tuple-labels -> מספר כשיש labels.
+        """
+        self._function = fn
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:
+                logger.warning("Gauge %s callback failed: %s", self.name, e)
+                return []
+            items = list(result.items()) if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [counts per bucket (+Inf אחרון), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labelvalues] = series
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()]
+
+        lines: List[str] = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render() -> str:
+    """כל המטריקות בפורמט הטקסט של Prometheus (0.0.4)."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===== Metrics =====
+
+UPDATES = Counter(
+    "slh_updates_total", "Telegram updates received by the webhook", ("type", "outcome")
+)
+UPDATES_IN_FLIGHT = Gauge("slh_updates_in_flight", "Updates currently being processed")
+
+HANDLER_LATENCY = Histogram(
+    "slh_handler_duration_seconds", "Handler latency", ("handler", "kind")
+)
+HANDLER_ERRORS = Counter(
+    "slh_handler_errors_total", "Exceptions raised by handlers", ("handler",)
+)
+
+DB_QUERIES = Counter("slh_db_queries_total", "SQL statements executed", ("handler",))
+DB_QUERY_LATENCY = Histogram(
+    "slh_db_query_duration_seconds", "SQL statement latency", ("handler",), DB_BUCKETS
+)
+HANDLER_QUERIES = Histogram(
+    "slh_handler_queries", "SQL statements per handler invocation", ("handler",),
+    (1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+
+RPC_LATENCY = Histogram("slh_rpc_duration_seconds", "BSC JSON-RPC latency", ("method",))
+RPC_ERRORS = Counter("slh_rpc_errors_total", "BSC JSON-RPC failures", ("method",))
+
+
+# ===== Instrumentation =====
+
+
+def update_type(update_dict: Dict[str, Any]) -> str:
+    for key in update_dict:
+        if key != "update_id":
+            return key
+    return "unknown"
+
+
+@contextmanager
+def observe_update(update_dict: Dict[str, Any]) -> Iterator[None]:
+    kind = update_type(update_dict)
+    outcome = {"value": "processed"}
+    token = _update_outcome.set(outcome)
+    UPDATES_IN_FLIGHT.inc()
+    live_stats.updates.add()
+    try:
+        yield
+    except Exception:
+        outcome["value"] = "error"
+        raise
+    finally:
+        UPDATES.inc(kind, outcome["value"])
+        if outcome["value"] == "error":
+            live_stats.update_errors.add()
+        UPDATES_IN_FLIGHT.dec()
+        _update_outcome.reset(token)
+
+
+async def on_handler_error(update, context) -> None:
+    """
+    error handler של PTB. process_update בולע חריגות של handlers ומעביר
+    אותן לכאן – בלי זה observe_update לא רואה שה-update נכשל.
+    """
+    outcome = _update_outcome.get()
+    if outcome is not None:
+        outcome["value"] = "error"
+    logger.error(
+        "Exception while handling update %s",
+        getattr(update, "update_id", None),
+        exc_info=context.error,
+    )
+
+
+def _wrap_callback(callback: Callable, kind: str) -> Callable:
+    name = getattr(callback, "__name__", type(callback).__name__)
+
+    budget = getattr(callback, "_query_budget", None)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        token = current_handler.set(name)
+        update_id = getattr(update, "update_id", None)
+        scope = query_budget.QueryScope(name, budget, update_id)
+        started = time.perf_counter()
+        try:
+            with tracing.span(
+                f"handler {name}", **{"handler.kind": kind}
+            ), query_budget.track(scope), slow_updates.watch(name, update_id):
+                return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            live_stats.handler_errors.add()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            HANDLER_LATENCY.observe(elapsed, name, kind)
+            live_stats.handler_latency.observe(elapsed)
+            HANDLER_QUERIES.observe(scope.count, name)
+            current_handler.reset(token)
+
+    wrapper._slh_instrumented = True
+    return wrapper
+
+
+def instrument_handlers(application) -> None:
+    """עוטף את ה-callback של כל handler רשום (CommandHandler וכו') במדידה."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            callback = handler.callback
+            if getattr(callback, "_slh_instrumented", False):
+                continue
+            handler.callback = _wrap_callback(callback, type(handler).__name__)
+
+    if on_handler_error not in application.error_handlers:
+        application.add_error_handler(on_handler_error)
+
+
+def instrument_engine(engine) -> None:
+    """מונה ומודד כל SQL statement, לפי ה-handler הנוכחי."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slh_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("slh_query_start")
+        if not stack:
+            return
+        handler = current_handler.get()
+        DB_QUERIES.inc(handler)
+        DB_QUERY_LATENCY.observe(time.perf_counter() - stack.pop(), handler)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        stack = conn.info.get("slh_query_start") if conn is not None else None
+        if stack:
+            stack.pop()
+
+
+def observe_rpc(method: str, seconds: float, failed: bool) -> None:
+    RPC_LATENCY.observe(seconds, method)
+    live_stats.rpc_calls.add()
+    if failed:
+        RPC_ERRORS.inc(method)
+        live_stats.rpc_errors.add()
+
+
+def web3_middleware(make_request, w3):
+    """web3 v6 middleware: latency + שגיאות לכל RPC method."""
+
+    def middleware(method, params):
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = make_request(method, params)
+            failed = isinstance(response, dict) and bool(response.get("error"))
+            return response
+        finally:
+            observe_rpc(str(method), time.perf_counter() - started, failed)
+
+    return middleware
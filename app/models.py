@@ -5,6 +5,8 @@ from sqlalchemy import (
     Numeric,
     DateTime,
     Integer,
+    Text,
+    UniqueConstraint,
 )
 from sqlalchemy.sql import func
 
@@ -25,6 +27,8 @@ class User(Base):
     telegram_id = Column(BigInteger, primary_key=True, index=True)
     username = Column(String(255), index=True, nullable=True)
     bnb_address = Column(String(255), nullable=True)
+    # bnb_address בצורת checksum (crud.set_bnb_address) – מפתח ההתאמה של הפקדות
+    bnb_address_checksum = Column(String(42), nullable=True, index=True)
     balance_slh = Column(Numeric(24, 6), nullable=False, default=0)
 
 
@@ -44,3 +48,152 @@ class Transaction(Base):
 
     amount_slh = Column(Numeric(24, 6), nullable=False)
     tx_type = Column(String(50), nullable=False)
+
+
+class Deposit(Base):
+    """
+    הפקדות On-Chain שזוהו לארנק הקהילתי (SLH / BNB).
+
+    tx_hash + log_index משמשים כמפתח אידמפוטנטיות – אותה הפקדה
+    לעולם לא תיזקף פעמיים, גם אם הסורק עובר שוב על אותם בלוקים.
+    בהעברת BNB רגילה (לא טוקן) log_index = -1.
+    """
+
+    __tablename__ = "deposits"
+    __table_args__ = (
+        UniqueConstraint("tx_hash", "log_index", name="uq_deposits_tx_log"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    tx_hash = Column(String(66), nullable=False, index=True)
+    log_index = Column(Integer, nullable=False, default=-1)
+    block_number = Column(BigInteger, nullable=False)
+
+    asset = Column(String(10), nullable=False)  # "SLH" / "BNB"
+    from_address = Column(String(42), nullable=False, index=True)
+    amount = Column(Numeric(36, 18), nullable=False)
+
+    # None אם השולח לא מקושר לאף משתמש
+    telegram_id = Column(BigInteger, nullable=True, index=True)
+    ledger_tx_id = Column(Integer, nullable=True)
+
+    # credited / recorded / unmatched
+    status = Column(String(20), nullable=False, index=True)
+
+
+class ChainCursor(Base):
+    """
+    נקודת התקדמות (בלוק אחרון שעובד) של סורקים על השרשרת.
+    """
+
+    __tablename__ = "chain_cursors"
+
+    name = Column(String(64), primary_key=True)
+    block_number = Column(BigInteger, nullable=False)
+
+
+class Payout(Base):
+    """
+    בקשות משיכה On-Chain מהארנק הקהילתי.
+
+    מחזור חיים: queued -> signed -> submitted -> confirmed / failed.
+    raw_tx נשמר אחרי חתימה כדי שאפשר יהיה לשלוח שוב אותה טרנזקציה
+    (אותו nonce ואותו hash) אחרי קריסה, או כשהיא נפלה מה-mempool,
+    בלי לשלם פעמיים. nonce שנחתם לא משתחרר: דחייה של ה-node נחתמת שוב
+    באותו nonce עם gas גבוה יותר (עד PAYOUT_MAX_ATTEMPTS), וכל ה-hashes
+    נשמרים ב-tx_hashes. failed + החזר ליתרה רק אחרי שה-nonce נוצל על
+    השרשרת בלי receipt לאף אחד מהם.
+    """
+
+    __tablename__ = "payouts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    telegram_id = Column(BigInteger, nullable=False, index=True)
+    to_address = Column(String(42), nullable=False)
+    asset = Column(String(10), nullable=False)  # "SLH" / "BNB"
+    amount = Column(Numeric(36, 18), nullable=False)
+
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    nonce = Column(BigInteger, nullable=True)
+    tx_hash = Column(String(66), nullable=True, index=True)
+    raw_tx = Column(Text, nullable=True)
+    error = Column(String(255), nullable=True)
+    # כמה פעמים ה-node דחה את הטרנזקציה
+    attempts = Column(Integer, nullable=True, default=0)
+    gas_price = Column(BigInteger, nullable=True)  # wei, של החתימה האחרונה
+    tx_hashes = Column(Text, nullable=True)  # JSON: כל ה-hashes שנחתמו ב-nonce
+
+    # הטרנזקציה בלדג'ר שהורידה את היתרה הפנימית
+    ledger_tx_id = Column(Integer, nullable=True)
+
+
+class UserState(Base):
+    """
+    מצב שיחה למשתמש: שפה מועדפת + flow פתוח (העברה / קישור ארנק).
+    נכתב ב-batch מ-app/user_state.py; flows נטושים פגים לפי updated_at.
+    """
+
+    __tablename__ = "user_states"
+
+    telegram_id = Column(BigInteger, primary_key=True)
+    lang = Column(String(8), nullable=True)
+    flow = Column(String(40), nullable=True)
+    flow_data = Column(Text, nullable=True)  # JSON
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class Broadcast(Base):
+    """
+    הודעת אדמין לכל המשקיעים (app/broadcast.py).
+
+    מחזור חיים: draft -> sending -> done / cancelled.
+    texts הוא JSON של {lang: text}; last_user_id הוא ה-checkpoint – כל
+    המשתמשים עד אליו (לפי telegram_id) כבר טופלו, וממנו ממשיכים אחרי קריסה.
+    """
+
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_by = Column(BigInteger, nullable=True)
+    texts = Column(Text, nullable=False)  # JSON
+
+    status = Column(String(20), nullable=False, default="draft", index=True)
+    last_user_id = Column(BigInteger, nullable=True)
+
+    sent = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+
+class BroadcastDelivery(Base):
+    """
+    תוצאת שליחה של broadcast למשתמש אחד – נכתב ב-bulk insert בכל checkpoint.
+    (broadcast_id, telegram_id) ייחודי: משתמש שכבר יש לו שורה לא יקבל שוב.
+    """
+
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "telegram_id", name="uq_broadcast_deliveries_user"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    broadcast_id = Column(Integer, nullable=False, index=True)
+    telegram_id = Column(BigInteger, nullable=False)
+
+    # sent / blocked / failed
+    status = Column(String(20), nullable=False)
+    error = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,10 +1,14 @@
+import asyncio
 import logging
 import json
-from typing import Any, Dict, List
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
 from urllib.request import urlopen
 from urllib.error import URLError, HTTPError
 
-from telegram import Bot
 from sqlalchemy import text
 
 from app.database import SessionLocal
@@ -14,10 +18,13 @@ from app import blockchain
 logger = logging.getLogger(__name__)
 
 
-def _check_database(checks: Dict[str, Any]) -> str:
+def _check_database(checks: Dict[str, Any], timeout_sec: float | None = None) -> str:
     status = "ok"
     try:
         db = SessionLocal()
+        if timeout_sec and db.get_bind().dialect.name == "postgresql":
+            # השאילתה נעצרת בשרת – לא רק ה-await שמחכה לה
+            db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_sec * 1000)}"))
         db.execute(text("SELECT 1"))
         checks["database"] = {"ok": True}
     except Exception as e:
@@ -59,7 +66,9 @@ def _check_env(checks: Dict[str, Any]) -> str:
     return status
 
 
-def _check_telegram(checks: Dict[str, Any], quick: bool) -> str:
+def _check_telegram(
+    checks: Dict[str, Any], quick: bool, timeout_sec: float = 5.0
+) -> str:
     """
     בדיקת טלגרם:
 
@@ -81,7 +90,7 @@ def _check_telegram(checks: Dict[str, Any], quick: bool) -> str:
 
     try:
         url = f"https://api.telegram.org/bot{settings.BOT_TOKEN}/getMe"
-        with urlopen(url, timeout=5) as resp:
+        with urlopen(url, timeout=timeout_sec) as resp:
             data = json.loads(resp.read().decode("utf-8"))
 
         if not data.get("ok"):
@@ -142,44 +151,166 @@ def _check_bsc(checks: Dict[str, Any]) -> str:
     return status
 
 
-def run_selftest(quick: bool = False) -> Dict[str, Any]:
+# ===== Background health sampler =====
+
+
+def _worse(a: str, b: str) -> str:
+    order = {"ok": 0, "degraded": 1, "error": 2}
+    return a if order.get(a, 2) >= order.get(b, 2) else b
+
+
+class HealthSampler:
     """
-    מפעיל בדיקות בריאות על:
-    - DB
-    - ENV חיוניים
-    - Telegram Bot
-    - BSC RPC + Community Wallet
+    מריץ את בדיקות הבריאות ברקע, במקביל, עם timeout לכל בדיקה,
+    ושומר את N הדגימות האחרונות ב-ring buffer.
 
-    quick=True -> בדיקה מהירה (בלי getMe).
+    /ready, /selftest ו-/admin_selftest עונים מהדגימה האחרונה ב-O(1)
+    במקום להריץ DB / getMe / RPC בתוך ה-event loop.
+
+    הבדיקות רצות ב-executor קטן משלהן (לא ה-default של asyncio, שמשמש
+    את ה-DB וה-DataLoader), וכל בדיקה מגבילה את הזמן שלה בעצמה (timeout
+    של HTTP / RPC / statement_timeout). בדיקה שעדיין תקועה מהדגימה
+    הקודמת לא נשלחת שוב – לכל היותר thread אחד לכל בדיקה.
     """
-    checks: Dict[str, Any] = {}
-    overall = "ok"
-
-    st = _check_database(checks)
-    if st == "error":
-        overall = "error"
-    elif st == "degraded" and overall == "ok":
-        overall = "degraded"
-
-    st = _check_env(checks)
-    if st == "error":
-        overall = "error"
-    elif st == "degraded" and overall == "ok":
-        overall = "degraded"
-
-    st = _check_telegram(checks, quick=quick)
-    if st == "error":
-        overall = "error"
-    elif st == "degraded" and overall == "ok":
-        overall = "degraded"
-
-    st = _check_bsc(checks)
-    if st == "error":
-        overall = "error"
-    elif st == "degraded" and overall == "ok":
-        overall = "degraded"
-
-    return {
-        "status": overall,
-        "checks": checks,
-    }
+
+    def __init__(self, interval_sec: float, timeout_sec: float, history_size: int):
+        self._interval = interval_sec
+        self._timeout = timeout_sec
+        self.samples: deque = deque(maxlen=max(1, history_size))
+        self._executor: ThreadPoolExecutor | None = None
+        self._running: Dict[str, Future] = {}
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    def _checks(self, quick: bool) -> Dict[str, Callable[[Dict[str, Any]], str]]:
+        return {
+            "database": lambda checks: _check_database(checks, self._timeout),
+            "env": _check_env,
+            "telegram": lambda checks: _check_telegram(
+                checks, quick=quick, timeout_sec=self._timeout
+            ),
+            "bsc": _check_bsc,
+        }
+
+    def _submit(self, name: str, fn: Callable[[Dict[str, Any]], str], local) -> Future:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self._checks(quick=True)),
+                thread_name_prefix="health-check",
+            )
+        self._running[name] = self._executor.submit(fn, local)
+        return self._running[name]
+
+    async def _run_check(
+        self, name: str, fn: Callable[[Dict[str, Any]], str]
+    ) -> tuple[str, str, Dict[str, Any]]:
+        local: Dict[str, Any] = {}
+        started = time.perf_counter()
+        previous = self._running.get(name)
+        try:
+            if previous is not None and not previous.done():
+                status = "error"
+                check = {"ok": False, "error": "previous run still hung"}
+            else:
+                status = await asyncio.wait_for(
+                    asyncio.wrap_future(self._submit(name, fn, local)),
+                    timeout=self._timeout,
+                )
+                check = local.get(name, {"ok": status == "ok"})
+        except asyncio.TimeoutError:
+            status = "error"
+            check = {"ok": False, "error": f"timeout after {self._timeout:.1f}s"}
+        except Exception as e:
+            logger.exception("Health check %s crashed: %s", name, e)
+            status = "error"
+            check = {"ok": False, "error": str(e)}
+
+        check["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return name, status, check
+
+    async def sample_once(self, quick: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._run_check(name, fn) for name, fn in self._checks(quick).items())
+        )
+
+        overall = "ok"
+        checks: Dict[str, Any] = {}
+        for name, status, check in results:
+            overall = _worse(overall, status)
+            checks[name] = check
+
+        sample = {
+            "status": overall,
+            "checks": checks,
+            "time_utc": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        self.samples.append(sample)
+        return sample
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return self.samples[-1] if self.samples else None
+
+    async def latest_or_sample(self) -> Dict[str, Any]:
+        """הדגימה האחרונה; אם הדוגם לא רץ (ואין דגימה) – דוגם עכשיו."""
+        return self.latest() or await self.sample_once()
+
+    def history(self, limit: int | None = None) -> List[Dict[str, Any]]:
+        items = list(self.samples)
+        return items[-limit:] if limit else items
+
+    def trends(self) -> Dict[str, Any]:
+        """ממוצע / מקסימום latency ואחוז הצלחה לכל בדיקה לאורך ה-buffer."""
+        per_check: Dict[str, List[Dict[str, Any]]] = {}
+        for sample in self.samples:
+            for name, check in sample["checks"].items():
+                per_check.setdefault(name, []).append(check)
+
+        trends: Dict[str, Any] = {}
+        for name, items in per_check.items():
+            latencies = sorted(c.get("latency_ms", 0.0) for c in items)
+            trends[name] = {
+                "samples": len(items),
+                "ok_ratio": round(sum(1 for c in items if c.get("ok")) / len(items), 3),
+                "latency_ms_avg": round(sum(latencies) / len(latencies), 1),
+                "latency_ms_p50": latencies[len(latencies) // 2],
+                "latency_ms_max": latencies[-1],
+                "last_latency_ms": items[-1].get("latency_ms"),
+            }
+        return trends
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.sample_once(quick=False)
+            except Exception as e:
+                logger.exception("Health sampler iteration failed: %s", e)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        if self._executor is not None:
+            # בדיקה תקועה לא מעכבת את הכיבוי
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._running.clear()
+
+
+health_sampler = HealthSampler(
+    interval_sec=settings.HEALTH_SAMPLE_INTERVAL_SEC,
+    timeout_sec=settings.HEALTH_CHECK_TIMEOUT_SEC,
+    history_size=settings.HEALTH_HISTORY_SIZE,
+)
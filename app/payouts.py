@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app import models, crud, blockchain
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+
+def _as_int(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value, 16) if value.startswith("0x") else int(value)
+    return int(value)
+
+
+def _older_than(value: Optional[datetime], cutoff: datetime) -> bool:
+    if value is None:
+        return True
+    # SQLite מחזיר datetime בלי אזור זמן (UTC)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value < cutoff
+
+
+def _error_text(error: Any) -> str:
+    if isinstance(error, dict):
+        return str(error.get("message") or error)
+    return str(error)
+
+
+# ה-node כבר מכיר טרנזקציה ב-nonce הזה (שלנו, או שכבר נכרתה) – זו לא דחייה
+_NONCE_TAKEN = (
+    "already known",
+    "known transaction",
+    "already imported",
+    "already exists",
+    "nonce too low",
+    "replacement transaction underpriced",
+)
+
+
+def _signed_hashes(payout: models.Payout) -> List[str]:
+    if payout.tx_hashes:
+        return json.loads(payout.tx_hashes)
+    return [payout.tx_hash] if payout.tx_hash else []
+
+
+class NonceManager:
+    """
+    הקצאת nonce מקומית לארנק השולח.
+
+    getTransactionCount נקרא פעם אחת בלבד (או אחרי resync), ומשם כל
+    הקצאה היא מונה בזיכרון – כך אפשר להחזיק הרבה טרנזקציות באוויר
+    בלי round trip לכל אחת.
+    """
+
+    def __init__(self, w3: Web3, address: str):
+        self._w3 = w3
+        self._address = address
+        self._next: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def reserve(self, count: int) -> List[int]:
+        with self._lock:
+            if self._next is None:
+                self._next = int(
+                    self._w3.eth.get_transaction_count(self._address, "pending")
+                )
+            start = self._next
+            self._next += count
+            return list(range(start, start + count))
+
+    def resync(self) -> None:
+        """הקצאה הבאה תקרא שוב את ה-pending nonce מהשרשרת (ממלא 'חורים')."""
+        with self._lock:
+            self._next = None
+
+
+class PayoutEngine:
+    """
+    מנוע תשלומים On-Chain:
+    - בקשות בתור (models.Payout, status=queued)
+    - nonce מקומי דרך NonceManager
+    - חתימה ב-worker pool
+    - שליחה ב-batch JSON-RPC אחד (eth_sendRawTransaction)
+    - מעקב receipts ב-batch (eth_getTransactionReceipt); טרנזקציה בלי
+      receipt אחרי PAYOUT_REBROADCAST_SEC נשלחת שוב (נפלה מה-mempool)
+    - nonce שנחתם לא משתחרר: דחייה של ה-node נחתמת שוב באותו nonce עם
+      gas גבוה יותר (עד PAYOUT_MAX_ATTEMPTS). failed + החזר רק כשה-nonce
+      נוצל על השרשרת ואין receipt לאף hash שנחתם בו
+    - שגיאת batch / רשת = לא ידוע: אותו מצב, ניסיון בסיבוב הבא
+
+    w3 ו-session_factory מוזרקים – אפשר להריץ מול eth-tester / anvil מקומי.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        private_key: str,
+        session_factory=SessionLocal,
+        workers: int | None = None,
+        batch_size: int | None = None,
+    ):
+        from eth_account import Account
+
+        self.w3 = w3
+        self.account = Account.from_key(private_key)
+        self.nonces = NonceManager(w3, self.account.address)
+        self._session_factory = session_factory
+        self._batch_size = max(1, int(batch_size or settings.PAYOUT_BATCH_SIZE))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(workers or settings.PAYOUT_SIGNER_WORKERS)),
+            thread_name_prefix="payout-signer",
+        )
+        self._chain_id: Optional[int] = settings.PAYOUT_CHAIN_ID
+        self._token = None
+        if settings.SLH_TOKEN_ADDRESS:
+            self._token = w3.eth.contract(
+                address=blockchain.to_checksum_address(settings.SLH_TOKEN_ADDRESS),
+                abi=blockchain.ERC20_ABI,
+            )
+
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    # ===== Signing =====
+
+    def _get_chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = int(self.w3.eth.chain_id)
+        return self._chain_id
+
+    def _build_tx(
+        self, payout: models.Payout, nonce: int, gas_price: int, chain_id: int
+    ) -> Dict[str, Any]:
+        to = blockchain.to_checksum_address(payout.to_address)
+        amount = Decimal(str(payout.amount))
+
+        if payout.asset == "BNB":
+            tx = {
+                "to": to,
+                "value": int(amount * Decimal(10**18)),
+                "gas": int(settings.PAYOUT_GAS_LIMIT_BNB),
+            }
+        else:
+            if self._token is None:
+                raise ValueError("SLH_TOKEN_ADDRESS is not configured")
+            decimals = int(settings.SLH_TOKEN_DECIMALS or 18)
+            raw_amount = int(amount * Decimal(10**decimals))
+            tx = {
+                "to": self._token.address,
+                "value": 0,
+                "data": self._token.encodeABI(fn_name="transfer", args=[to, raw_amount]),
+                "gas": int(settings.PAYOUT_GAS_LIMIT_TOKEN),
+            }
+
+        tx.update({"nonce": nonce, "gasPrice": gas_price, "chainId": chain_id})
+        return tx
+
+    def _sign(self, tx: Dict[str, Any]) -> tuple[str, str]:
+        signed = self.account.sign_transaction(tx)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        to_hex = blockchain.load_web3().to_hex
+        return to_hex(signed.hash), to_hex(raw)
+
+    def _record_signed(
+        self, payout: models.Payout, tx_hash: str, raw: str, gas_price: int
+    ) -> None:
+        payout.tx_hashes = json.dumps(_signed_hashes(payout) + [tx_hash])
+        payout.tx_hash = tx_hash
+        payout.raw_tx = raw
+        payout.gas_price = gas_price
+        payout.status = "signed"
+
+    def _resign(self, payouts: List[models.Payout]) -> None:
+        """אותו nonce, gas גבוה ב-PAYOUT_GAS_BUMP_PCT לפחות – מחליף את הקודמת."""
+        network = int(self.w3.eth.gas_price)
+        chain_id = self._get_chain_id()
+        bump = 100 + max(10, int(settings.PAYOUT_GAS_BUMP_PCT))
+        for payout in payouts:
+            gas_price = max(network, (payout.gas_price or 0) * bump // 100)
+            tx = self._build_tx(payout, payout.nonce, gas_price, chain_id)
+            tx_hash, raw = self._sign(tx)
+            self._record_signed(payout, tx_hash, raw, gas_price)
+
+    def _sign_queued(self, db, queued: List[models.Payout]) -> None:
+        nonces = self.nonces.reserve(len(queued))
+        gas_price = int(self.w3.eth.gas_price)
+        chain_id = self._get_chain_id()
+
+        try:
+            txs = [
+                self._build_tx(p, n, gas_price, chain_id)
+                for p, n in zip(queued, nonces)
+            ]
+            signed = list(self._executor.map(self._sign, txs))
+        except Exception:
+            # ה-nonces שהוקצו לא ישמשו – לא להשאיר 'חור'
+            self.nonces.resync()
+            raise
+
+        for payout, nonce, (tx_hash, raw) in zip(queued, nonces, signed):
+            payout.nonce = nonce
+            payout.error = None
+            self._record_signed(payout, tx_hash, raw, gas_price)
+
+        # נשמר לפני השליחה – אחרי קריסה שולחים שוב את אותו raw_tx
+        db.commit()
+
+    # ===== Submission =====
+
+    def submit_pending(self) -> int:
+        """חותם בקשות בתור ושולח את כל מה שחתום ב-batch אחד. מחזיר כמה נשלחו."""
+        db = self._session_factory()
+        try:
+            pending = (
+                db.query(models.Payout)
+                .filter(models.Payout.status == "signed")
+                .order_by(models.Payout.nonce)
+                .limit(self._batch_size)
+                .all()
+            )
+
+            room = self._batch_size - len(pending)
+            if room > 0:
+                queued = (
+                    db.query(models.Payout)
+                    .filter(models.Payout.status == "queued")
+                    .order_by(models.Payout.id)
+                    .limit(room)
+                    .with_for_update(skip_locked=True)
+                    .all()
+                )
+                if queued:
+                    self._sign_queued(db, queued)
+                    pending.extend(queued)
+
+            if not pending:
+                return 0
+
+            responses = blockchain.rpc_batch(
+                self.w3,
+                [("eth_sendRawTransaction", [p.raw_tx]) for p in pending],
+            )
+
+            sent = 0
+            failed = []
+            for p, resp in zip(pending, responses):
+                if not resp.get("error"):
+                    p.status = "submitted"
+                    sent += 1
+                elif not blockchain.rpc_unknown(resp):
+                    failed.append((p, resp["error"]))
+                # לא ידוע אם הגיעה – נשארת signed, אותו raw_tx בסיבוב הבא
+
+            if failed:
+                self._handle_rejected(db, failed)
+
+            db.commit()
+            return sent
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _handle_rejected(self, db, failed: List[tuple]) -> None:
+        resign = []
+        for payout, error in failed:
+            text = _error_text(error)
+            payout.error = text[:255]
+            if any(marker in text.lower() for marker in _NONCE_TAKEN):
+                # "already known" / "nonce too low" – poll_receipts מכריע לפי
+                # receipts ו-nonce על השרשרת
+                payout.status = "submitted"
+                continue
+
+            payout.attempts = (payout.attempts or 0) + 1
+            if payout.attempts >= max(1, int(settings.PAYOUT_MAX_ATTEMPTS)):
+                # בלי חתימה נוספת: אותו raw_tx נשלח שוב ב-rebroadcast (למשל
+                # אחרי שהארנק מולא). ה-nonce לא משתחרר – payouts אחריו מחכים
+                logger.error(
+                    "Payout %s still rejected after %s attempts (nonce=%s): %s",
+                    payout.id,
+                    payout.attempts,
+                    payout.nonce,
+                    text,
+                )
+                payout.status = "submitted"
+                continue
+
+            logger.warning(
+                "Payout %s rejected by node (nonce=%s, attempt %s), re-signing: %s",
+                payout.id,
+                payout.nonce,
+                payout.attempts,
+                text,
+            )
+            resign.append(payout)
+
+        if resign:
+            self._resign(resign)
+
+    def _fail(self, db, payout: models.Payout, error: str) -> None:
+        """מצב סופי: failed, והסכום חוזר ליתרה הפנימית של המשתמש."""
+        payout.status = "failed"
+        payout.error = error[:255]
+        user = db.get(models.User, payout.telegram_id)
+        if user is not None:
+            crud.change_balance(
+                db,
+                user=user,
+                delta_slh=payout.amount,
+                tx_type="payout_refund",
+                from_user=None,
+                to_user=payout.telegram_id,
+                commit=False,
+            )
+        logger.warning("Payout %s failed (tx=%s): %s", payout.id, payout.tx_hash, error)
+
+    def _rebroadcast(self, db, stale: List[models.Payout]) -> None:
+        """אותו raw_tx (אותו nonce ו-hash) – לא יכול להיכרת פעמיים."""
+        responses = blockchain.rpc_batch(
+            self.w3,
+            [("eth_sendRawTransaction", [p.raw_tx]) for p in stale],
+        )
+        rejected = []
+        for payout, resp in zip(stale, responses):
+            # הספירה ל-rebroadcast הבא מתחילה מעכשיו
+            payout.updated_at = func.now()
+            if resp.get("error") and not blockchain.rpc_unknown(resp):
+                rejected.append((payout, resp["error"]))
+        logger.info("Rebroadcast %s payouts without a receipt", len(stale))
+
+        if rejected:
+            self._handle_rejected(db, rejected)
+
+    # ===== Receipts =====
+
+    def poll_receipts(self) -> int:
+        """בודק receipts לכל מה שנשלח, ב-batch אחד. מחזיר כמה הסתיימו."""
+        db = self._session_factory()
+        try:
+            submitted = (
+                db.query(models.Payout)
+                .filter(models.Payout.status == "submitted")
+                .order_by(models.Payout.nonce)
+                .limit(self._batch_size * 5)
+                .all()
+            )
+            if not submitted:
+                return 0
+
+            # nonce לפני ה-receipts: מה שנכרת בין שתי הקריאות כבר נראה ב-receipt
+            (count,) = blockchain.rpc_batch(
+                self.w3,
+                [("eth_getTransactionCount", [self.account.address, "latest"])],
+            )
+            mined_nonce = None if count.get("error") else _as_int(count["result"])
+
+            signed = [(p, h) for p in submitted for h in _signed_hashes(p)]
+            responses = blockchain.rpc_batch(
+                self.w3,
+                [("eth_getTransactionReceipt", [h]) for _, h in signed],
+            )
+            receipts: Dict[int, tuple] = {}
+            unknown = set()
+            for (payout, tx_hash), resp in zip(signed, responses):
+                if resp.get("error"):
+                    unknown.add(payout.id)
+                elif resp.get("result"):
+                    receipts[payout.id] = (tx_hash, resp["result"])
+
+            cutoff = datetime.now(timezone.utc) - timedelta(
+                seconds=float(settings.PAYOUT_REBROADCAST_SEC)
+            )
+            done = 0
+            touched = []
+            stale = []
+            for payout in submitted:
+                found = receipts.get(payout.id)
+                if found is None:
+                    if payout.id in unknown or not _older_than(payout.updated_at, cutoff):
+                        continue
+                    if mined_nonce is not None and mined_nonce > payout.nonce:
+                        # ה-nonce נוצל ואף hash שנחתם בו לא נכרת – כבר לא ייכרת
+                        self._fail(db, payout, "nonce used by another transaction")
+                        self.nonces.resync()
+                    else:
+                        stale.append(payout)
+                    continue
+
+                tx_hash, receipt = found
+                payout.tx_hash = tx_hash
+                done += 1
+                touched.append(payout.to_address)
+                if _as_int(receipt.get("status", 1)) == 1:
+                    payout.status = "confirmed"
+                    continue
+
+                self._fail(db, payout, "transaction reverted")
+
+            if stale:
+                self._rebroadcast(db, stale)
+
+            db.commit()
+
+            if touched:
+                blockchain.note_touched([self.account.address] + touched)
+            return done
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ===== Background loop =====
+
+    async def run(self) -> None:
+        interval = max(0.5, float(settings.PAYOUT_POLL_INTERVAL_SEC))
+        logger.info("Payout engine started (signer=%s)", self.account.address)
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.submit_pending)
+                await asyncio.to_thread(self.poll_receipts)
+            except Exception as e:
+                logger.exception("Payout engine iteration failed: %s", e)
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Payout engine stopped")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+
+_engine: PayoutEngine | None = None
+
+
+def start_payout_engine() -> None:
+    global _engine
+
+    if not settings.PAYOUTS_ENABLED:
+        return
+
+    if not settings.COMMUNITY_WALLET_PRIVATE_KEY:
+        logger.warning("PAYOUTS_ENABLED but COMMUNITY_WALLET_PRIVATE_KEY is missing")
+        return
+
+    w3 = blockchain.get_w3()
+    if w3 is None:
+        logger.warning("PAYOUTS_ENABLED but BSC RPC is unavailable")
+        return
+
+    _engine = PayoutEngine(w3, settings.COMMUNITY_WALLET_PRIVATE_KEY)
+    _engine.start()
+
+
+async def stop_payout_engine() -> None:
+    global _engine
+    if _engine is not None:
+        await _engine.stop()
+        _engine = None
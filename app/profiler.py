@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame) -> List[str]:
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class SamplingProfiler:
+    """
+    פרופיילר סטטיסטי: thread שדוגם את sys._current_frames() כל interval
+    ומצבר stacks בפורמט collapsed (flamegraph.pl / speedscope).
+    אין overhead כשהוא לא רץ; רק ריצה אחת בכל רגע.
+    """
+
+    def __init__(self, interval_sec: float):
+        self._interval = interval_sec
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run_for(self, seconds: float) -> str:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+
+        try:
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    thread = names.get(ident, str(ident)).replace(";", "_")
+                    stacks[";".join([thread] + _collapse(frame))] += 1
+                samples += 1
+                time.sleep(self._interval)
+        finally:
+            self._lock.release()
+
+        logger.info("Profile finished: %s samples, %s unique stacks", samples, len(stacks))
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    async def profile(self, seconds: float) -> str:
+        seconds = max(1.0, min(float(seconds), float(settings.PROFILER_MAX_SECONDS)))
+        return await asyncio.to_thread(self.run_for, seconds)
+
+
+def await_stack(task: Optional[asyncio.Task]) -> List[str]:
+    """
+    ה-stack המלא של task מושהה: הולכים על שרשרת ה-cr_await
+    (task.get_stack() מחזיר רק frame אחד לקורוטינה מושהית).
+    """
+    if task is None:
+        return []
+
+    lines: List[str] = []
+    coro: Any = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            lines.extend(traceback.format_stack(frame, limit=1))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return lines
+
+
+class SlowUpdateRecorder:
+    """
+    exemplars של updates איטיים: כש-handler עובר את הסף, נלכד
+    ה-await stack שלו (איפה הוא תקוע באותו רגע). אם הלולאה עצמה
+    חסומה – הטיימר לא ירוץ, ונשמר exemplar בלי stack בסוף ה-update.
+    """
+
+    def __init__(self, threshold_sec: float, max_exemplars: int):
+        self.threshold = threshold_sec
+        self._exemplars: deque = deque(maxlen=max(1, max_exemplars))
+
+    @contextmanager
+    def watch(self, handler: str, update_id: Any = None) -> Iterator[None]:
+        if self.threshold <= 0:
+            yield
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+            task = asyncio.current_task()
+        except RuntimeError:
+            yield
+            return
+
+        captured: Dict[str, Any] = {}
+
+        def _capture() -> None:
+            captured["stack"] = await_stack(task)
+            captured["at_sec"] = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        timer = loop.call_later(self.threshold, _capture)
+        try:
+            yield
+        finally:
+            timer.cancel()
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                self._exemplars.append(
+                    {
+                        "time_utc": datetime.now(timezone.utc).isoformat(),
+                        "handler": handler,
+                        "update_id": update_id,
+                        "duration_ms": round(elapsed * 1000, 1),
+                        "captured_at_sec": captured.get("at_sec"),
+                        "stack": captured.get("stack")
+                        or ["<event loop was blocked – no await stack captured>\n"],
+                    }
+                )
+                logger.warning(
+                    "Slow update %s in %s: %.0f ms", update_id, handler, elapsed * 1000
+                )
+
+    def exemplars(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return list(self._exemplars)[-limit:][::-1]
+
+    def render(self, limit: int = 20) -> str:
+        parts: List[str] = []
+        for ex in self.exemplars(limit):
+            parts.append(
+                f"=== {ex['time_utc']} {ex['handler']} update={ex['update_id']} "
+                f"{ex['duration_ms']} ms (stack at {ex['captured_at_sec']}s)\n"
+            )
+            parts.extend(ex["stack"])
+            parts.append("\n")
+        return "".join(parts)
+
+
+profiler = SamplingProfiler(interval_sec=settings.PROFILER_INTERVAL_SEC)
+slow_updates = SlowUpdateRecorder(
+    threshold_sec=settings.SLOW_UPDATE_THRESHOLD_SEC,
+    max_exemplars=settings.SLOW_UPDATE_EXEMPLARS,
+)
@@ -0,0 +1,131 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_scope: ContextVar[Optional["QueryScope"]] = ContextVar("slh_query_scope", default=None)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(limit: int) -> Callable:
+    """
+    מצהיר כמה SQL statements handler רשאי להריץ ל-update אחד:
+
+        @query_budget(4)
+        async def cmd_summary(self, update, context): ...
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        fn._query_budget = limit
+        return fn
+
+    return decorator
+
+
+class QueryScope:
+    """
+    סופר statements של handler אחד:
+    - count מול התקציב
+    - אותו SQL שרץ שוב ושוב (N+1 – למשל query בתוך לולאה)
+    - אותו SQL עם אותם פרמטרים יותר מפעם אחת (קריאה כפולה מיותרת)
+    """
+
+    def __init__(self, handler: str, budget: Optional[int] = None, update_id: Any = None):
+        self.handler = handler
+        self.budget = budget if budget is not None else settings.QUERY_BUDGET_DEFAULT
+        self.update_id = update_id
+        self.count = 0
+        self._statements: Counter = Counter()
+        self._exact: Counter = Counter()
+
+    def record(self, statement: str, parameters: Any) -> None:
+        self.count += 1
+        self._statements[statement] += 1
+        try:
+            self._exact[(statement, repr(parameters)[:500])] += 1
+        except Exception:
+            pass
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def repeated(self) -> List[tuple[str, int]]:
+        threshold = max(2, int(settings.QUERY_REPEAT_THRESHOLD))
+        return [(s, n) for s, n in self._statements.most_common() if n >= threshold]
+
+    def duplicates(self) -> List[tuple[str, int]]:
+        return [(s, n) for (s, _), n in self._exact.most_common() if n > 1]
+
+    def check(self) -> None:
+        for statement, n in self.repeated():
+            logger.warning(
+                "Possible N+1 in %s (update=%s): statement ran %s times: %s",
+                self.handler,
+                self.update_id,
+                n,
+                _short(statement),
+            )
+        for statement, n in self.duplicates():
+            logger.warning(
+                "Duplicate query in %s (update=%s): same statement+params %s times: %s",
+                self.handler,
+                self.update_id,
+                n,
+                _short(statement),
+            )
+
+        if not self.exceeded:
+            return
+
+        message = (
+            f"{self.handler} ran {self.count} SQL statements "
+            f"(budget {self.budget}, update={self.update_id})"
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded: %s", message)
+
+
+def _short(statement: str, limit: int = 200) -> str:
+    flat = " ".join(statement.split())
+    return flat if len(flat) <= limit else flat[:limit] + "..."
+
+
+def current_scope() -> Optional[QueryScope]:
+    return _scope.get()
+
+
+@contextmanager
+def track(scope: QueryScope) -> Iterator[QueryScope]:
+    """
+    כל statement שרץ בתוך הבלוק (כולל asyncio.to_thread) נזקף ל-scope.
+    ביציאה: אזהרות N+1 / כפילויות, וחריגה מהתקציב – אזהרה, או
+    QueryBudgetExceeded כש-QUERY_BUDGET_STRICT (בבדיקות / CI).
+    """
+    token = _scope.set(scope)
+    try:
+        yield scope
+    except BaseException:
+        _scope.reset(token)
+        raise
+    _scope.reset(token)
+    scope.check()
+
+
+def instrument_engine(engine) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        scope = _scope.get()
+        if scope is not None:
+            scope.record(statement, parameters)
@@ -0,0 +1,188 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+from app.core.config import settings
+from app import i18n, metrics
+from app.send_scheduler import LANE_NORMAL
+from app.user_state import user_states
+
+logger = logging.getLogger(__name__)
+
+# סוגי פקודות לפי העלות שלהן
+CLASS_CHEAP = "cheap"  # מסכים סטטיים (render_cache)
+CLASS_DB = "db"  # upsert של המשתמש / שאילתות
+CLASS_RPC = "rpc"  # DB + קריאות BSC
+
+CLASSES = (CLASS_CHEAP, CLASS_DB, CLASS_RPC)
+_CLASS_INDEX = {name: i for i, name in enumerate(CLASSES)}
+
+COMMAND_CLASSES = {
+    "help": CLASS_CHEAP,
+    "menu": CLASS_CHEAP,
+    "language": CLASS_CHEAP,
+    "ping": CLASS_CHEAP,
+    "docs": CLASS_CHEAP,
+    "summary": CLASS_RPC,
+    "balance": CLASS_RPC,
+    "onchain_balance": CLASS_RPC,
+}
+
+# callback_data לפי prefix
+CALLBACK_CLASSES = (
+    ("LANG_", CLASS_CHEAP),
+    ("MENU_DOCS", CLASS_CHEAP),
+    ("MENU_SUMMARY", CLASS_RPC),
+    ("MENU_BALANCE", CLASS_RPC),
+    ("WALLET_BALANCE", CLASS_RPC),
+)
+
+RATE_LIMITED = metrics.Counter(
+    "slh_rate_limited_total", "Updates dropped by the per-user rate limiter", ("class",)
+)
+RATE_LIMIT_USERS = metrics.Gauge(
+    "slh_rate_limit_buckets", "Per-user rate limit buckets held in memory"
+)
+
+
+def parse_limits(raw: str | None) -> Dict[str, Tuple[float, float]]:
+    """"cheap=30/10,db=12/5,rpc=4/2" -> {class: (per_min, burst)}"""
+    limits: Dict[str, Tuple[float, float]] = {}
+    for part in (raw or "").split(","):
+        name, _, spec = part.strip().partition("=")
+        per_min, _, burst = spec.partition("/")
+        if name not in _CLASS_INDEX or not per_min:
+            continue
+        try:
+            per_min_value = float(per_min)
+            burst_value = float(burst) if burst else max(1.0, per_min_value / 6)
+        except ValueError:
+            continue
+        if per_min_value > 0:
+            limits[name] = (per_min_value, max(1.0, burst_value))
+    return limits
+
+
+def classify(update: Update) -> str:
+    query = update.callback_query
+    if query is not None:
+        data = query.data or ""
+        for prefix, klass in CALLBACK_CLASSES:
+            if data.startswith(prefix):
+                return klass
+        return CLASS_DB
+
+    message = update.effective_message
+    text = (message.text or "") if message is not None else ""
+    if text.startswith("/"):
+        parts = text[1:].split(maxsplit=1)
+        command = parts[0].split("@", 1)[0].lower() if parts else ""
+        return COMMAND_CLASSES.get(command, CLASS_DB)
+
+    # טקסט חופשי – שלבי flow של העברה / קישור ארנק
+    return CLASS_DB
+
+
+def _is_admin(user_id: int) -> bool:
+    admin_id = settings.ADMIN_USER_ID
+    return bool(admin_id) and str(user_id) == str(admin_id)
+
+
+class UserRateLimiter:
+    """
+    token bucket למשתמש ולסוג פקודה, לפני ה-handlers (TypeHandler בקבוצה -2):
+
+    - update שחורג נעצר (ApplicationHandlerStop) – ה-handler, ה-upsert וה-RPC
+      לא רצים בכלל
+    - תשובת "לאט יותר" אחת לכל רצף חסימות, בשפת המשתמש מהזיכרון
+      (user_states / language_code) – בלי DB
+    - המצב: OrderedDict חסום (LRU) של key -> (tokens, updated, notified),
+      key = user_id * 3 + class. bucket שנפלט הוא הישן ביותר – כמעט תמיד
+      כבר מלא, כך שהפליטה לא מקלה בפועל
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], max_entries: int):
+        # (tokens לשנייה, burst) לפי אינדקס הסוג
+        self._limits = {
+            _CLASS_INDEX[name]: (per_min / 60.0, burst)
+            for name, (per_min, burst) in limits.items()
+        }
+        self._max_entries = max(1, max_entries)
+        self._buckets: "OrderedDict[int, Tuple[float, float, bool]]" = OrderedDict()
+
+        RATE_LIMIT_USERS.set_function(lambda: len(self._buckets))
+
+    def hit(self, user_id: int, klass: str) -> Tuple[bool, bool]:
+        """(מותר, צריך להודיע). רץ רק ב-event loop – בלי lock."""
+        index = _CLASS_INDEX[klass]
+        limit = self._limits.get(index)
+        if limit is None:
+            return True, False
+        rate, burst = limit
+
+        key = user_id * len(CLASSES) + index
+        now = time.monotonic()
+        state = self._buckets.pop(key, None)
+        if state is None:
+            tokens, notified = burst, False
+        else:
+            tokens = min(burst, state[0] + (now - state[1]) * rate)
+            notified = state[2]
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now, False)
+            allowed, notify = True, False
+        else:
+            self._buckets[key] = (tokens, now, True)
+            allowed, notify = False, not notified
+
+        while len(self._buckets) > self._max_entries:
+            self._buckets.popitem(last=False)
+        return allowed, notify
+
+    async def throttle(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        user = update.effective_user
+        if user is None or _is_admin(user.id):
+            return
+
+        klass = classify(update)
+        allowed, notify = self.hit(user.id, klass)
+        if allowed:
+            return
+
+        RATE_LIMITED.inc(klass)
+        if notify:
+            lang = user_states.cached_lang(user.id) or user.language_code
+            text = i18n.catalog(i18n.normalize_lang(lang))["RATE_LIMITED"]
+            try:
+                # shortcuts של Update לא מקבלים rate_limit_args – דרך ה-bot
+                if update.callback_query is not None:
+                    await context.bot.answer_callback_query(
+                        update.callback_query.id, text=text, rate_limit_args=LANE_NORMAL
+                    )
+                elif update.effective_chat is not None:
+                    await context.bot.send_message(
+                        update.effective_chat.id, text, rate_limit_args=LANE_NORMAL
+                    )
+            except Exception as e:
+                logger.warning("Failed to send rate limit notice: %s", e)
+        raise ApplicationHandlerStop
+
+
+def build_rate_limiter() -> Optional[UserRateLimiter]:
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    limits = parse_limits(settings.RATE_LIMITS)
+    if not limits:
+        return None
+    # updates של אותו משתמש מתפזרים בין ה-workers – כל אחד מקבל חלק מהקצב
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return UserRateLimiter(
+        {name: (per_min / workers, burst) for name, (per_min, burst) in limits.items()},
+        max_entries=settings.RATE_LIMIT_MAX_BUCKETS,
+    )
@@ -0,0 +1,55 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+
+from telegram import InlineKeyboardMarkup
+
+from app.stats import live_stats
+
+
+class Rendered(NamedTuple):
+    text: str
+    # InlineKeyboardMarkup כ-JSON מוכן: PTB שולח str כפי שהוא (בלי to_dict/json.dumps)
+    markup: Optional[str] = None
+
+
+def serialize_markup(markup: InlineKeyboardMarkup) -> str:
+    return json.dumps(markup.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+class RenderCache:
+    """
+    מטמון למסכים סטטיים: (screen, lang) -> Rendered.
+
+    המסך נבנה פעם אחת לכל שפה; ב-hot path נשאר רק לשרשר את השדות
+    הדינמיים (יתרה, כתובת). settings והטקסטים נטענים בעליית התהליך ולא
+    משתנים בזמן ריצה, אז המטמון חי כל עוד התהליך חי – שינוי נכנס ב-restart.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Rendered]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, screen: str, lang: str, render: Callable[[], Rendered]
+    ) -> Rendered:
+        key = (screen, lang)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+        live_stats.record_cache("render", cached is not None)
+        if cached is not None:
+            return cached
+
+        rendered = render()
+        with self._lock:
+            self._entries[key] = rendered
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+
+render_cache = RenderCache()
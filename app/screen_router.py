@@ -0,0 +1,100 @@
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telegram import Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from app import metrics
+from app.render_cache import Rendered, serialize_markup
+
+logger = logging.getLogger(__name__)
+
+# render(tg_user, context) -> Rendered – אותן פונקציות שהפקודות משתמשות בהן
+ScreenRender = Callable[[Any, ContextTypes.DEFAULT_TYPE], Awaitable[Rendered]]
+
+SCREEN_UPDATES = metrics.Counter(
+    "slh_screen_updates_total",
+    "Inline-button screens by outcome (edited in place, unchanged, sent as a new message)",
+    ("screen", "result"),
+)
+
+
+def content_hash(text: str, markup: Optional[str]) -> str:
+    # טלגרם מוריד רווחים בקצוות הטקסט – משווים אחרי strip
+    digest = hashlib.sha1(text.strip().encode())
+    digest.update(b"\0")
+    digest.update((markup or "").encode())
+    return digest.hexdigest()
+
+
+class ScreenRouter:
+    """
+    כפתורי inline שמציגים מסך (MENU_*, WALLET_*):
+
+    - המסך נבנה באותה פונקציית render של הפקודה (/summary, /balance...)
+      ונכתב לתוך ההודעה שעליה נלחץ הכפתור (edit_message_text), במקום
+      הודעה חדשה בכל לחיצה
+    - hash של התוכן (טקסט + מקלדת) מול ההודעה הנוכחית: לחיצה חוזרת
+      על מסך שלא השתנה לא עולה קריאת Bot API
+    - מסך בלי מקלדת משלו שומר את המקלדת של ההודעה – התפריט נשאר
+    - הודעה שאי אפשר לערוך (ישנה / לא נגישה) – נשלח מסך כהודעה חדשה
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, tuple] = {}
+
+    def add(self, data: str, name: str, render: ScreenRender) -> None:
+        self._routes[data] = (name, render)
+
+    async def route(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        query = update.callback_query
+        await query.answer()
+
+        route = self._routes.get(query.data or "")
+        if route is None:
+            return
+        name, render = route
+        screen = await render(query.from_user, context)
+        await self.show(update, context, name, screen)
+
+    async def show(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        name: str,
+        screen: Rendered,
+    ) -> None:
+        query = update.callback_query
+        message = query.message
+        if message is None or not message.is_accessible:
+            await context.bot.send_message(
+                query.from_user.id, screen.text, reply_markup=screen.markup
+            )
+            SCREEN_UPDATES.inc(name, "sent")
+            return
+
+        current_markup = (
+            serialize_markup(message.reply_markup) if message.reply_markup else None
+        )
+        markup = screen.markup if screen.markup is not None else current_markup
+        if content_hash(screen.text, markup) == content_hash(
+            message.text or "", current_markup
+        ):
+            SCREEN_UPDATES.inc(name, "unchanged")
+            return
+
+        try:
+            await query.edit_message_text(screen.text, reply_markup=markup)
+            SCREEN_UPDATES.inc(name, "edited")
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                # התוכן זהה אבל ה-hash שלנו לא זיהה (פורמט שטלגרם נרמל)
+                SCREEN_UPDATES.inc(name, "unchanged")
+                return
+            logger.info("Screen %s could not be edited in place (%s), sending it", name, e)
+            await context.bot.send_message(
+                query.from_user.id, screen.text, reply_markup=screen.markup
+            )
+            SCREEN_UPDATES.inc(name, "sent")
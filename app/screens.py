@@ -0,0 +1,178 @@
+"""
+תבניות למסכי הדשבורד (/summary, /balance, /onchain, /history, /referrals).
+
+התבנית היא טקסט רגיל מה-bundle של השפה (app/locales/<lang>.json):
+- {name}        ערך כפי שהוא
+- {name:n4}     מספר עם 4 ספרות אחרי הנקודה, מופרד לפי המקום (n0..n8)
+- {name:dt}     תאריך ושעה בפורמט של השפה
+- {name:.2f}    כל format spec רגיל אחר
+- [?flag] / [!flag] בתחילת שורה – השורה מוצגת רק אם flag אמת / שקר
+  (אפשר לשרשר כמה: [?show_onchain][!has_bnb])
+
+כל תבנית מנותחת פעם אחת לרשימת ops; render עובר עליה פעם אחת.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from datetime import datetime
+from string import Formatter
+from typing import Any, Callable, Dict, List, Tuple
+
+from app import i18n
+
+_CONDITION = re.compile(r"\[([?!])(\w+)\]")
+_NUMBER_SPEC = re.compile(r"n(\d)")
+
+
+class Locale:
+    """מוסכמות מספרים ותאריכים של שפה, מחושבות פעם אחת."""
+
+    def __init__(self, cat: i18n.Catalog):
+        group = cat["NUMBER_GROUP_SEP"]
+        decimal = cat["NUMBER_DECIMAL_SEP"]
+        self.datetime_format = cat["DATETIME_FORMAT"]
+        self.missing = cat["VALUE_MISSING"]
+
+        # ",.Nf" נותן תמיד "," ו-"." – בשפות אחרות מחליפים בבת אחת
+        table = str.maketrans({",": group, ".": decimal})
+        identity = group == "," and decimal == "."
+        self._numbers: Dict[int, Callable[[Any], str]] = {}
+        for places in range(9):
+            spec = f",.{places}f"
+            if identity:
+                self._numbers[places] = lambda v, spec=spec: format(v, spec)
+            else:
+                self._numbers[places] = (
+                    lambda v, spec=spec: format(v, spec).translate(table)
+                )
+
+    def number(self, places: int) -> Callable[[Any], str]:
+        return self._numbers[places]
+
+    def format_datetime(self, value: Any) -> str:
+        if value is None:
+            return self.missing
+        if isinstance(value, datetime):
+            return value.strftime(self.datetime_format)
+        return str(value)
+
+
+# op: מחרוזת קבועה, או (שם, פונקציית format)
+Op = Any
+Block = Tuple[Tuple[Tuple[str, bool], ...], Tuple[Op, ...]]
+
+
+def _formatter(spec: str, locale: Locale) -> Callable[[Any], str]:
+    if not spec:
+        return str
+    m = _NUMBER_SPEC.fullmatch(spec)
+    if m:
+        return locale.number(int(m.group(1)))
+    if spec == "dt":
+        return locale.format_datetime
+    return lambda v: format(v, spec)
+
+
+def _compile(source: str, locale: Locale) -> Tuple[Tuple[Block, ...], bool]:
+    """
+    שורות עם אותם תנאים מתאחדות לבלוק אחד, וקטעים קבועים סמוכים
+    (כולל ה-"\n") מתאחדים למחרוזת אחת.
+    """
+    blocks: List[Tuple[Tuple[Tuple[str, bool], ...], List[Op]]] = []
+    compiled: List[Tuple[Tuple[Tuple[str, bool], ...], List[Op]]] = []
+    for raw in source.split("\n"):
+        conditions: List[Tuple[str, bool]] = []
+        pos = 0
+        while True:
+            m = _CONDITION.match(raw, pos)
+            if not m:
+                break
+            conditions.append((m.group(2), m.group(1) == "?"))
+            pos = m.end()
+
+        ops: List[Op] = []
+        for literal, name, spec, _ in Formatter().parse(raw[pos:] + "\n"):
+            if literal:
+                ops.append(literal)
+            if name is not None:
+                ops.append((name, _formatter(spec or "", locale)))
+
+        conds = tuple(conditions)
+        if blocks and blocks[-1][0] == conds:
+            blocks[-1][1].extend(ops)
+        else:
+            blocks.append((conds, ops))
+
+    for conds, ops in blocks:
+        merged: List[Op] = []
+        for op in ops:
+            if op.__class__ is str and merged and merged[-1].__class__ is str:
+                merged[-1] += op
+            else:
+                merged.append(op)
+        compiled.append((conds, merged))
+
+    # ה-"\n" של השורה האחרונה: אם היא לא מותנית, מורידים אותו כבר כאן
+    last_conds, last_ops = compiled[-1]
+    if not last_conds and last_ops and last_ops[-1].__class__ is str:
+        last_ops[-1] = last_ops[-1][:-1]
+        trim = False
+    else:
+        trim = True
+    return tuple((conds, tuple(ops)) for conds, ops in compiled), trim
+
+
+class ScreenTemplate:
+    __slots__ = ("key", "_blocks", "_trim")
+
+    def __init__(self, key: str, source: str, locale: Locale):
+        self.key = key
+        self._blocks, self._trim = _compile(source, locale)
+
+    def render(self, **values: Any) -> str:
+        out: List[str] = []
+        append = out.append
+        for conditions, ops in self._blocks:
+            if conditions:
+                for name, want in conditions:
+                    if (not values.get(name)) is want:
+                        break
+                else:
+                    conditions = ()
+                if conditions:
+                    continue
+            for op in ops:
+                if op.__class__ is str:
+                    append(op)
+                else:
+                    append(op[1](values[op[0]]))
+        text = "".join(out)
+        return text[:-1] if self._trim and text.endswith("\n") else text
+
+
+_LOCALES: Dict[str, Locale] = {}
+_TEMPLATES: Dict[Tuple[str, str], ScreenTemplate] = {}
+_LOCK = threading.Lock()
+
+
+def locale(cat: i18n.Catalog) -> Locale:
+    found = _LOCALES.get(cat.lang)
+    if found is None:
+        found = _LOCALES.setdefault(cat.lang, Locale(cat))
+    return found
+
+
+def template(cat: i18n.Catalog, key: str) -> ScreenTemplate:
+    found = _TEMPLATES.get((cat.lang, key))
+    if found is None:
+        with _LOCK:
+            found = _TEMPLATES.get((cat.lang, key))
+            if found is None:
+                found = ScreenTemplate(key, cat[key], locale(cat))
+                _TEMPLATES[(cat.lang, key)] = found
+    return found
+
+
+def render(cat: i18n.Catalog, key: str, **values: Any) -> str:
+    return template(cat, key).render(**values)
@@ -0,0 +1,327 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from app.core.config import settings
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# נתיבי עדיפות: מספר קטן יותר יוצא קודם כשיש תור
+# (לא 0 – PTB מתעלם מ-rate_limit_args שהוא falsy)
+LANE_URGENT = 1  # אישורי העברה / תשלום, תשובות אדמין
+LANE_NORMAL = 2  # מסכים ותשובות רגילות
+LANE_BULK = 3  # ערוצי לוג, הודעות רקע
+
+LANE_NAMES = {LANE_URGENT: "urgent", LANE_NORMAL: "normal", LANE_BULK: "bulk"}
+
+# handlers שהתשובה שלהם היא אישור פעולה כספית
+URGENT_HANDLERS = frozenset(
+    {
+        "cmd_transfer",
+        "cmd_send_slh",
+        "cmd_admin_credit",
+        "cmd_admin_payout",
+        "handle_text",  # סכום / יעד של העברה
+    }
+)
+
+SEND_WAIT = metrics.Histogram(
+    "slh_send_wait_seconds",
+    "Time an outgoing Bot API message waited for the rate limiter",
+    ("lane",),
+    (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SEND_RETRY_AFTER = metrics.Counter(
+    "slh_send_retry_after_total", "429 responses (retry_after) from the Bot API", ("endpoint",)
+)
+SEND_QUEUED = metrics.Gauge(
+    "slh_send_queued", "Outgoing messages waiting for the global bucket", ("lane",)
+)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """0 אם נלקח token; אחרת כמה שניות לחכות (בלי לקחת)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class ChatBucket(TokenBucket):
+    """bucket של צ'אט + lock: ההודעות לאותו צ'אט יוצאות לפי הסדר."""
+
+    __slots__ = ("lock",)
+
+    def __init__(self, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self.lock = asyncio.Lock()
+
+
+def _seconds(retry_after: Union[int, float, timedelta]) -> float:
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class SendScheduler(BaseRateLimiter[int]):
+    """
+    כל קריאת Bot API של הבוט עוברת כאן (rate_limiter של PTB), כך ש-
+    reply_text / send_message / edit_message_text מתוזמנים בלי לשנות handlers:
+
+    - הודעה לצ'אט (יש chat_id): token bucket לצ'אט (פרטי: ~1 לשנייה עם
+      burst קטן; קבוצה / ערוץ: 20 לדקה), ואז ה-bucket הגלובלי
+    - כשה-bucket הגלובלי ריק ההודעות ממתינות בתור עדיפויות: urgent לפני
+      normal לפני bulk. הנתיב נקבע לפי rate_limit_args, ואם לא הועבר –
+      לפי ה-handler שרץ (metrics.current_handler)
+    - RetryAfter (429): כל השליחה נעצרת ל-retry_after והקריאה נשלחת שוב
+    """
+
+    def __init__(
+        self,
+        global_per_sec: float,
+        chat_per_sec: float,
+        chat_burst: int,
+        group_per_min: float,
+        max_retries: int,
+        max_chats: int,
+    ):
+        self._global = TokenBucket(global_per_sec, max(1.0, global_per_sec))
+        self._chat_rate = chat_per_sec
+        self._chat_burst = max(1, chat_burst)
+        self._group_rate = group_per_min / 60.0
+        self._group_burst = max(1.0, group_per_min)
+        self._max_retries = max_retries
+        self._max_chats = max(1, max_chats)
+        self._chats: "OrderedDict[Any, ChatBucket]" = OrderedDict()
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        SEND_QUEUED.set_function(self._queued_by_lane)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, fut in self._queue:
+            if not fut.done():
+                fut.cancel()
+        self._queue.clear()
+
+    def _queued_by_lane(self) -> Dict[tuple, int]:
+        counts = {(name,): 0 for name in LANE_NAMES.values()}
+        for lane, _, _ in self._queue:
+            counts[(LANE_NAMES.get(lane, str(lane)),)] += 1
+        return counts
+
+    # ===== Buckets =====
+
+    def _chat_bucket(self, chat_id: Any) -> ChatBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+            return bucket
+
+        # chat_id שלילי / @username – קבוצה או ערוץ
+        try:
+            is_group = int(chat_id) < 0
+        except ValueError:
+            is_group = True
+        if is_group:
+            bucket = ChatBucket(self._group_rate, self._group_burst)
+        else:
+            bucket = ChatBucket(self._chat_rate, self._chat_burst)
+        self._chats[chat_id] = bucket
+        # bucket שנפלט היה ממילא מלא (צ'אט לא פעיל) – אין בזה הקלה אמיתית.
+        # צ'אט ששולח עכשיו (lock תפוס) לא נפלט, כדי לא לשבור את הסדר
+        while len(self._chats) > self._max_chats:
+            oldest_id, oldest = next(iter(self._chats.items()))
+            if oldest.lock.locked():
+                self._chats.move_to_end(oldest_id)
+                break
+            self._chats.popitem(last=False)
+        return bucket
+
+    async def _wait_chat(self, bucket: ChatBucket) -> None:
+        while True:
+            delay = bucket.take()
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    async def _wait_global(self, lane: int) -> None:
+        if not self._queue and time.monotonic() >= self._paused_until:
+            if not self._global.take():
+                return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (lane, next(self._seq), fut))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await fut
+
+    async def _dispatch(self) -> None:
+        while self._queue:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            delay = self._global.take()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            _, _, fut = heapq.heappop(self._queue)
+            if fut.done():
+                # הממתין בוטל – ה-token חוזר לבא בתור
+                self._global.refund()
+                continue
+            fut.set_result(None)
+
+    # ===== BaseRateLimiter =====
+
+    def _lane(self, rate_limit_args: Optional[int]) -> int:
+        if rate_limit_args is not None:
+            return int(rate_limit_args)
+        handler = metrics.current_handler.get()
+        if handler in URGENT_HANDLERS:
+            return LANE_URGENT
+        if handler == "background":
+            return LANE_BULK
+        return LANE_NORMAL
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], None]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], None]:
+        chat_id = data.get("chat_id")
+        lane = self._lane(rate_limit_args)
+        if chat_id is None:
+            # getMe / answerCallbackQuery וכו' – בלי bucket, אבל מכבדים 429
+            return await self._send(callback, args, kwargs, endpoint, None, lane)
+
+        # ה-lock מוחזק עד שהקריאה חוזרת – הודעה מאוחרת לא עוקפת מוקדמת
+        bucket = self._chat_bucket(chat_id)
+        async with bucket.lock:
+            return await self._send(callback, args, kwargs, endpoint, bucket, lane)
+
+    async def _send(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        bucket: Optional[ChatBucket],
+        lane: int,
+    ) -> Any:
+        attempt = 0
+        while True:
+            if bucket is not None:
+                started = time.perf_counter()
+                await self._wait_chat(bucket)
+                await self._wait_global(lane)
+                SEND_WAIT.observe(time.perf_counter() - started, LANE_NAMES.get(lane, str(lane)))
+            else:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)
+                SEND_RETRY_AFTER.inc(endpoint)
+                if attempt >= self._max_retries:
+                    raise
+                attempt += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                logger.warning(
+                    "Bot API %s hit 429, pausing sends for %.1fs (attempt %d)",
+                    endpoint,
+                    delay,
+                    attempt,
+                )
+
+    def lane(self, lane: int) -> "LaneLimiter":
+        """rate limiter לבוט נוסף (למשל בוט הלוג) שחולק את אותם buckets."""
+        return LaneLimiter(self, lane)
+
+
+class LaneLimiter(BaseRateLimiter[int]):
+    """מעביר ל-SendScheduler עם נתיב ברירת מחדל משלו."""
+
+    def __init__(self, scheduler: SendScheduler, lane: int):
+        self._scheduler = scheduler
+        self._lane = lane
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], None]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], None]:
+        return await self._scheduler.process_request(
+            callback,
+            args,
+            kwargs,
+            endpoint,
+            data,
+            rate_limit_args if rate_limit_args is not None else self._lane,
+        )
+
+
+def build_scheduler() -> Optional[SendScheduler]:
+    if not settings.SEND_RATE_LIMIT_ENABLED:
+        return None
+    # המגבלה הגלובלית של טלגרם היא לבוט, לא ל-worker
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return SendScheduler(
+        global_per_sec=settings.SEND_GLOBAL_PER_SEC / workers,
+        chat_per_sec=settings.SEND_CHAT_PER_SEC,
+        chat_burst=settings.SEND_CHAT_BURST,
+        group_per_min=settings.SEND_GROUP_PER_MIN,
+        max_retries=settings.SEND_MAX_RETRIES,
+        max_chats=settings.SEND_CHAT_BUCKETS,
+    )
@@ -0,0 +1,142 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+WINDOW_SEC = 15 * 60
+
+# גבולות latency: 1ms * 1.5^k עד ~57 שניות
+LATENCY_BOUNDS = tuple(0.001 * (1.5**i) for i in range(28))
+
+
+class WindowedCounter:
+    """
+    טבעת של דליים לשנייה: add() הוא O(1) (אינדקס = שנייה % גודל,
+    ודלי ישן מתאפס בפעם הראשונה שנוגעים בו מחדש).
+    """
+
+    def __init__(self, window_sec: int = WINDOW_SEC):
+        self._size = window_sec
+        self._stamps = [-1] * window_sec
+        self._values = [0] * window_sec
+        self._lock = threading.Lock()
+
+    def add(self, amount: int = 1, now: Optional[float] = None) -> None:
+        sec = int(now if now is not None else time.time())
+        idx = sec % self._size
+        with self._lock:
+            if self._stamps[idx] != sec:
+                self._stamps[idx] = sec
+                self._values[idx] = 0
+            self._values[idx] += amount
+
+    def total(self, seconds: int, now: Optional[float] = None) -> int:
+        sec = int(now if now is not None else time.time())
+        oldest = sec - min(seconds, self._size) + 1
+        with self._lock:
+            return sum(
+                v for s, v in zip(self._stamps, self._values) if oldest <= s <= sec
+            )
+
+
+class WindowedHistogram:
+    """כמו WindowedCounter, אבל כל דלי שומר היסטוגרמה קבועה של latency."""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BOUNDS, window_sec: int = WINDOW_SEC):
+        self._bounds = tuple(bounds)
+        self._size = window_sec
+        self._stamps = [-1] * window_sec
+        self._buckets: List[List[int]] = [[0] * (len(self._bounds) + 1) for _ in range(window_sec)]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, now: Optional[float] = None) -> None:
+        sec = int(now if now is not None else time.time())
+        idx = sec % self._size
+        b = bisect_left(self._bounds, value)
+        with self._lock:
+            counts = self._buckets[idx]
+            if self._stamps[idx] != sec:
+                self._stamps[idx] = sec
+                for i in range(len(counts)):
+                    counts[i] = 0
+            counts[b] += 1
+
+    def _merged(self, seconds: int, now: Optional[float]) -> List[int]:
+        sec = int(now if now is not None else time.time())
+        oldest = sec - min(seconds, self._size) + 1
+        merged = [0] * (len(self._bounds) + 1)
+        with self._lock:
+            for stamp, counts in zip(self._stamps, self._buckets):
+                if oldest <= stamp <= sec:
+                    for i, n in enumerate(counts):
+                        merged[i] += n
+        return merged
+
+    def count(self, seconds: int, now: Optional[float] = None) -> int:
+        return sum(self._merged(seconds, now))
+
+    def percentiles(
+        self, seconds: int, qs: Sequence[float], now: Optional[float] = None
+    ) -> List[Optional[float]]:
+        """אחוזונים משוערים (אינטרפולציה לינארית בתוך הדלי)."""
+        merged = self._merged(seconds, now)
+        total = sum(merged)
+        if total == 0:
+            return [None for _ in qs]
+
+        results: List[Optional[float]] = []
+        for q in qs:
+            rank = q * total
+            cumulative = 0
+            for i, n in enumerate(merged):
+                if n and cumulative + n >= rank:
+                    lower = self._bounds[i - 1] if i > 0 else 0.0
+                    upper = self._bounds[i] if i < len(self._bounds) else self._bounds[-1]
+                    results.append(lower + (upper - lower) * ((rank - cumulative) / n))
+                    break
+                cumulative += n
+            else:
+                results.append(self._bounds[-1])
+        return results
+
+
+class LiveStats:
+    """מונים חיים ל-/admin_stats (1/5/15 דקות)."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.updates = WindowedCounter()
+        self.update_errors = WindowedCounter()
+        self.handler_latency = WindowedHistogram()
+        self.handler_errors = WindowedCounter()
+        self.rpc_calls = WindowedCounter()
+        self.rpc_errors = WindowedCounter()
+        self._cache_hits: Dict[str, WindowedCounter] = {}
+        self._cache_misses: Dict[str, WindowedCounter] = {}
+
+    def record_cache(self, name: str, hit: bool) -> None:
+        series = self._cache_hits if hit else self._cache_misses
+        counter = series.get(name)
+        if counter is None:
+            counter = series.setdefault(name, WindowedCounter())
+        counter.add()
+
+    def cache_names(self) -> List[str]:
+        return sorted(set(self._cache_hits) | set(self._cache_misses))
+
+    def cache_hit_rate(self, name: str, seconds: int) -> Optional[float]:
+        hits = self._cache_hits.get(name)
+        misses = self._cache_misses.get(name)
+        h = hits.total(seconds) if hits else 0
+        m = misses.total(seconds) if misses else 0
+        return h / (h + m) if h + m else None
+
+    def effective_window(self, seconds: int) -> float:
+        """בתחילת חיי התהליך – מחלקים בזמן שעבר בפועל."""
+        return max(1.0, min(float(seconds), time.time() - self.started_at))
+
+    def rate(self, counter: WindowedCounter, seconds: int) -> float:
+        return counter.total(seconds) / self.effective_window(seconds)
+
+
+live_stats = LiveStats()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from telegram.error import TimedOut
+from telegram.request import BaseRequest, RequestData
+
+from app.core.config import settings
+from app import metrics, tracing
+
+_DEFAULT = type(BaseRequest.DEFAULT_NONE)
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+TELEGRAM_POOL_WAIT = metrics.Histogram(
+    "slh_telegram_pool_wait_seconds",
+    "Time a Bot API call waited for a free connection slot",
+    ("pool",),
+    POOL_WAIT_BUCKETS,
+)
+TELEGRAM_POOL_TIMEOUTS = metrics.Counter(
+    "slh_telegram_pool_timeouts_total",
+    "Bot API calls dropped because the pool stayed full for pool_timeout",
+    ("pool",),
+)
+TELEGRAM_POOL_IN_FLIGHT = metrics.Gauge(
+    "slh_telegram_pool_in_flight", "Bot API calls currently using a connection slot", ("pool",)
+)
+TELEGRAM_POOL_WAITING = metrics.Gauge(
+    "slh_telegram_pool_waiting", "Bot API calls queued for a connection slot", ("pool",)
+)
+
+_pools: Dict[str, "PooledHTTPXRequest"] = {}
+
+TELEGRAM_POOL_IN_FLIGHT.set_function(
+    lambda: {(name,): p.in_flight for name, p in _pools.items()}
+)
+TELEGRAM_POOL_WAITING.set_function(
+    lambda: {(name,): p.waiting for name, p in _pools.items()}
+)
+
+
+class PooledHTTPXRequest(tracing.TracingHTTPXRequest):
+    """
+    HTTPXRequest עם pool בגודל קבוע ומדידת המתנה לחיבור.
+
+    ההמתנה של httpx ל-pool לא נראית מבחוץ, ולכן הגבלת הקריאות בטיסה
+    נעשית כאן (semaphore בגודל ה-pool): הזמן עד שמקבלים slot הוא זמן
+    ההמתנה ל-pool, ו-httpx עצמו אף פעם לא מחכה.
+    """
+
+    def __init__(
+        self,
+        pool: str,
+        connection_pool_size: int,
+        keepalive_sec: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        # _build_client נקרא מתוך super().__init__
+        self._keepalive_sec = keepalive_sec
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+        self.pool = pool
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(connection_pool_size)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        if self._keepalive_sec is not None:
+            limits = self._client_kwargs["limits"]
+            self._client_kwargs["limits"] = httpx.Limits(
+                max_connections=limits.max_connections,
+                max_keepalive_connections=limits.max_keepalive_connections,
+                keepalive_expiry=self._keepalive_sec,
+            )
+        return super()._build_client()
+
+    async def _acquire(self, pool_timeout: Optional[float]) -> None:
+        if not self._slots.locked():
+            await self._slots.acquire()
+            TELEGRAM_POOL_WAIT.observe(0.0, self.pool)
+            return
+
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=pool_timeout)
+        except asyncio.TimeoutError:
+            TELEGRAM_POOL_TIMEOUTS.inc(self.pool)
+            raise TimedOut(
+                f"Pool timeout: all {self.pool} connections are busy. "
+                "Request was *not* sent to Telegram."
+            ) from None
+        finally:
+            self.waiting -= 1
+            TELEGRAM_POOL_WAIT.observe(time.perf_counter() - started, self.pool)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = BaseRequest.DEFAULT_NONE,
+        write_timeout: Any = BaseRequest.DEFAULT_NONE,
+        connect_timeout: Any = BaseRequest.DEFAULT_NONE,
+        pool_timeout: Any = BaseRequest.DEFAULT_NONE,
+    ):
+        if isinstance(pool_timeout, _DEFAULT):
+            pool_timeout = self._client.timeout.pool
+
+        await self._acquire(pool_timeout)
+        self.in_flight += 1
+        try:
+            return await super().do_request(
+                url,
+                method,
+                request_data,
+                read_timeout,
+                write_timeout,
+                connect_timeout,
+                pool_timeout,
+            )
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+
+def build_request(pool: str, size: int) -> PooledHTTPXRequest:
+    """request object לפי ההגדרות, רשום ל-metrics תחת שם ה-pool."""
+    size = max(1, int(size))
+    request = PooledHTTPXRequest(
+        pool,
+        connection_pool_size=size,
+        keepalive_sec=settings.TELEGRAM_KEEPALIVE_SEC,
+        http_version=settings.TELEGRAM_HTTP_VERSION,
+        connect_timeout=settings.TELEGRAM_CONNECT_TIMEOUT_SEC,
+        read_timeout=settings.TELEGRAM_READ_TIMEOUT_SEC,
+        write_timeout=settings.TELEGRAM_WRITE_TIMEOUT_SEC,
+        pool_timeout=settings.TELEGRAM_POOL_TIMEOUT_SEC,
+    )
+    _pools[pool] = request
+    return request
@@ -0,0 +1,372 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from telegram.request import HTTPXRequest
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "slh-investor-gateway"
+
+# OTLP SpanKind
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("slh_current_span", default=None)
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        trace_id: str,
+        name: str,
+        parent_id: Optional[str] = None,
+        kind: int = KIND_INTERNAL,
+        start_ns: Optional[int] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attr(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+def _otlp_attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def trace_id_for_update(update_id: Any) -> str:
+    """trace id קבוע לכל update_id – אפשר למצוא את ה-trace לפי ה-update בלוגים."""
+    return hashlib.sha256(f"tg-update:{update_id}".encode()).hexdigest()[:32]
+
+
+def is_sampled(trace_id: str) -> bool:
+    rate = float(settings.TRACE_SAMPLE_RATE)
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    return int(trace_id[:8], 16) < rate * 0x100000000
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+# ===== Exporter =====
+
+
+class SpanExporter:
+    """
+    ייצוא ברקע (thread) – ה-handler רק מכניס span לתור.
+    כל batch נכתב כשורת ExportTraceServiceRequest (OTLP/JSON) לקובץ,
+    וכשמוגדר TRACE_OTLP_ENDPOINT גם נשלח ל-collector ב-OTLP/HTTP.
+    התור חסום – כשמלא, spans נזרקים ולא מאטים את הבוט.
+    """
+
+    def __init__(self, path: Optional[str], endpoint: Optional[str], max_queue: int = 10000):
+        self._path = path
+        self._endpoint = endpoint
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self.dropped = 0
+
+    def submit(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first: Span, limit: int = 512) -> tuple[List[Span], bool]:
+        batch = [first]
+        stop = False
+        while len(batch) < limit:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _payload(self, batch: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [_otlp_attr("service.name", SERVICE_NAME)]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.tracing"},
+                            "spans": [s.to_otlp() for s in batch],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def _export(self, batch: List[Span], client) -> None:
+        payload = self._payload(batch)
+
+        if self._path:
+            try:
+                with open(self._path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+            except Exception as e:
+                logger.warning("Failed to write %s spans to %s: %s", len(batch), self._path, e)
+
+        if client is not None:
+            try:
+                client.post(self._endpoint, json=payload).raise_for_status()
+            except Exception as e:
+                logger.warning("OTLP export of %s spans failed: %s", len(batch), e)
+
+    def run(self) -> None:
+        client = None
+        if self._endpoint:
+            import httpx
+
+            client = httpx.Client(timeout=5)
+
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch, stop = self._drain(item)
+                self._export(batch, client)
+                if stop:
+                    break
+        finally:
+            if client is not None:
+                client.close()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+
+_exporter: SpanExporter | None = None
+
+
+def _finish(span: Span) -> None:
+    span.end_ns = time.time_ns()
+    if _exporter is not None:
+        _exporter.submit(span)
+
+
+# ===== Spans =====
+
+
+@contextmanager
+def start_trace(
+    update_id: Any, name: str, start_ns: Optional[int] = None, **attributes: Any
+) -> Iterator[Optional[Span]]:
+    """span שורש ל-update אחד. אם ה-trace לא נדגם – לא נוצר כלום."""
+    if _exporter is None:
+        yield None
+        return
+
+    trace_id = trace_id_for_update(update_id)
+    if not is_sampled(trace_id):
+        yield None
+        return
+
+    root = Span(trace_id, name, kind=KIND_SERVER, start_ns=start_ns, attributes=attributes)
+    root.set("telegram.update_id", update_id)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(root)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+    """span ילד של ה-span הנוכחי; מחוץ ל-trace נדגם זה no-op זול."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(parent.trace_id, name, parent.span_id, kind, attributes=attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(child)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+    """span שכבר הסתיים (למשל פענוח JSON שקרה לפני שהיה update_id)."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    child = Span(parent.trace_id, name, parent.span_id, start_ns=start_ns, attributes=attributes)
+    child.end_ns = end_ns
+    if _exporter is not None:
+        _exporter.submit(child)
+
+
+# ===== Instrumentation =====
+
+
+def instrument_engine(engine) -> None:
+    """span לכל SQL statement שרץ בתוך trace."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        child = Span(
+            parent.trace_id,
+            "db.query",
+            parent.span_id,
+            KIND_CLIENT,
+            attributes={"db.statement": statement[:500], "db.executemany": executemany},
+        )
+        conn.info.setdefault("slh_trace_spans", []).append(child)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("slh_trace_spans")
+        if stack:
+            _finish(stack.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        stack = conn.info.get("slh_trace_spans") if conn is not None else None
+        if stack:
+            child = stack.pop()
+            child.error = repr(exception_context.original_exception)
+            _finish(child)
+
+
+def web3_middleware(make_request, w3):
+    """web3 v6 middleware: span לכל קריאת RPC בתוך trace."""
+
+    def middleware(method, params):
+        with span(f"rpc {method}", KIND_CLIENT, **{"rpc.method": str(method)}) as s:
+            response = make_request(method, params)
+            if s is not None and isinstance(response, dict) and response.get("error"):
+                s.error = str(response["error"])[:255]
+            return response
+
+    return middleware
+
+
+class TracingHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest שפותח span לכל קריאת Bot API (sendMessage וכו')."""
+
+    async def do_request(self, url: str, method: str, *args: Any, **kwargs: Any):
+        if _current_span.get() is None:
+            return await super().do_request(url, method, *args, **kwargs)
+
+        endpoint = url.rsplit("/", 1)[-1]
+        with span(f"telegram {endpoint}", KIND_CLIENT, **{"telegram.method": endpoint}) as s:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+            s.set("http.status_code", code)
+            return code, payload
+
+
+# ===== Lifecycle =====
+
+
+def start_tracing() -> None:
+    global _exporter
+
+    if not settings.TRACING_ENABLED or _exporter is not None:
+        return
+
+    _exporter = SpanExporter(settings.TRACE_EXPORT_FILE, settings.TRACE_OTLP_ENDPOINT)
+    _exporter.start()
+    logger.info(
+        "Tracing enabled (sample_rate=%s, file=%s, otlp=%s)",
+        settings.TRACE_SAMPLE_RATE,
+        settings.TRACE_EXPORT_FILE,
+        settings.TRACE_OTLP_ENDPOINT,
+    )
+
+
+async def stop_tracing() -> None:
+    global _exporter
+    if _exporter is None:
+        return
+    exporter, _exporter = _exporter, None
+    await asyncio.to_thread(exporter.stop)
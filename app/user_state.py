@@ -0,0 +1,344 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, update
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app import metrics, models
+from app.stats import live_stats
+
+logger = logging.getLogger(__name__)
+
+# ניקוי flows שפגו ושורות ריקות מהטבלה
+PURGE_INTERVAL_SEC = 600
+
+USER_STATE_CACHED = metrics.Gauge(
+    "slh_user_state_cached", "User conversation states held in the in-memory LRU"
+)
+USER_STATE_DIRTY = metrics.Gauge(
+    "slh_user_state_dirty", "User conversation state changes waiting for the next flush"
+)
+
+
+class UserStateEntry:
+    """
+    שפה + flow פתוח של משתמש אחד (updated_at בשניות epoch).
+    changed – העמודות ששונו מאז ה-flush האחרון; רק הן נכתבות.
+    """
+
+    __slots__ = (
+        "telegram_id", "lang", "flow", "flow_data", "updated_at", "loaded_at", "changed"
+    )
+
+    def __init__(
+        self,
+        telegram_id: int,
+        lang: Optional[str] = None,
+        flow: Optional[str] = None,
+        flow_data: Optional[Dict[str, Any]] = None,
+        updated_at: float = 0.0,
+    ):
+        self.telegram_id = telegram_id
+        self.lang = lang
+        self.flow = flow
+        self.flow_data = flow_data
+        self.updated_at = updated_at
+        self.loaded_at = time.monotonic()
+        self.changed: frozenset = frozenset()
+
+    def _row(self) -> Dict[str, Any]:
+        return {
+            "telegram_id": self.telegram_id,
+            "lang": self.lang,
+            "flow": self.flow,
+            "flow_data": json.dumps(self.flow_data) if self.flow_data else None,
+            "updated_at": datetime.fromtimestamp(self.updated_at, timezone.utc),
+        }
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return 0.0
+    # SQLite מחזיר datetime בלי tz – נשמר תמיד ב-UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _upsert(db, columns: frozenset, rows: List[Dict[str, Any]]) -> None:
+    """
+    upsert של העמודות ב-columns בלבד (+ updated_at), ורק אם השורה ב-DB לא
+    חדשה יותר: worker עם עותק ישן לא דורס שפה / flow ש-worker אחר כתב.
+    """
+    table = models.UserState.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows:
+            current = db.get(models.UserState, row["telegram_id"])
+            if current is None:
+                db.add(models.UserState(**row))
+            elif _epoch(current.updated_at) < _epoch(row["updated_at"]):
+                for c in (*columns, "updated_at"):
+                    setattr(current, c, row[c])
+        return
+
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.telegram_id],
+        set_={c: stmt.excluded[c] for c in (*sorted(columns), "updated_at")},
+        where=stmt.excluded.updated_at > table.c.updated_at,
+    )
+    db.execute(stmt, rows)
+
+
+class UserStateStore:
+    """
+    מצב שיחה למשתמש, במקום context.user_data של PTB (שנמחק בכל deploy,
+    לא משותף בין workers וגדל בלי גבול):
+    - LRU חסום בזיכרון מול טבלת user_states
+    - רשומה נקייה ישנה מ-cache_sec נקראת שוב מה-DB (worker אחר אולי שינה אותה)
+    - שינויים מסומנים dirty ונכתבים ב-batch כל flush_sec – רק העמודות
+      ששונו, ורק מעל שורה ישנה יותר (updated_at)
+    - flow שלא התקדם flow_ttl_sec נחשב נטוש ומתאפס
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        cache_sec: float,
+        flush_sec: float,
+        flow_ttl_sec: float,
+    ):
+        self._max_entries = max(1, max_entries)
+        self._cache_sec = cache_sec
+        self._flush_sec = flush_sec
+        self._flow_ttl = flow_ttl_sec
+        self._entries: "OrderedDict[int, UserStateEntry]" = OrderedDict()
+        self._dirty: Dict[int, UserStateEntry] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+        USER_STATE_CACHED.set_function(lambda: len(self._entries))
+        USER_STATE_DIRTY.set_function(lambda: len(self._dirty))
+
+    # ===== קריאה =====
+
+    def get(self, telegram_id: int) -> UserStateEntry:
+        """
+        רשומה ישנה נקראת מה-DB כאן, בקריאה חוסמת. מה-event loop – load()
+        קודם (הבוט עושה את זה לפני כל handler), ואז get() מוצא אותה בזיכרון.
+        """
+        entry = self._fresh(telegram_id)
+        if entry is None:
+            entry = self._loaded(self._load(telegram_id))
+        return self._expire_flow(entry)
+
+    async def load(self, telegram_id: int) -> UserStateEntry:
+        """כמו get(), אבל הקריאה מה-DB רצה ב-thread ולא חוסמת את ה-event loop."""
+        entry = self._fresh(telegram_id)
+        if entry is None:
+            entry = self._loaded(await asyncio.to_thread(self._load, telegram_id))
+        return self._expire_flow(entry)
+
+    def _fresh(self, telegram_id: int) -> Optional[UserStateEntry]:
+        with self._lock:
+            entry = self._dirty.get(telegram_id) or self._entries.get(telegram_id)
+            fresh = entry is not None and (
+                telegram_id in self._dirty
+                or time.monotonic() - entry.loaded_at <= self._cache_sec
+            )
+            if fresh:
+                self._remember(entry)
+        live_stats.record_cache("user_state", fresh)
+        return entry if fresh else None
+
+    def _loaded(self, loaded: UserStateEntry) -> UserStateEntry:
+        with self._lock:
+            # set() במקביל – הגרסה ב-dirty חדשה יותר מה-DB
+            entry = self._dirty.get(loaded.telegram_id, loaded)
+            self._remember(entry)
+        return entry
+
+    def _expire_flow(self, entry: UserStateEntry) -> UserStateEntry:
+        if entry.flow is not None and time.time() - entry.updated_at > self._flow_ttl:
+            self._change(entry, flow=None, flow_data=None)
+        return entry
+
+    def cached_lang(self, telegram_id: int) -> Optional[str]:
+        """השפה מהזיכרון בלבד (גם אם ישנה), בלי לגשת ל-DB."""
+        with self._lock:
+            entry = self._dirty.get(telegram_id) or self._entries.get(telegram_id)
+        return entry.lang if entry is not None else None
+
+    def _load(self, telegram_id: int) -> UserStateEntry:
+        db = SessionLocal()
+        try:
+            row = db.get(models.UserState, telegram_id)
+        finally:
+            db.close()
+
+        if row is None:
+            return UserStateEntry(telegram_id)
+
+        flow_data = None
+        if row.flow_data:
+            try:
+                flow_data = json.loads(row.flow_data)
+            except ValueError:
+                logger.warning("Bad flow_data for user %s, dropping it", telegram_id)
+        return UserStateEntry(
+            telegram_id,
+            lang=row.lang,
+            flow=row.flow,
+            flow_data=flow_data,
+            updated_at=_epoch(row.updated_at),
+        )
+
+    def _remember(self, entry: UserStateEntry) -> None:
+        # נקרא תחת self._lock. רשומה dirty שנפלטה נשארת ב-_dirty עד ה-flush
+        self._entries[entry.telegram_id] = entry
+        self._entries.move_to_end(entry.telegram_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    # ===== שינוי =====
+
+    def _change(self, entry: UserStateEntry, **changes: Any) -> None:
+        with self._lock:
+            for key, value in changes.items():
+                setattr(entry, key, value)
+            entry.changed = entry.changed.union(changes)
+            entry.updated_at = time.time()
+            self._dirty[entry.telegram_id] = entry
+
+    def set_lang(self, telegram_id: int, lang: str) -> None:
+        self._change(self.get(telegram_id), lang=lang)
+
+    def set_flow(self, telegram_id: int, flow: str, **data: Any) -> None:
+        self._change(self.get(telegram_id), flow=flow, flow_data=data or None)
+
+    def clear_flow(self, telegram_id: int) -> None:
+        entry = self.get(telegram_id)
+        if entry.flow is not None or entry.flow_data:
+            self._change(entry, flow=None, flow_data=None)
+
+    # ===== כתיבה ל-DB =====
+
+    def flush(self) -> int:
+        with self._lock:
+            if not self._dirty:
+                return 0
+            batch, self._dirty = self._dirty, {}
+            changed = {}
+            groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+            for telegram_id, entry in batch.items():
+                changed[telegram_id], entry.changed = entry.changed, frozenset()
+                groups.setdefault(changed[telegram_id], []).append(entry._row())
+
+        db = SessionLocal()
+        try:
+            for columns, rows in groups.items():
+                _upsert(db, columns, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # מחזירים ל-dirty, עם העמודות שלא נכתבו
+            with self._lock:
+                for telegram_id, entry in batch.items():
+                    entry.changed = entry.changed.union(changed[telegram_id])
+                    self._dirty.setdefault(telegram_id, entry)
+            raise
+        finally:
+            db.close()
+        return len(batch)
+
+    def purge(self) -> None:
+        table = models.UserState.__table__
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self._flow_ttl)
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(table)
+                .where(table.c.flow.isnot(None), table.c.updated_at < cutoff)
+                .values(flow=None, flow_data=None)
+            )
+            # בלי שפה ובלי flow – אין מה לשמור
+            db.execute(
+                delete(table).where(
+                    table.c.lang.is_(None),
+                    table.c.flow.is_(None),
+                    table.c.updated_at < cutoff,
+                )
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        logger.info("User state flusher started (interval=%ss)", self._flush_sec)
+        last_purge = 0.0
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self._flush_sec)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await asyncio.to_thread(self.flush)
+                if time.monotonic() - last_purge >= PURGE_INTERVAL_SEC:
+                    last_purge = time.monotonic()
+                    await asyncio.to_thread(self.purge)
+            except Exception as e:
+                logger.exception("User state flush failed: %s", e)
+
+        logger.info("User state flusher stopped")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+        # מה שנשאר ב-dirty נכתב לפני שהתהליך יורד
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            logger.exception("Final user state flush failed: %s", e)
+
+
+user_states = UserStateStore(
+    max_entries=settings.USER_STATE_CACHE_SIZE,
+    cache_sec=settings.USER_STATE_CACHE_SEC,
+    flush_sec=max(0.1, settings.USER_STATE_FLUSH_SEC),
+    flow_ttl_sec=settings.USER_STATE_FLOW_TTL_SEC,
+)
+
+
+def start_user_state() -> None:
+    user_states.start()
+
+
+async def stop_user_state() -> None:
+    await user_states.stop()
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.database import engine
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SECONDS = metrics.Gauge(
+    "slh_warmup_seconds", "Time from process startup until all warmup steps finished"
+)
+
+
+class Warmup:
+    """
+    חימום אחרי העלייה: כל הצעדים רצים במקביל ברקע, startup_event לא מחכה.
+
+    - צעד required (למשל getMe של הבוט) מנוסה שוב עד שהוא מצליח;
+      /ready מחזיר 503 עד שכל ה-required הצליחו
+    - צעד רגיל (RPC) מנוסה פעם אחת – כישלון נרשם ולא חוסם
+    - wait(name) מאפשר ל-webhook לחכות לצעד מסוים (הבוט) לפני שהוא מטפל ב-update
+    """
+
+    def __init__(self, retry_sec: float):
+        self._retry_sec = retry_sec
+        self._steps: Dict[str, tuple] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._task: asyncio.Task | None = None
+        self._started_at = 0.0
+        self.finished_at: Optional[float] = None
+
+    def add(
+        self, name: str, fn: Callable[[], Awaitable[Any]], required: bool = False
+    ) -> None:
+        self._steps[name] = (fn, required)
+        self._done[name] = asyncio.Event()
+        self._results[name] = {"status": "pending", "required": required}
+
+    async def _run_step(self, name: str) -> None:
+        fn, required = self._steps[name]
+        result = self._results[name]
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await fn()
+                result.update(status="ok", error=None)
+                break
+            except Exception as e:
+                result.update(status="error", error=str(e))
+                if not required:
+                    logger.warning("Warmup step %s failed: %s", name, e)
+                    break
+                logger.warning(
+                    "Warmup step %s failed (attempt %d), retrying in %.0fs: %s",
+                    name,
+                    attempt,
+                    self._retry_sec,
+                    e,
+                )
+                await asyncio.sleep(self._retry_sec)
+
+        result["attempts"] = attempt
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self._done[name].set()
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._run_step(name) for name in self._steps))
+        self.finished_at = time.perf_counter()
+        WARMUP_SECONDS.set(self.finished_at - self._started_at)
+        logger.info(
+            "Warmup finished in %.0fms: %s",
+            (self.finished_at - self._started_at) * 1000,
+            {name: r["status"] for name, r in self._results.items()},
+        )
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._started_at = time.perf_counter()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        """כל הצעדים ה-required הצליחו."""
+        return all(
+            r["status"] == "ok" for r in self._results.values() if r["required"]
+        )
+
+    async def wait(self, name: str, timeout: float) -> bool:
+        event = self._done.get(name)
+        if event is None or event.is_set():
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "steps": {name: dict(r) for name, r in self._results.items()},
+        }
+
+
+def _checkout_connection():
+    conn = engine.connect()
+    conn.execute(text("SELECT 1"))
+    return conn
+
+
+async def warm_db_pool() -> None:
+    """פותח את כל חיבורי ה-pool במקביל, במקום בבקשות הראשונות."""
+    size = max(1, getattr(engine.pool, "size", lambda: 1)())
+    conns = await asyncio.gather(
+        *(asyncio.to_thread(_checkout_connection) for _ in range(size)),
+        return_exceptions=True,
+    )
+    # מחזירים ל-pool רק אחרי שכולם נפתחו – אחרת אותו חיבור נלקח שוב ושוב
+    errors = [c for c in conns if isinstance(c, BaseException)]
+    for conn in conns:
+        if not isinstance(conn, BaseException):
+            conn.close()
+    if errors:
+        raise errors[0]
+
+
+warmup = Warmup(retry_sec=settings.WARMUP_RETRY_SEC)
@@ -0,0 +1,102 @@
+"""
+מיקרו-בנצ'מרק: i18n.t() הישן מול catalog מקומפל, על סט המפתחות של /start.
+
+    python -m benchmarks.i18n_bench
+"""
+import timeit
+
+from app import i18n
+
+START_KEYS = [
+    "START_TITLE",
+    "START_FEATURES_INTRO",
+    "START_FEATURE_1",
+    "START_FEATURE_2",
+    "START_FEATURE_3",
+    "START_FEATURE_4",
+    "START_NEXT_STEPS_TITLE",
+    "START_STEP_LINK_WALLET_MISSING",
+    "START_STEP_BALANCE_ZERO",
+    "START_STEP_WALLET",
+    "START_STEP_WHOAMI",
+    "START_STEP_SUMMARY",
+    "START_STEP_HISTORY",
+    "START_FOOTER_MENU",
+    "START_FOOTER_LANGUAGE",
+]
+
+
+def legacy_normalize_lang(code):
+    if not code:
+        return "en"
+    code = code.lower()
+    if code.startswith("he"):
+        return "he"
+    if code.startswith("iw"):
+        return "he"
+    if code.startswith("ru"):
+        return "ru"
+    if code.startswith("es"):
+        return "es"
+    if code.startswith("ar"):
+        return "ar"
+    return "en"
+
+
+# ה-dicts הגולמיים, כמו LANG_DATA של פעם
+LANG_DATA = {lang: i18n.load_bundle(lang) for lang in ("en", "he", "ru", "es", "ar")}
+
+
+def legacy_t(lang, key):
+    """t() כפי שהיה לפני ה-catalogs – לשם השוואה בלבד."""
+    lang = legacy_normalize_lang(lang)
+    data = LANG_DATA.get(lang, {})
+    if key in data:
+        return data[key]
+    data_en = LANG_DATA.get("en", {})
+    if key in data_en:
+        return data_en[key]
+    return key
+
+
+def render_legacy(lang):
+    out = [legacy_t(lang, k) for k in START_KEYS]
+    out.append(legacy_t(lang, "START_INTRO_MIN_INVEST").format(min_invest=100_000))
+    out.append(legacy_t(lang, "START_STEP_BALANCE_NONZERO").format(balance=5))
+    return out
+
+
+def render_t(lang):
+    out = [i18n.t(lang, k) for k in START_KEYS]
+    out.append(i18n.t(lang, "START_INTRO_MIN_INVEST").format(min_invest=100_000))
+    out.append(i18n.t(lang, "START_STEP_BALANCE_NONZERO").format(balance=5))
+    return out
+
+
+def render_catalog(lang):
+    cat = i18n.catalog(lang)
+    out = [cat[k] for k in START_KEYS]
+    out.append(cat.format("START_INTRO_MIN_INVEST", min_invest=100_000))
+    out.append(cat.format("START_STEP_BALANCE_NONZERO", balance=5))
+    return out
+
+
+def main(number: int = 20000) -> None:
+    for lang in ("he-IL", "en"):
+        assert render_legacy(lang) == render_catalog(lang) == render_t(lang)
+        results = {}
+        for name, fn in (
+            ("legacy t()", render_legacy),
+            ("t() on catalogs", render_t),
+            ("bound catalog", render_catalog),
+        ):
+            best = min(timeit.repeat(lambda: fn(lang), number=number, repeat=5))
+            results[name] = best / number * 1e6
+        base = results["legacy t()"]
+        print(f"lang={lang!r} (/start: {len(START_KEYS) + 2} lookups per update)")
+        for name, us in results.items():
+            print(f"  {name:<16} {us:7.2f} us/update  x{base / us:.2f}")
+
+
+if __name__ == "__main__":
+    main()
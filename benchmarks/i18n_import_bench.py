@@ -0,0 +1,76 @@
+"""
+עלות טעינת i18n: זמן import וזיכרון, ואז השפה הראשונה וכל השפות.
+כל מדידה רצה בתהליך נקי (python -c) כדי שה-import באמת יקרה.
+
+    python -m benchmarks.i18n_import_bench
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+RUNS = 15
+
+PROBE = r"""
+import json, os, sys, time, tracemalloc
+import logging, string, typing, pathlib, threading  # stdlib – לא חלק מהמדידה
+
+# tracemalloc מאט את ה-import עצמו: זמנים נמדדים בריצה בלי tracing
+TRACE = sys.argv[1] == "mem"
+
+def rss_kib():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+if TRACE:
+    tracemalloc.start()
+rss0 = rss_kib()
+t0 = time.perf_counter()
+from app import i18n
+t1 = time.perf_counter()
+heap_import = tracemalloc.get_traced_memory()[0]
+rss_import = rss_kib() - rss0
+
+t2 = time.perf_counter()
+i18n.catalog("he")["START_TITLE"]
+t3 = time.perf_counter()
+heap_first = tracemalloc.get_traced_memory()[0]
+
+for lang in ("en", "he", "ru", "es", "ar"):
+    i18n.catalog(lang)["START_TITLE"]
+heap_all = tracemalloc.get_traced_memory()[0]
+
+if not TRACE:
+    print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_lang_ms": (t3 - t2) * 1000}))
+    raise SystemExit
+
+print(json.dumps({
+    "heap_import_kib": heap_import / 1024,
+    "heap_first_lang_kib": heap_first / 1024,
+    "heap_all_langs_kib": heap_all / 1024,
+    "rss_import_kib": rss_import,
+}))
+"""
+
+
+def main() -> None:
+    samples = []
+    for _ in range(RUNS):
+        sample = {}
+        for mode in ("time", "mem"):
+            out = subprocess.run(
+                [sys.executable, "-c", PROBE, mode],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            sample.update(json.loads(out))
+        samples.append(sample)
+
+    for key in samples[0]:
+        values = [s[key] for s in samples]
+        print(f"{key:22s} median {statistics.median(values):9.2f}  min {min(values):9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+מיקרו-בנצ'מרק: מסך /balance – lines.append + f-strings (כמו פעם) מול
+תבנית מקומפלת של app/screens.py. זמן ו-allocations לכל render.
+
+    python -m benchmarks.screens_bench
+"""
+import timeit
+import tracemalloc
+from decimal import Decimal
+
+from app import i18n, screens
+
+VALUES = dict(
+    balance=Decimal("12345.5"),
+    value_nis=Decimal("5481402.00"),
+    price=Decimal("444"),
+    has_bnb=True,
+    bnb=0.125,
+    has_slh=False,
+    slh=None,
+)
+
+
+def render_legacy(balance, value_nis, price, has_bnb, bnb, has_slh, slh):
+    """cmd_balance כפי שהיה – לשם השוואה בלבד."""
+    lines: list[str] = []
+    lines.append("SLH Off-Chain Balance")
+    lines.append("")
+    lines.append(f"Current balance: {balance:.4f} SLH")
+    lines.append(
+        f"Nominal value: {value_nis:.2f} ILS (at {price:.0f} ILS per SLH)"
+    )
+    lines.append("")
+    lines.append("On-Chain view (BNB Chain):")
+    if bnb is not None:
+        lines.append(f"- BNB: {bnb:.6f} BNB")
+    else:
+        lines.append("- BNB: unavailable (RPC / address / node error)")
+    if slh is not None:
+        lines.append(f"- SLH: {slh:.6f} SLH")
+    else:
+        lines.append("- SLH: unavailable (token / RPC / node error)")
+    lines.append("")
+    lines.append("This reflects allocations recorded for you inside the system.")
+    lines.append(
+        "There is no redemption yet – only future usage inside the ecosystem."
+    )
+    return "\n".join(lines)
+
+
+def allocations(fn, n=1000):
+    fn()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(n):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - before
+
+
+def main() -> None:
+    n = 50_000
+    for lang in ("en", "he"):
+        cat = i18n.catalog(lang)
+        template = screens.template(cat, "SCREEN_BALANCE")
+
+        cases = [
+            ("legacy f-strings", lambda: render_legacy(**VALUES)),
+            ("screens.render", lambda: screens.render(cat, "SCREEN_BALANCE", **VALUES)),
+            ("bound template", lambda: template.render(**VALUES)),
+        ]
+
+        print(f"lang={lang!r} (/balance)")
+        base = None
+        for name, fn in cases:
+            secs = min(timeit.repeat(fn, number=n, repeat=5))
+            per = secs / n * 1e6
+            base = base or per
+            print(
+                f"  {name:18s} {per:7.2f} us/render  x{base / per:4.2f}"
+                f"  peak {allocations(fn):6d} B"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+זמן עליית התהליך: import של app.main, startup_event עד שהשרת מתחיל לשרת,
+ועד שהחימום ברקע מסתיים. כל ריצה בתהליך נקי, מול SQLite זמני בלי
+BOT_TOKEN / RPC – מודדים את הקוד שלנו, לא את הרשת.
+
+    python -m benchmarks.startup_bench [--runs N]
+
+יוצא עם קוד 1 אם החציון חורג מהתקציב (אפשר להריץ ב-CI):
+web3 / eth_account שחוזרים להיטען ב-import יעברו אותו מיד.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = 7
+
+# תקציבים (ms, חציון). import נמדד בלי pyc חם ולכן רחב יותר
+BUDGETS = {
+    "import_ms": 2000.0,
+    "startup_ms": 250.0,
+}
+
+PROBE = r"""
+import asyncio, json, sys, time
+
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+heavy = sorted(m for m in ("web3", "eth_account") if m in sys.modules)
+
+async def boot():
+    s0 = time.perf_counter()
+    await app.main.startup_event()
+    s1 = time.perf_counter()
+    await app.main.warmup._task
+    s2 = time.perf_counter()
+    await app.main.shutdown_event()
+    return s1 - s0, s2 - s0
+
+startup, warm = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "startup_ms": startup * 1000,
+    "warmup_ms": warm * 1000,
+    "heavy_imports": heavy,
+}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=RUNS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/startup.db",
+            BOT_TOKEN="",
+            BSC_RPC_URL="",
+            WEBHOOK_URL="",
+            LOG_LEVEL="WARNING",
+        )
+        samples = []
+        for _ in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, "-c", PROBE],
+                capture_output=True,
+                text=True,
+                check=True,
+                env=env,
+            ).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    failed = False
+    for key in ("import_ms", "startup_ms", "warmup_ms"):
+        values = [s[key] for s in samples]
+        median = statistics.median(values)
+        budget = BUDGETS.get(key)
+        verdict = ""
+        if budget is not None:
+            over = median > budget
+            failed |= over
+            verdict = f"  budget {budget:7.0f}  {'OVER' if over else 'ok'}"
+        print(f"{key:12s} median {median:9.2f}  min {min(values):9.2f}{verdict}")
+
+    heavy = sorted({m for s in samples for m in s["heavy_imports"]})
+    if heavy:
+        failed = True
+        print(f"eagerly imported: {', '.join(heavy)}  OVER")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+gunicorn למצב multi-worker:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- preload: האפליקציה (FastAPI, PTB, SQLAlchemy, קטלוגי i18n) נטענת פעם אחת ב-master
+- when_ready: init_db + setWebhook רצים ב-master תחת advisory lock (app.leader),
+  ואחר כך gc.freeze() – ה-workers חולקים את הזיכרון copy-on-write
+- worker רק פותח event loop, מאתחל את ה-Application ומתחיל לשרת
+"""
+import asyncio
+import gc
+import logging
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# הלוגים שלנו (JSON) יוצאים דרך app.logging_setup
+accesslog = None
+
+
+def when_ready(server):
+    from app import i18n
+    from app.database import engine
+    from app.leader import run_startup_tasks
+
+    try:
+        asyncio.run(run_startup_tasks())
+    except Exception:
+        # ה-workers ינסו שוב בעצמם ב-startup
+        logging.getLogger("slhnet").exception("Startup tasks failed in master")
+
+    # כל השפות מקומפלות פעם אחת ומשותפות לכל ה-workers
+    i18n.compile_catalogs()
+
+    # חיבורי DB לא עוברים fork – כל worker פותח pool משלו
+    engine.dispose()
+
+    # אובייקטים ששרדו את הטעינה עוברים ל-generation קבוע: ה-GC ב-worker
+    # לא נוגע בהם, ולכן לא מלכלך את הדפים המשותפים (copy-on-write)
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# app.core.config נקרא ב-import – לפני שמודול כלשהו של app נטען
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='slh-tests-')}/app.db"
+)
+os.environ.setdefault("BOT_TOKEN", "")
+os.environ.setdefault("BSC_RPC_URL", "")
+os.environ.setdefault("WEBHOOK_URL", "")
+
+
+@pytest.fixture
+def session_factory():
+    """SQLite בזיכרון עם כל הטבלאות, לבדיקה אחת."""
+    from app.database import Base
+    from app import models  # noqa: F401
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False, future=True)
+    engine.dispose()
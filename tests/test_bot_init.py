@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+from telegram.ext import Application, ExtBot
+
+from app.bot.investor_wallet_bot import InvestorWalletBot
+from app.core.config import settings
+
+
+def test_initialize_retry_reuses_application(monkeypatch):
+    monkeypatch.setattr(settings, "BOT_TOKEN", "123:TEST")
+    calls = []
+
+    async def get_me(self):
+        calls.append(self)
+        if len(calls) == 1:
+            raise RuntimeError("getMe timed out")
+
+    monkeypatch.setattr(Application, "initialize", get_me)
+    monkeypatch.setattr(ExtBot, "initialize", get_me)
+
+    bot = InvestorWalletBot()
+    with pytest.raises(RuntimeError):
+        asyncio.run(bot.initialize())
+    built = (bot.application, bot.log_bot, bot.broadcast_bot)
+    handlers = len(bot.application.handlers[0])
+
+    asyncio.run(bot.initialize())
+    # ניסיון שני: אותם אובייקטים, בלי handlers כפולים
+    assert (bot.application, bot.log_bot, bot.broadcast_bot) == built
+    assert len(bot.application.handlers[0]) == handlers
@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram import User
+
+from app.bot.investor_wallet_bot import InvestorWalletBot
+from app.database import init_db
+
+
+class _Message:
+    text = "/staking"
+
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+@pytest.mark.parametrize(
+    "command",
+    ["cmd_staking", "cmd_signals", "cmd_academy", "cmd_reports", "cmd_portfolio_pro"],
+)
+def test_coming_soon_commands_reply(command):
+    init_db()
+    message = _Message()
+    update = SimpleNamespace(
+        update_id=1,
+        effective_user=User(2000, "Investor", False, language_code="en"),
+        effective_chat=SimpleNamespace(id=2000),
+        message=message,
+        callback_query=None,
+    )
+    context = SimpleNamespace(args=[], bot=None, user_data={})
+
+    asyncio.run(getattr(InvestorWalletBot(), command)(update, context))
+
+    assert len(message.replies) == 1
+    assert message.replies[0].startswith("Coming soon\n\n")
@@ -0,0 +1,24 @@
+import asyncio
+
+from app.leader import wait_for_lock
+
+
+class _Lock:
+    name = "slh:test"
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def try_acquire(self):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_wait_for_lock_retries_until_acquired():
+    lock = _Lock([False, OSError("connection refused"), False, True])
+    asyncio.run(wait_for_lock(lock, retry_sec=0))
+    assert lock.calls == 4
@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.ext import Application
+
+from app import metrics
+
+UPDATE = {"update_id": 1, "message": {"message_id": 1, "text": "/boom"}}
+
+
+def _count(outcome: str) -> float:
+    return metrics.UPDATES.value("message", outcome)
+
+
+def test_instrument_handlers_registers_error_handler():
+    application = Application.builder().token("123:TEST").build()
+    metrics.instrument_handlers(application)
+    metrics.instrument_handlers(application)
+    assert list(application.error_handlers) == [metrics.on_handler_error]
+
+
+def test_error_handler_marks_update_as_error():
+    # process_update של PTB בולע את החריגה ומפעיל את ה-error handler
+    async def process_update():
+        context = SimpleNamespace(error=RuntimeError("boom"))
+        await metrics.on_handler_error(SimpleNamespace(update_id=1), context)
+
+    async def run():
+        with metrics.observe_update(UPDATE):
+            await process_update()
+        with metrics.observe_update(UPDATE):
+            pass
+
+    errors, processed = _count("error"), _count("processed")
+    asyncio.run(run())
+    assert _count("error") == errors + 1
+    assert _count("processed") == processed + 1
@@ -0,0 +1,207 @@
+"""
+PayoutEngine מול שרשרת מקומית (eth-tester): תור -> חתימה -> שליחה -> receipt.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("eth_tester")
+
+from web3 import Web3, EthereumTesterProvider  # noqa: E402
+
+from app import blockchain, crud, models  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.payouts import PayoutEngine  # noqa: E402
+
+RECIPIENT = "0x" + "42" * 20
+
+
+@pytest.fixture
+def chain():
+    provider = EthereumTesterProvider()
+    w3 = Web3(provider)
+    key = provider.ethereum_tester.backend.account_keys[0]
+    return w3, provider.ethereum_tester, key.to_hex()
+
+
+@pytest.fixture
+def engine(chain, session_factory):
+    w3, _, key = chain
+    payouts = PayoutEngine(w3, key, session_factory=session_factory, workers=2)
+    yield payouts
+    payouts._executor.shutdown(wait=True)
+
+
+def _queue(session_factory, amount, balance="100"):
+    db = session_factory()
+    try:
+        user = crud.get_or_create_user(db, telegram_id=1, username="investor")
+        if user.balance_slh == 0:
+            user.balance_slh = Decimal(balance)
+        payout = crud.queue_payout(
+            db, user, Web3.to_checksum_address(RECIPIENT), Decimal(amount), asset="BNB"
+        )
+        return payout.id
+    finally:
+        db.close()
+
+
+def _sign_without_sending(engine, session_factory, payout_id):
+    """חתום ומסומן submitted, אבל לא הגיע לרשת (כמו טרנזקציה שנפלה מה-mempool)."""
+    db = session_factory()
+    try:
+        queued = db.query(models.Payout).filter_by(status="queued").all()
+        engine._sign_queued(db, queued)
+        payout = db.get(models.Payout, payout_id)
+        payout.status = "submitted"
+        db.commit()
+        tx_hash = payout.tx_hash
+    finally:
+        db.close()
+    _make_stale(session_factory, payout_id)
+    return tx_hash
+
+
+def _make_stale(session_factory, payout_id):
+    db = session_factory()
+    try:
+        payout = db.get(models.Payout, payout_id)
+        payout.updated_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _load(session_factory, model, key):
+    db = session_factory()
+    try:
+        return db.get(model, key)
+    finally:
+        db.close()
+
+
+def test_queue_sign_submit_receipt(chain, engine, session_factory):
+    w3, _, _ = chain
+    ids = [_queue(session_factory, "0.5") for _ in range(3)]
+
+    assert engine.submit_pending() == 3
+    assert engine.poll_receipts() == 3
+
+    payouts = [_load(session_factory, models.Payout, i) for i in ids]
+    assert [p.status for p in payouts] == ["confirmed"] * 3
+    # nonces רצופים מה-NonceManager, בלי getTransactionCount לכל אחת
+    assert sorted(p.nonce for p in payouts) == [0, 1, 2]
+    assert w3.eth.get_balance(Web3.to_checksum_address(RECIPIENT)) == Web3.to_wei(
+        Decimal("1.5"), "ether"
+    )
+    assert _load(session_factory, models.User, 1).balance_slh == Decimal("98.5")
+
+
+def test_rejects_non_finite_amount(session_factory):
+    with pytest.raises(ValueError):
+        _queue(session_factory, "NaN")
+
+
+def test_rejection_resigns_at_same_nonce(engine, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "PAYOUT_MAX_ATTEMPTS", 2)
+    # יותר מכל ה-BNB של הארנק – ה-node דוחה כל ניסיון
+    payout_id = _queue(session_factory, "10000000", balance="10000000")
+
+    gas_price = engine.w3.eth.gas_price
+    assert engine.submit_pending() == 0
+    first = _load(session_factory, models.Payout, payout_id)
+    # נחתמה שוב: אותו nonce, gas גבוה ב-15%, שני ה-hashes נשמרים
+    assert (first.status, first.attempts, first.nonce) == ("signed", 1, 0)
+    assert first.gas_price == gas_price * 115 // 100
+    hashes = json.loads(first.tx_hashes)
+    assert len(hashes) == 2 and hashes[-1] == first.tx_hash
+
+    assert engine.submit_pending() == 0
+    payout = _load(session_factory, models.Payout, payout_id)
+    assert (payout.nonce, payout.attempts, payout.tx_hash) == (0, 2, first.tx_hash)
+
+    # אחרי PAYOUT_MAX_ATTEMPTS: לא נכשל ולא מוחזר – ה-nonce לא נוצל על השרשרת
+    assert payout.status == "submitted"
+    assert _load(session_factory, models.User, 1).balance_slh == 0
+    assert engine.submit_pending() == 0
+
+
+def test_fails_only_after_nonce_is_used(chain, engine, session_factory):
+    w3, _, _ = chain
+    payout_id = _queue(session_factory, "1")
+    _sign_without_sending(engine, session_factory, payout_id)
+
+    # טרנזקציה אחרת מהארנק תופסת את nonce 0 – החתומה כבר לא יכולה להיכרת
+    sender = engine.account.address
+    w3.eth.send_transaction({"from": sender, "to": sender, "value": 0, "nonce": 0})
+    _make_stale(session_factory, payout_id)
+
+    assert engine.poll_receipts() == 0
+    assert _load(session_factory, models.Payout, payout_id).status == "failed"
+    assert _load(session_factory, models.User, 1).balance_slh == Decimal("100")
+
+
+def test_lost_lookup_does_not_pay_twice(chain, engine, session_factory, monkeypatch):
+    """
+    backend מאחורי load balancer שלא ראה את הטרנזקציה: "already known",
+    getTransactionByHash / receipt ריקים ו-nonce ישן – עד שהוא מתעדכן.
+    """
+    w3, _, _ = chain
+    real_rpc_batch = blockchain.rpc_batch
+    state = {"lagging": True, "batch_error": False}
+
+    def rpc_batch(w3, calls):
+        if state["batch_error"]:
+            return [{"error": "missing response", "transport": True} for _ in calls]
+        if not state["lagging"]:
+            return real_rpc_batch(w3, calls)
+        responses = []
+        for method, params in calls:
+            if method == "eth_sendRawTransaction":
+                real_rpc_batch(w3, [(method, params)])
+                responses.append({"error": {"code": -32000, "message": "already known"}})
+            elif method == "eth_getTransactionCount":
+                responses.append({"result": "0x0"})
+            else:
+                responses.append({"result": None})
+        return responses
+
+    monkeypatch.setattr(blockchain, "rpc_batch", rpc_batch)
+    payout_id = _queue(session_factory, "1")
+
+    assert engine.submit_pending() == 0
+    _make_stale(session_factory, payout_id)
+    assert engine.poll_receipts() == 0  # rebroadcast -> "already known" שוב
+
+    state["batch_error"] = True
+    _make_stale(session_factory, payout_id)
+    assert engine.poll_receipts() == 0
+    assert engine.submit_pending() == 0
+
+    payout = _load(session_factory, models.Payout, payout_id)
+    assert (payout.status, payout.nonce, payout.attempts) == ("submitted", 0, 0)
+    assert len(json.loads(payout.tx_hashes)) == 1
+
+    state.update(lagging=False, batch_error=False)
+    assert engine.poll_receipts() == 1
+
+    payout = _load(session_factory, models.Payout, payout_id)
+    assert payout.status == "confirmed"
+    assert w3.eth.get_transaction_count(engine.account.address) == 1
+    assert w3.eth.get_balance(Web3.to_checksum_address(RECIPIENT)) == Web3.to_wei(1, "ether")
+    assert _load(session_factory, models.User, 1).balance_slh == Decimal("99")
+
+
+def test_dropped_transaction_is_rebroadcast(chain, engine, session_factory):
+    payout_id = _queue(session_factory, "1")
+
+    tx_hash = _sign_without_sending(engine, session_factory, payout_id)
+
+    assert engine.poll_receipts() == 0  # אין receipt -> שליחה חוזרת של אותו raw_tx
+    assert engine.poll_receipts() == 1
+
+    payout = _load(session_factory, models.Payout, payout_id)
+    assert payout.status == "confirmed"
+    assert payout.tx_hash == tx_hash
@@ -0,0 +1,114 @@
+"""
+@query_budget בפועל: ה-handlers רצים מול SQLite עם QUERY_BUDGET_STRICT,
+והתקציבים בבוט הם הספירה שנמדדה במקרה הגרוע (משתמש חדש, רפרל, קישור ארנק).
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from telegram import User
+
+from app import metrics, query_budget
+from app.core.config import settings
+from app.database import SessionLocal, init_db
+
+
+class _Message:
+    def __init__(self, text):
+        self.text = text
+
+    async def reply_text(self, *args, **kwargs):
+        pass
+
+
+class _Bot:
+    async def get_me(self):
+        return SimpleNamespace(username="slh_test_bot")
+
+
+@pytest.fixture(scope="module")
+def bot():
+    init_db()
+    from app.bot.investor_wallet_bot import InvestorWalletBot
+
+    instance = InvestorWalletBot.__new__(InvestorWalletBot)
+    instance.bot = None
+    return instance
+
+
+@pytest.fixture(autouse=True)
+def strict(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+
+
+@pytest.fixture
+def counts(monkeypatch):
+    seen = {}
+    check = query_budget.QueryScope.check
+
+    def record(scope):
+        seen[scope.handler] = max(seen.get(scope.handler, 0), scope.count)
+        return check(scope)
+
+    monkeypatch.setattr(query_budget.QueryScope, "check", record)
+    return seen
+
+
+def _run(handler, user_id, text, *args):
+    update = SimpleNamespace(
+        update_id=user_id,
+        effective_user=User(user_id, "Investor", False, username=f"investor{user_id}"),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=_Message(text),
+        callback_query=None,
+    )
+    context = SimpleNamespace(args=list(args), bot=_Bot(), user_data={})
+    wrapped = metrics._wrap_callback(handler, "CommandHandler")
+    asyncio.run(wrapped(update, context))
+
+
+# (handler, telegram_id, טקסט, args) – כל משתמש חדש בפעם הראשונה שהוא מופיע
+SCENARIOS = [
+    ("cmd_start", 1000, "/start"),
+    ("cmd_start", 1001, "/start", "ref_1000"),
+    ("cmd_start", 1001, "/start"),
+    ("cmd_link_wallet", 1002, "/link_wallet", "0x" + "ab" * 20),
+    ("cmd_link_wallet", 1001, "/link_wallet", "0x" + "cd" * 20),
+    ("cmd_balance", 1010, "/balance"),
+    ("cmd_balance", 1001, "/balance"),
+    ("cmd_whoami", 1011, "/whoami"),
+    ("cmd_whoami", 1001, "/whoami"),
+    ("cmd_summary", 1012, "/summary"),
+    ("cmd_summary", 1001, "/summary"),
+    ("cmd_referrals", 1013, "/referrals"),
+    ("cmd_referrals", 1000, "/referrals"),
+    ("cmd_onchain_balance", 1014, "/onchain_balance"),
+    ("cmd_onchain_balance", 1001, "/onchain_balance"),
+    ("cmd_history", 1015, "/history"),
+    ("cmd_history", 1001, "/history"),
+]
+
+
+def test_budgets_match_measured_worst_case(bot, counts):
+    for name, user_id, text, *args in SCENARIOS:
+        # QUERY_BUDGET_STRICT – חריגה זורקת QueryBudgetExceeded
+        _run(getattr(bot, name), user_id, text, *args)
+
+    budgets = {name: getattr(bot, name)._query_budget for name in counts}
+    # תקציב רחב מהמדידה מסתיר רגרסיה; אחרי אופטימיזציה – להוריד את המספר
+    assert counts == budgets
+
+
+def test_strict_budget_raises():
+    @query_budget.query_budget(1)
+    async def cmd_two_queries(update, context):
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        finally:
+            db.close()
+
+    with pytest.raises(query_budget.QueryBudgetExceeded):
+        _run(cmd_two_queries, 1100, "/two")
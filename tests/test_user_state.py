@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import models, user_state
+from app.user_state import UserStateStore
+
+
+@pytest.fixture
+def workers(session_factory, monkeypatch):
+    """שני workers עם LRU נפרד מול אותה טבלה."""
+    monkeypatch.setattr(user_state, "SessionLocal", session_factory)
+
+    def store():
+        return UserStateStore(max_entries=16, cache_sec=60, flush_sec=1, flow_ttl_sec=600)
+
+    return store(), store(), session_factory
+
+
+def _row(session_factory, telegram_id):
+    db = session_factory()
+    try:
+        return db.get(models.UserState, telegram_id)
+    finally:
+        db.close()
+
+
+def test_stale_worker_keeps_other_workers_flow(workers):
+    a, b, session_factory = workers
+    a.set_lang(1, "en")
+    a.flush()
+
+    b.set_flow(1, "link_wallet", step=1)
+    b.flush()
+
+    # ל-a יש עותק נקי וישן (בלי flow) – כותב רק את השפה
+    a.set_lang(1, "he")
+    a.flush()
+
+    row = _row(session_factory, 1)
+    assert (row.lang, row.flow) == ("he", "link_wallet")
+
+
+def test_older_change_does_not_overwrite_newer(workers):
+    a, b, session_factory = workers
+    a.set_flow(2, "transfer")
+    b.set_flow(2, "link_wallet")
+    b.flush()
+    a.flush()
+
+    assert _row(session_factory, 2).flow == "link_wallet"
+
+
+def test_failed_flush_keeps_changed_columns(workers, monkeypatch):
+    a, _, session_factory = workers
+    a.set_lang(3, "ru")
+
+    def boom(db, columns, rows):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(user_state, "_upsert", boom)
+    with pytest.raises(RuntimeError):
+        a.flush()
+    monkeypatch.undo()
+    monkeypatch.setattr(user_state, "SessionLocal", session_factory)
+
+    assert a.flush() == 1
+    assert _row(session_factory, 3).lang == "ru"
+
+
+def test_load_reads_db_off_the_event_loop(workers, monkeypatch):
+    a, b, _ = workers
+    b.set_lang(4, "es")
+    b.flush()
+
+    threads = []
+    load = UserStateStore._load
+
+    def tracked(self, telegram_id):
+        threads.append(threading.current_thread())
+        return load(self, telegram_id)
+
+    monkeypatch.setattr(UserStateStore, "_load", tracked)
+
+    async def handler():
+        await a.load(4)
+        # בתוך ה-handler – מהזיכרון, בלי DB
+        return a.get(4).lang
+
+    assert asyncio.run(handler()) == "es"
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()